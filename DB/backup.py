@@ -0,0 +1,261 @@
+import gzip
+import io
+import json
+import sys
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, IO, Iterator, List, Optional
+
+from pymongo import UpdateOne
+
+from DB.db_manager import DB_BATCH_SIZE, DBManager, path_ancestors
+
+# Version of the NDJSON layout, written in the header line
+BACKUP_FORMAT = 1
+
+# Documents per unordered bulk write when importing; pymongo splits larger
+# batches into messages the server accepts, so bigger means fewer round trips
+IMPORT_BATCH_SIZE = 10000
+
+# Fields of the video documents written to a backup, the others are derived from the path on import
+VIDEO_FIELDS = {"_id": 0, "path": 1, "size": 1, "lastModifyTime": 1, "tags": 1, "meta": 1, "fingerprint": 1}
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+@contextmanager
+def open_backup(path: str, mode: str, compress: bool = False) -> Iterator[IO[str]]:
+    """Open a backup file as text, "-" for stdin/stdout (left open afterwards)
+
+    Reading detects gzip from the content, writing compresses when compress is True.
+    """
+    if mode == "w":
+        binary = sys.stdout.buffer if path == "-" else open(path, "wb")
+        # Level 6 compresses almost as well as 9 in a fraction of the time
+        compressed = gzip.GzipFile(fileobj=binary, mode="wb", compresslevel=6) if compress else None
+    else:
+        binary = sys.stdin.buffer if path == "-" else open(path, "rb")
+        if not isinstance(binary, io.BufferedReader):
+            binary = io.BufferedReader(binary)
+        compressed = gzip.GzipFile(fileobj=binary, mode="rb") if binary.peek(2)[:2] == GZIP_MAGIC else None
+
+    stream = io.TextIOWrapper(compressed or binary, encoding="utf-8", newline="\n" if mode == "w" else None)
+    try:
+        yield stream
+    finally:
+        if mode == "w":
+            stream.flush()
+        # Detached so that closing the text layer does not close stdin/stdout
+        stream.detach()
+        if compressed:
+            compressed.close()
+        if path != "-":
+            binary.close()
+
+
+class LibraryBackup:
+    """Export and import the tag database as NDJSON, one document per line
+
+    The first line is a header, then come the tags, the path rules, the
+    saved searches, the folder tags and the videos, each line carrying its
+    "type". Tags are
+    written as names, so a backup can be imported into a database with or
+    without integer tag ids. Both directions stream the documents in
+    batches: memory does not grow with the size of the library.
+
+    Importing upserts by path (existing documents take the imported tags)
+    through unordered bulk writes, then recomputes the tag counts,
+    statistics and co-occurrence once at the end.
+    """
+    def __init__(self, db_manager: DBManager):
+        self.db_manager = db_manager
+
+    def export(self, stream: IO[str], progress_callback: Optional[Callable[[str, int], None]] = None) -> Dict[str, int]:
+        """Write the whole database to a text stream
+
+        Args:
+            stream: Text stream the lines are written to
+            progress_callback: Called with the record type and the number written so far after each batch
+
+        Returns:
+            Number of records written per type
+        """
+        db_manager = self.db_manager
+        if db_manager.use_tag_ids:
+            # Decoding one document at a time would otherwise query every unknown id
+            db_manager._load_tag_ids({})
+
+        self._write(stream, {"type": "header", "format": BACKUP_FORMAT,
+                             "exportedAt": time.strftime("%Y-%m-%dT%H:%M:%S")})
+        counts = {}
+        sources = [
+            ("tag", db_manager.tags_collection.find({}, {"_id": 0, "tagId": 0})),
+            ("path_rule", db_manager.path_rules_collection.find({}, {"_id": 0, "pattern": 1, "tags": 1})
+             .sort("order", 1)),
+            ("saved_search", db_manager.saved_searches.collection.find({}, {"_id": 0, "name": 1, "tags": 1,
+                                                                            "ranges": 1})),
+            ("folder", db_manager.folders_collection.find({}, {"_id": 0, "path": 1, "tags": 1})),
+            ("video", db_manager.videos_collection.find({}, VIDEO_FIELDS)),
+        ]
+        for record_type, cursor in sources:
+            count = 0
+            for doc in cursor.batch_size(DB_BATCH_SIZE):
+                if record_type in ("folder", "video"):
+                    db_manager._decode_doc(doc)
+                doc["type"] = record_type
+                self._write(stream, doc)
+                count += 1
+                if progress_callback and count % DB_BATCH_SIZE == 0:
+                    progress_callback(record_type, count)
+            counts[record_type] = count
+            if progress_callback:
+                progress_callback(record_type, count)
+        stream.flush()
+        return counts
+
+    @staticmethod
+    def _write(stream: IO[str], doc: Dict[str, Any]) -> None:
+        stream.write(json.dumps(doc, ensure_ascii=False, separators=(",", ":"), default=str))
+        stream.write("\n")
+
+    def import_(self, stream: IO[str], replace: bool = False,
+                progress_callback: Optional[Callable[[str, int], None]] = None) -> Dict[str, int]:
+        """Read a backup from a text stream into the database
+
+        Args:
+            stream: Text stream of a backup written by export
+            replace: Delete the current videos, tags, folder tags and saved searches first, instead of merging
+            progress_callback: Called with the record type and the number imported so far after each batch
+
+        Returns:
+            Number of records imported per type
+
+        Raises:
+            ValueError: If the stream is not a backup or has an unsupported format
+        """
+        records = self._read(stream)
+        header = next(records, None)
+        if not header or header.get("type") != "header":
+            raise ValueError("Not a video tag backup (missing header line)")
+        if header.get("format", 0) > BACKUP_FORMAT:
+            raise ValueError(f"Unsupported backup format {header.get('format')}, "
+                             f"this version reads format {BACKUP_FORMAT}")
+
+        if replace:
+            self._clear()
+
+        counts = {"tag": 0, "path_rule": 0, "saved_search": 0, "folder": 0, "video": 0}
+        batches = {"tag": [], "folder": [], "video": []}
+        path_rules = []
+        saved_searches = []
+        writers = {"tag": self._write_tags, "folder": self._write_folders, "video": self._write_videos}
+        for doc in records:
+            record_type = doc.pop("type", None)
+            if record_type == "path_rule":
+                path_rules.append({"pattern": doc["pattern"], "tags": doc["tags"]})
+                continue
+            if record_type == "saved_search":
+                saved_searches.append(doc)
+                continue
+            if record_type not in batches:
+                print(f"Skipping unknown backup record type: {record_type}")
+                continue
+            batch = batches[record_type]
+            batch.append(doc)
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                counts[record_type] += writers[record_type](batch)
+                batch.clear()
+                if progress_callback:
+                    progress_callback(record_type, counts[record_type])
+
+        for record_type, batch in batches.items():
+            if batch:
+                counts[record_type] += writers[record_type](batch)
+                if progress_callback:
+                    progress_callback(record_type, counts[record_type])
+        if path_rules or replace:
+            self.db_manager.save_path_rules(path_rules)
+            counts["path_rule"] = len(path_rules)
+
+        # Counts, statistics and co-occurrence are derived from the imported documents once
+        self.db_manager.recompute_tag_stats()
+        self.db_manager.rebuild_tag_pairs()
+
+        # Members of the saved searches are materialized again from the imported videos
+        store = self.db_manager.saved_searches
+        for doc in saved_searches:
+            store.collection.update_one({"name": doc["name"]},
+                                        {"$set": {"tags": doc["tags"], "ranges": doc.get("ranges", {})}},
+                                        upsert=True)
+        counts["saved_search"] = len(saved_searches)
+        store.invalidate()
+        store.rematerialize()
+        self.db_manager.changes.bump("saved_searches")
+        return counts
+
+    @staticmethod
+    def _read(stream: IO[str]) -> Iterator[Dict[str, Any]]:
+        for line_number, line in enumerate(stream, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Invalid backup line {line_number}: {e}")
+
+    def _clear(self) -> None:
+        """Delete the tagging data, before a replacing import"""
+        db_manager = self.db_manager
+        for collection in (db_manager.videos_collection, db_manager.folders_collection,
+                           db_manager.tag_pairs_collection, db_manager.tags_collection,
+                           db_manager.saved_searches.collection, db_manager.saved_searches.members_collection):
+            collection.delete_many({})
+        db_manager.tag_id_by_name.clear()
+        db_manager.tag_name_by_id.clear()
+        db_manager.top_tags_cache.invalidate()
+        db_manager.fuzzy_index.invalidate()
+        db_manager.saved_searches.invalidate()
+
+    def _encoder(self, docs: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Map every tag name used by the documents to its stored value, creating tag ids if needed"""
+        names = list(dict.fromkeys(tag for doc in docs for tag in doc.get("tags", [])))
+        return dict(zip(names, self.db_manager._encode_tags(names, create=True)))
+
+    def _write_tags(self, docs: List[Dict[str, Any]]) -> int:
+        # Only the names matter, counts and statistics are recomputed at the end
+        names = [doc["name"] for doc in docs]
+        if self.db_manager.use_tag_ids:
+            self.db_manager._encode_tags(names, create=True)
+        else:
+            self.db_manager.tags_collection.bulk_write(
+                [UpdateOne({"name": name}, {"$setOnInsert": {"count": 0}}, upsert=True) for name in names],
+                ordered=False)
+        return len(docs)
+
+    def _write_folders(self, docs: List[Dict[str, Any]]) -> int:
+        encoded = self._encoder(docs)
+        operations = []
+        for doc in docs:
+            path = self.db_manager.get_path_standard_format(doc["path"])
+            operations.append(UpdateOne(
+                {"path": path},
+                {"$set": {"path": path, "ancestors": path_ancestors(path),
+                          "tags": [encoded[tag] for tag in doc["tags"]]}},
+                upsert=True))
+        self.db_manager.folders_collection.bulk_write(operations, ordered=False)
+        return len(docs)
+
+    def _write_videos(self, docs: List[Dict[str, Any]]) -> int:
+        encoded = self._encoder(docs)
+        operations = []
+        for doc in docs:
+            path = self.db_manager.get_path_standard_format(doc["path"])
+            video = self.db_manager._build_file_doc(path, doc.get("size", 0), doc.get("lastModifyTime", 0))
+            video["tags"] = [encoded[tag] for tag in doc.get("tags", [])]
+            for field in ("meta", "fingerprint"):
+                if doc.get(field) is not None:
+                    video[field] = doc[field]
+            operations.append(UpdateOne({"path": path}, {"$set": video}, upsert=True))
+        self.db_manager.videos_collection.bulk_write(operations, ordered=False)
+        return len(docs)
@@ -0,0 +1,158 @@
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional, Set
+
+from pymongo import ReturnDocument
+from pymongo.errors import PyMongoError
+
+# Data areas whose changes are tracked: tag names and counts, tags of the
+# videos, folder tags, path rules and saved searches
+CHANGE_AREAS = ["tags", "videos", "folders", "path_rules", "saved_searches"]
+# Document of the meta collection holding the version counters
+CHANGES_DOC_ID = "changes"
+# Minimum delay in seconds between two reads of the version counters
+VERSION_CHECK_INTERVAL = 2.0
+
+
+class ChangeTracker:
+    """Version counters shared by every client of a database, to keep local caches coherent
+
+    One document of the meta collection holds a global version and one
+    version per data area. Every write path increments the global version and
+    the versions of the areas it changed in the same update. Each client
+    reads the document at most every check_interval seconds (one lookup by
+    _id) and notifies the listeners of the areas another client changed.
+
+    When the server is a replica set, a change stream on that document can
+    wake the polling thread as soon as another client writes (see watch).
+    A single-node replica set or mongomock works for local testing: without
+    change streams the tracker simply polls.
+    """
+    def __init__(self, meta_collection, check_interval: float = VERSION_CHECK_INTERVAL):
+        self.collection = meta_collection
+        self.check_interval = check_interval
+        self.lock = threading.Lock()
+        self.listeners = {area: [] for area in CHANGE_AREAS}
+        self.versions = self._versions_of(self.collection.find_one({"_id": CHANGES_DOC_ID}))
+        self.checked_at = time.monotonic()
+        # Set by the change stream, or to stop the polling thread
+        self.wakeup = threading.Event()
+        self.stopped = False
+        self.stream = None
+
+    @staticmethod
+    def _versions_of(doc: Optional[Dict]) -> Dict[str, int]:
+        doc = doc or {}
+        versions = {area: doc.get("areas", {}).get(area, 0) for area in CHANGE_AREAS}
+        versions["version"] = doc.get("version", 0)
+        return versions
+
+    def version(self, area: str) -> int:
+        """Version of an area as last seen by this client"""
+        with self.lock:
+            return self.versions[area]
+
+    def subscribe(self, areas: Iterable[str], listener: Callable[[Set[str]], None]) -> None:
+        """Call listener with the set of changed areas when another client changes one of the areas
+
+        Listeners run on the thread that detected the change (a write, a read
+        checking the versions, or the polling thread).
+        """
+        for area in areas:
+            self.listeners[area].append(listener)
+
+    def bump(self, *areas: str) -> None:
+        """Record a write of this client to the given areas"""
+        increments = {"version": 1}
+        increments.update({f"areas.{area}": 1 for area in areas})
+        doc = self.collection.find_one_and_update(
+            {"_id": CHANGES_DOC_ID},
+            {"$inc": increments},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        new_versions = self._versions_of(doc)
+        with self.lock:
+            previous = self.versions
+            self.versions = {key: max(previous[key], new_versions[key]) for key in new_versions}
+        # If the global version moved by more than our own bump, another client wrote in between
+        if new_versions["version"] != previous["version"] + 1:
+            remote = {area for area in CHANGE_AREAS
+                      if new_versions[area] > previous[area] + (1 if area in areas else 0)}
+            self._notify(remote)
+
+    def poll(self, force: bool = False) -> Set[str]:
+        """Read the version counters (at most every check_interval seconds unless forced)
+
+        Returns:
+            The areas changed by other clients since the last read
+        """
+        now = time.monotonic()
+        if not force and now - self.checked_at < self.check_interval:
+            return set()
+        self.checked_at = now
+
+        new_versions = self._versions_of(self.collection.find_one({"_id": CHANGES_DOC_ID}))
+        with self.lock:
+            previous = self.versions
+            # Versions only grow, a read older than a concurrent bump of this client changes nothing
+            self.versions = {key: max(previous[key], new_versions[key]) for key in new_versions}
+        changed = {area for area in CHANGE_AREAS if new_versions[area] > previous[area]}
+        self._notify(changed)
+        return changed
+
+    def _notify(self, areas: Set[str]) -> None:
+        called = []
+        for area in areas:
+            for listener in self.listeners[area]:
+                if listener not in called:
+                    called.append(listener)
+        for listener in called:
+            listener(set(areas))
+
+    def start_polling(self) -> None:
+        """Poll in a background thread, so that listeners learn about changes without any read"""
+        threading.Thread(target=self._poll_loop, name="change-tracker-poll", daemon=True).start()
+
+    def _poll_loop(self) -> None:
+        while True:
+            self.wakeup.wait(self.check_interval)
+            self.wakeup.clear()
+            if self.stopped:
+                return
+            try:
+                self.poll(force=True)
+            except PyMongoError as e:
+                # Database unavailable, the next poll retries
+                print(f"Error checking for changes: {e}")
+
+    def watch(self) -> bool:
+        """Wake the polling thread on every version bump through a change stream
+
+        Returns:
+            False if the server does not support change streams (not a replica set)
+        """
+        try:
+            self.stream = self.collection.watch([{"$match": {"documentKey._id": CHANGES_DOC_ID}}])
+        except (PyMongoError, NotImplementedError, TypeError):
+            # Standalone server, or a stand-in without change streams (TypeError from mongomock)
+            return False
+
+        def run():
+            try:
+                for _ in self.stream:
+                    self.wakeup.set()
+            except PyMongoError as e:
+                if not self.stopped:
+                    # The polling thread still notices the changes
+                    print(f"Change stream stopped: {e}")
+
+        threading.Thread(target=run, name="change-tracker-watch", daemon=True).start()
+        return True
+
+    def stop(self) -> None:
+        """Stop the polling thread and the change stream"""
+        self.stopped = True
+        self.wakeup.set()
+        if self.stream is not None:
+            self.stream.close()
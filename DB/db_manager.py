@@ -1,21 +1,120 @@
 import os
+import re
 import time
-from pymongo import MongoClient
-from typing import List, Dict, Any, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from pymongo import MongoClient, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
+from itertools import permutations
+from typing import List, Dict, Any, Optional, Tuple, Iterator, Callable
+from utils.video_metadata import extract_metadata
+from utils.name_index import name_grams, normalize_name
+from DB.tag_cache import TagQueryCache, TopTagsCache
+from DB.fuzzy_index import FuzzyTagIndex, allowed_distance
+from DB.write_behind import DEFAULT_JOURNAL_PATH, WriteBehindQueue
+from DB.change_tracker import ChangeTracker
+from DB.saved_searches import SavedSearches
 
 # Define video file extensions
 VIDEO_EXTENSIONS = ['.mp4', '.avi', '.mkv', '.mov', '.wmv', '.flv', '.webm', '.m4v', '.3gp', '.mpeg', '.mpg']
 
+# Maximum number of paths sent in a single "$in" query or bulk write
+DB_BATCH_SIZE = 1000
+
+# Number of threads reading video headers in parallel (the work is I/O bound)
+METADATA_WORKERS = 8
+
+# Range filters accepted by the tag searches, mapped to their document field
+RANGE_FIELDS = {
+    "size": "size",
+    "lastModifyTime": "lastModifyTime",
+    "duration": "meta.duration",
+    "height": "meta.height"
+}
+
+# Number of most used tags kept in memory (must cover every get_top_tags limit used by the GUI)
+TOP_TAGS_CACHE_SIZE = 200
+
+# Memory budget of the cached tag search results, in bytes
+QUERY_CACHE_BYTES = 64 * 1024 * 1024
+
+# Seconds operations reading many tags wait for the pending write-behind edits to be written
+WRITE_BEHIND_SYNC_TIMEOUT = 10.0
+
+# Number of candidates fetched per suggestion slot when re-ranking them by co-occurrence
+CONTEXT_CANDIDATE_FACTOR = 5
+
+# Accumulators computing the count and statistics of a tag from its videos
+TAG_STATS_GROUP = {
+    "count": {"$sum": 1},
+    "totalSize": {"$sum": "$size"},
+    "totalDuration": {"$sum": {"$ifNull": ["$meta.duration", 0]}},
+    "latestModifyTime": {"$max": "$lastModifyTime"}
+}
+# Fields of the tag documents the top tags can be sorted by
+TAG_SORT_FIELDS = ["count", "totalSize", "totalDuration", "latestModifyTime"]
+
+# Fields returned by the searches (fingerprints and name bigrams are never needed by the views)
+VIDEO_PROJECTION = {"_id": 0, "fingerprint": 0, "nameGrams": 0, "normName": 0}
+
+
+def iter_video_files(root_path: str) -> Iterator[os.DirEntry]:
+    """Yield a DirEntry for every video file below root_path (iterative, no recursion limit)"""
+    pending = [root_path]
+    while pending:
+        folder_path = pending.pop()
+        try:
+            with os.scandir(folder_path) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            pending.append(entry.path)
+                        elif os.path.splitext(entry.name.lower())[1] in VIDEO_EXTENSIONS:
+                            yield entry
+                    except OSError as e:
+                        print(f"Error getting file info: {e}, filename: {entry.name}, path: {entry.path}")
+        except OSError as e:
+            print(f"Error scanning directory: {e}, path: {folder_path}")
+
+
+def path_ancestors(path: str) -> List[str]:
+    """Return every folder containing path, outermost first (standardized paths in, standardized paths out)"""
+    ancestors = []
+    current = path
+    while True:
+        parent = os.path.dirname(current)
+        if not parent or parent == current:
+            break
+        ancestors.append(parent)
+        current = parent
+    ancestors.reverse()
+    return ancestors
+
 
 class FileInfoItem:
     def __init__(self, name: str, fullPath: str, size: float, lastModifyTime: float,
-                 isDir: bool = False, tags: List[str] = None):
+                 isDir: bool = False, tags: List[str] = None, meta: Dict[str, Any] = None):
         self.name = name
         self.path = fullPath
         self.size = size
         self.lastModifyTime = lastModifyTime
         self.isDir = isDir
         self.tags = tags if tags else []
+        self.set_meta(meta)
+        # Folders only: number of tagged videos below them and their most used tags
+        self.taggedCount = 0
+        self.topTags = []
+        # Tags inherited from the tagged folders above the item (not stored on the item)
+        self.inheritedTags = []
+        # Library the item was found in, only set by searches across libraries (see DB/federated_search.py)
+        self.library = None
+
+    def set_meta(self, meta: Optional[Dict[str, Any]]):
+        """Set the video metadata read from the container headers"""
+        meta = meta or {}
+        self.duration = meta.get("duration")
+        self.width = meta.get("width")
+        self.height = meta.get("height")
+        self.codec = meta.get("codec")
 
     def getDateFormatted(self) -> str:
         time_obj = time.localtime(self.lastModifyTime)
@@ -35,6 +134,18 @@ class FileInfoItem:
         # Keep two decimal places
         return f"{size:.2f} {units[unit_index]}"
 
+    def getDurationFormatted(self) -> str:
+        if self.duration is None:
+            return ""
+        minutes, seconds = divmod(int(self.duration), 60)
+        hours, minutes = divmod(minutes, 60)
+        return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+    def getResolutionFormatted(self) -> str:
+        if not self.width or not self.height:
+            return ""
+        return f"{self.width}x{self.height}"
+
     def to_dict(self) -> Dict:
         """Convert object to dictionary for MongoDB storage"""
         return {
@@ -43,7 +154,15 @@ class FileInfoItem:
             "size": self.size,
             "lastModifyTime": self.lastModifyTime,
             "isDir": self.isDir,
-            "tags": self.tags
+            "tags": self.tags,
+            "meta": {
+                "size": self.size,
+                "lastModifyTime": self.lastModifyTime,
+                "duration": self.duration,
+                "width": self.width,
+                "height": self.height,
+                "codec": self.codec
+            }
         }
 
     @classmethod
@@ -55,52 +174,551 @@ class FileInfoItem:
             size=data["size"],
             lastModifyTime=data["lastModifyTime"],
             isDir=data["isDir"],
-            tags=data.get("tags", [])
+            tags=data.get("tags", []),
+            meta=data.get("meta")
         )
 
 
 class DBManager:
-    def __init__(self, db_url: str = "mongodb://localhost:27017/"):
-        self.client = MongoClient(db_url)
-        self.db = self.client["video_tag_db"]
+    def __init__(self, db_url: str = "mongodb://localhost:27017/", db_name: str = "video_tag_db",
+                 client: Optional[MongoClient] = None):
+        """
+        Args:
+            db_url: MongoDB connection string, ignored when client is given
+            db_name: Name of the database holding the collections
+            client: Already connected client (or a compatible stand-in such as mongomock)
+        """
+        self.client = client if client is not None else MongoClient(db_url)
+        self.db = self.client[db_name]
         # Collection for tags
         self.tags_collection = self.db["tags"]
         # Collection for video files
         self.videos_collection = self.db["videos"]
+        # Collection for tag co-occurrence: one document per ordered pair of tags used together
+        self.tag_pairs_collection = self.db["tag_pairs"]
+        # Collection for schema flags, build stamps and the version counters of the change tracker
+        self.meta_collection = self.db["meta"]
+        # Collection for folder tags: stored once per folder, inherited by every video below it
+        self.folders_collection = self.db["folders"]
+        # Collection for the path rules tagging videos by folder and file name conventions
+        self.path_rules_collection = self.db["path_rules"]
 
         # Ensure indexes for faster queries
         self.videos_collection.create_index("path", unique=True)
         self.tags_collection.create_index("name", unique=True)
+        self.tags_collection.create_index([("count", -1)])
+        for field in TAG_SORT_FIELDS[1:]:
+            self.tags_collection.create_index([(field, -1)])
+        # Only present once the database uses integer tag ids (see DB/tag_id_migration.py)
+        self.tags_collection.create_index("tagId", unique=True, sparse=True)
+        self.tag_pairs_collection.create_index([("a", 1), ("b", 1)], unique=True)
+        self.tag_pairs_collection.create_index([("a", 1), ("count", -1)])
+        # Multikey index over the name bigrams, the library-wide filename index
+        self.videos_collection.create_index("nameGrams")
+        # Folder hierarchy: folder-scoped queries are index scans instead of path regexes
+        self.videos_collection.create_index("parentDir")
+        self.videos_collection.create_index("ancestors")
+        # Compound indexes so range filters are evaluated inside the tag index scan
+        for field in RANGE_FIELDS.values():
+            self.videos_collection.create_index([("tags", 1), (field, 1)])
+        self.folders_collection.create_index("path", unique=True)
+        self.folders_collection.create_index("tags")
+        self.folders_collection.create_index("ancestors")
+
+        # Journaled queue of the tag edits made by the GUI, see enable_write_behind
+        self.write_behind = None
+
+        # Cached top tags, invalidated when another client changes the tags
+        self.top_tags_cache = TopTagsCache(TOP_TAGS_CACHE_SIZE)
+        # Typo-tolerant index over every tag name, built on first use
+        self.fuzzy_index = FuzzyTagIndex()
+        # Results of recent tag searches, dropped per tag by the write paths
+        self.query_cache = TagQueryCache(QUERY_CACHE_BYTES)
+        # Version counters bumped by every write path, other clients' writes invalidate the caches they affect
+        self.changes = ChangeTracker(self.meta_collection)
+        self.changes.subscribe(["tags"], self._on_remote_tag_change)
+        # Another client's write does not say which tags it changed
+        self.changes.subscribe(["tags", "videos", "folders"], lambda areas: self.query_cache.invalidate())
+        # Saved tag searches shown as smart folders, their members are kept current by the write paths
+        self.saved_searches = SavedSearches(self)
+
+        # Optional schema where videos store integer tag ids instead of tag names;
+        # translated at the boundaries of this class through an in-memory dictionary
+        schema = self.meta_collection.find_one({"_id": "schema"}) or {}
+        self.use_tag_ids = schema.get("tagIds", False)
+        self.tag_id_by_name = {}
+        self.tag_name_by_id = {}
+        if self.use_tag_ids:
+            self._load_tag_ids({})
+
+        # Build the co-occurrence model and tag statistics once for databases created before them
+        if not self.meta_collection.find_one({"_id": "tag_pairs"}):
+            self.rebuild_tag_pairs()
+        if not self.meta_collection.find_one({"_id": "tag_stats"}):
+            self.recompute_tag_stats()
+        if not self.meta_collection.find_one({"_id": "path_index"}):
+            self.backfill_path_index()
 
     def is_video_file(self, filepath: str) -> bool:
         """Check if file is a video file based on extension"""
         _, ext = os.path.splitext(filepath.lower())
         return ext in VIDEO_EXTENSIONS
 
+    @property
+    def tags_version(self) -> int:
+        """Version of the tags, changes whenever any client changes a tag name or count"""
+        return self.changes.version("tags")
+
+    def _on_remote_tag_change(self, areas) -> None:
+        """Drop the tag caches after another client changed the tags"""
+        self.top_tags_cache.invalidate()
+        self.fuzzy_index.invalidate()
+        # Tags may have been renamed or merged, the id dictionary is refilled on demand
+        self.tag_id_by_name.clear()
+        self.tag_name_by_id.clear()
+        # The other client may have migrated the tags to integer ids (or back), writes must follow the schema
+        schema = self.meta_collection.find_one({"_id": "schema"}) or {}
+        use_tag_ids = schema.get("tagIds", False)
+        if use_tag_ids != self.use_tag_ids:
+            self.use_tag_ids = use_tag_ids
+            self.query_cache.invalidate()
+            if use_tag_ids:
+                self._load_tag_ids({})
+
+    def _load_tag_ids(self, query: Dict[str, Any]) -> None:
+        """Add the ids of the tags matching the query to the in-memory dictionary"""
+        for doc in self.tags_collection.find(dict(query, tagId={"$exists": True}), {"name": 1, "tagId": 1, "_id": 0}):
+            self.tag_id_by_name[doc["name"]] = doc["tagId"]
+            self.tag_name_by_id[doc["tagId"]] = doc["name"]
+
+    def _encode_tags(self, tags: List[str], create: bool = False) -> List[Any]:
+        """Translate tag names to the values stored in video documents
+
+        Without integer ids this is the identity. With them, unknown names are
+        dropped (no video can have them) unless create is True, in which case
+        ids are allocated for them.
+
+        Args:
+            tags: Tag names
+            create: Allocate ids for tags that do not exist yet (write paths)
+
+        Returns:
+            Stored values, in the order of the given names
+        """
+        if not self.use_tag_ids:
+            return list(tags)
+
+        if create:
+            # Write paths always check the database, the tag may have been renamed or deleted meanwhile
+            for tag in tags:
+                self.tag_id_by_name.pop(tag, None)
+            self._load_tag_ids({"name": {"$in": list(tags)}})
+            missing = [tag for tag in dict.fromkeys(tags) if tag not in self.tag_id_by_name]
+            if missing:
+                self._allocate_tag_ids(missing)
+        else:
+            missing = [tag for tag in tags if tag not in self.tag_id_by_name]
+            if missing:
+                self._load_tag_ids({"name": {"$in": missing}})
+
+        return [self.tag_id_by_name[tag] for tag in tags if tag in self.tag_id_by_name]
+
+    def _decode_tags(self, values: List[Any]) -> List[str]:
+        """Translate the tags stored in a video document to tag names
+
+        Names are passed through, so documents not converted yet (or converted
+        back) by an interrupted migration still read correctly.
+        """
+        missing = [value for value in values if not isinstance(value, str) and value not in self.tag_name_by_id]
+        if missing:
+            self._load_tag_ids({"tagId": {"$in": missing}})
+        return [value if isinstance(value, str) else self.tag_name_by_id[value]
+                for value in values if isinstance(value, str) or value in self.tag_name_by_id]
+
+    def _decode_doc(self, doc: Dict[str, Any]) -> Dict[str, Any]:
+        """Replace the stored tags of a video document by tag names"""
+        if "tags" in doc:
+            doc["tags"] = self._decode_tags(doc["tags"])
+        return doc
+
+    def _allocate_tag_ids(self, tags: List[str]) -> None:
+        """Give new integer ids to tags, creating their tag documents if needed"""
+        counter = self.meta_collection.find_one_and_update(
+            {"_id": "tag_ids"},
+            {"$inc": {"next": len(tags)}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        first_id = counter["next"] - len(tags) + 1
+
+        operations = [
+            UpdateOne({"name": tag, "tagId": {"$exists": False}},
+                      {"$set": {"tagId": first_id + index}, "$setOnInsert": {"count": 0}},
+                      upsert=True)
+            for index, tag in enumerate(tags)
+        ]
+        try:
+            self.tags_collection.bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            # A tag that got an id from another client meanwhile fails the upsert, its id is kept
+            if any(error.get("code") != 11000 for error in e.details.get("writeErrors", [])):
+                raise
+
+        self._load_tag_ids({"name": {"$in": tags}})
+
     def get_top_tags(self, limit: int = 50) -> List[Dict[str, Any]]:
-        """Return the top N most used tags"""
-        return list(self.tags_collection.find().sort("count", -1).limit(limit))
+        """Return the top N most used tags (served from memory when possible)"""
+        self.changes.poll()
+        hit, top_tags = self.top_tags_cache.get(limit)
+        if hit:
+            return top_tags
+        return [{"name": doc["name"], "count": doc["count"]} for doc in self._load_top_tags(limit)]
+
+    def _load_top_tags(self, limit: int) -> List[Dict[str, Any]]:
+        """Read the most used tags with their statistics, refilling the cache when it covers the limit"""
+        projection = dict.fromkeys(["name"] + TAG_SORT_FIELDS, 1)
+        projection["_id"] = 0
+        tag_docs = list(self.tags_collection.find({}, projection)
+                        .sort("count", -1).limit(max(limit, TOP_TAGS_CACHE_SIZE)))
+        if limit <= TOP_TAGS_CACHE_SIZE:
+            self.top_tags_cache.load(tag_docs)
+        return tag_docs[:limit]
+
+    def get_top_tags_with_stats(self, limit: int = 50, sort_by: str = "count") -> List[Dict[str, Any]]:
+        """Return the top tags with their statistics, sorted by one of them
+
+        Served by the index of the sort field, never by an aggregation over the
+        videos. The default count order is served from the top tags cache,
+        which the write paths keep current with the statistics they read back.
+
+        Args:
+            limit: Maximum number of tags
+            sort_by: One of TAG_SORT_FIELDS (count, totalSize, totalDuration, latestModifyTime)
+
+        Returns:
+            List of tag documents (name, count, totalSize, totalDuration, latestModifyTime)
+        """
+        if sort_by not in TAG_SORT_FIELDS:
+            raise ValueError(f"Unsupported tag sort field: {sort_by}")
+        if sort_by == "count":
+            self.changes.poll()
+            hit, top_tags = self.top_tags_cache.get(limit, with_stats=True)
+            if hit:
+                return top_tags
+            return self._load_top_tags(limit)
+        projection = dict.fromkeys(["name"] + TAG_SORT_FIELDS, 1)
+        projection["_id"] = 0
+        return list(self.tags_collection.find({}, projection).sort(sort_by, -1).limit(limit))
+
+    def recompute_tag_stats(self) -> None:
+        """Recompute the count and statistics of every tag with one aggregation over the videos
+
+        Each tagged folder adds one to the count of its tags, without statistics.
+        """
+        pipeline = [
+            {"$match": {"tags.0": {"$exists": True}}},
+            {"$unwind": "$tags"},
+            {"$group": dict(TAG_STATS_GROUP, _id="$tags")}
+        ]
+
+        new_counts = {doc["name"]: 0 for doc in self.tags_collection.find({}, {"name": 1, "_id": 0})}
+        stats = {}
+        for doc in self.videos_collection.aggregate(pipeline, allowDiskUse=True):
+            name = self._decode_tags([doc.pop("_id")])
+            if name:
+                stats[name[0]] = doc
+        folder_pipeline = [{"$unwind": "$tags"}, {"$group": {"_id": "$tags", "count": {"$sum": 1}}}]
+        for doc in self.folders_collection.aggregate(folder_pipeline):
+            name = self._decode_tags([doc["_id"]])
+            if name:
+                tag_stats = stats.setdefault(name[0], {"count": 0, "totalSize": 0, "totalDuration": 0})
+                tag_stats["count"] += doc["count"]
+
+        operations = []
+        for name, doc in stats.items():
+            new_counts[name] = doc["count"]
+            update = {"$set": doc}
+            if self.use_tag_ids and name in self.tag_id_by_name:
+                update["$setOnInsert"] = {"tagId": self.tag_id_by_name[name]}
+            operations.append(UpdateOne({"name": name}, update, upsert=True))
+        for start in range(0, len(operations), DB_BATCH_SIZE):
+            self.tags_collection.bulk_write(operations[start:start + DB_BATCH_SIZE], ordered=False)
+
+        # Tags no longer used by any video or folder are deleted
+        unused = [name for name, count in new_counts.items() if count <= 0]
+        for start in range(0, len(unused), DB_BATCH_SIZE):
+            self.tags_collection.delete_many({"name": {"$in": unused[start:start + DB_BATCH_SIZE]}})
+
+        self.meta_collection.update_one({"_id": "tag_stats"}, {"$set": {"builtAt": time.time()}}, upsert=True)
+        self._publish_tag_counts(new_counts, ("videos", "folders"))
+
+    def _apply_tag_changes(self, changes: List[Tuple[List[str], List[str], Optional[Dict], Optional[Dict]]]) -> None:
+        """Update tag counts, statistics and co-occurrence after video documents were written
+
+        Args:
+            changes: One (tags before, tags after, document before, document after)
+                     tuple per changed video document; the documents (None when
+                     absent) provide the size, duration and modification time
+                     added to or removed from the statistics of the tags.
+                     Untagged videos are passed too, they can match searches
+                     through the tagged folders above them
+        """
+        stat_deltas = {}
+        added_times = {}
+        removed_times = {}
+        pair_deltas = {}
+
+        def add_stats(tag, sign, stats):
+            size, duration, last_modify_time = stats
+            delta = stat_deltas.setdefault(tag, {"count": 0, "totalSize": 0, "totalDuration": 0})
+            delta["totalSize"] += sign * size
+            delta["totalDuration"] += sign * duration
+            times = added_times if sign > 0 else removed_times
+            times[tag] = max(times.get(tag, last_modify_time), last_modify_time)
+
+        for old_tags, new_tags, old_doc, new_doc in changes:
+            old_tags, new_tags = set(old_tags), set(new_tags)
+            old_stats, new_stats = self._video_stats(old_doc), self._video_stats(new_doc)
+            for tag in old_tags:
+                if tag not in new_tags or old_stats != new_stats:
+                    add_stats(tag, -1, old_stats)
+            for tag in new_tags:
+                if tag not in old_tags or old_stats != new_stats:
+                    add_stats(tag, 1, new_stats)
+            for tag in new_tags - old_tags:
+                stat_deltas[tag]["count"] += 1
+            for tag in old_tags - new_tags:
+                stat_deltas[tag]["count"] -= 1
+
+            old_pairs, new_pairs = set(permutations(old_tags, 2)), set(permutations(new_tags, 2))
+            for pair in new_pairs - old_pairs:
+                pair_deltas[pair] = pair_deltas.get(pair, 0) + 1
+            for pair in old_pairs - new_pairs:
+                pair_deltas[pair] = pair_deltas.get(pair, 0) - 1
+
+        self._apply_tag_pair_deltas(pair_deltas)
+        self._apply_tag_stat_deltas(stat_deltas, added_times, removed_times)
+        # Cached results of a tag kept on a video list the tags it gained or lost
+        self.query_cache.bump(set().union(*(set(old_tags) | set(new_tags) for old_tags, new_tags, _, _ in changes)))
+        if changes:
+            # Any written video, tagged or not, can match searches through the tagged folders above them
+            self.query_cache.invalidate_folder_searches()
+        self.saved_searches.apply_video_changes(changes)
+
+    @staticmethod
+    def _video_stats(doc: Optional[Dict[str, Any]]) -> Tuple[float, float, float]:
+        """Return the (size, duration, lastModifyTime) a video document contributes to its tags"""
+        if not doc:
+            return 0, 0, 0
+        duration = (doc.get("meta") or {}).get("duration") or 0
+        return doc.get("size", 0), duration, doc.get("lastModifyTime", 0)
+
+    def _apply_tag_pair_deltas(self, deltas: Dict[Tuple[str, str], int]) -> None:
+        """Apply co-occurrence count changes in one bulk write, dropping pairs that reach zero"""
+        operations = []
+        for (tag_a, tag_b), delta in deltas.items():
+            if delta > 0:
+                operations.append(UpdateOne({"a": tag_a, "b": tag_b}, {"$inc": {"count": delta}}, upsert=True))
+            elif delta < 0:
+                operations.append(UpdateOne({"a": tag_a, "b": tag_b}, {"$inc": {"count": delta}}))
+        if not operations:
+            return
+
+        for start in range(0, len(operations), DB_BATCH_SIZE):
+            self.tag_pairs_collection.bulk_write(operations[start:start + DB_BATCH_SIZE], ordered=False)
+        if any(delta < 0 for delta in deltas.values()):
+            self.tag_pairs_collection.delete_many({"count": {"$lte": 0}})
+
+    def rebuild_tag_pairs(self) -> None:
+        """Recompute the whole co-occurrence model with one aggregation over the videos"""
+        pipeline = [
+            # Only videos with at least two tags produce pairs
+            {"$match": {"tags.1": {"$exists": True}}},
+            {"$project": {"_id": 0, "a": "$tags", "b": "$tags"}},
+            {"$unwind": "$a"},
+            {"$unwind": "$b"},
+            {"$match": {"$expr": {"$ne": ["$a", "$b"]}}},
+            {"$group": {"_id": {"a": "$a", "b": "$b"}, "count": {"$sum": 1}}},
+            {"$project": {"_id": 0, "a": "$_id.a", "b": "$_id.b", "count": 1}}
+        ]
+
+        self.tag_pairs_collection.delete_many({})
+        batch = []
+        for doc in self.videos_collection.aggregate(pipeline, allowDiskUse=True):
+            pair = self._decode_tags([doc["a"], doc["b"]])
+            if len(pair) == 2:
+                batch.append({"a": pair[0], "b": pair[1], "count": doc["count"]})
+            if len(batch) >= DB_BATCH_SIZE:
+                self.tag_pairs_collection.insert_many(batch, ordered=False)
+                batch = []
+        if batch:
+            self.tag_pairs_collection.insert_many(batch, ordered=False)
+
+        self.meta_collection.update_one({"_id": "tag_pairs"}, {"$set": {"builtAt": time.time()}}, upsert=True)
+
+    def get_related_tags(self, tags: List[str], limit: int = 10) -> List[Tuple[str, int]]:
+        """Return the tags most often used together with the given tags
+
+        Args:
+            tags: Tags to find related tags for
+            limit: Maximum number of related tags
+
+        Returns:
+            List of (tag name, number of videos sharing it with the given tags), best first
+        """
+        if not tags:
+            return []
+
+        scores = {}
+        for tag in tags:
+            # Top-k per tag, answered by the (a, count) index
+            for doc in self.tag_pairs_collection.find({"a": tag}, {"b": 1, "count": 1, "_id": 0}) \
+                    .sort("count", -1).limit(limit * CONTEXT_CANDIDATE_FACTOR):
+                if doc["b"] not in tags:
+                    scores[doc["b"]] = scores.get(doc["b"], 0) + doc["count"]
+
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+
+    def _apply_tag_stat_deltas(self, deltas: Dict[str, Dict[str, float]], added_times: Dict[str, float],
+                               removed_times: Dict[str, float], areas: Tuple[str, ...] = ("videos",)) -> None:
+        """Apply tag count and statistics changes computed by a write path
+
+        All tags are changed in one bulk write, tags that are no longer used
+        are deleted, and the in-memory caches are updated from the resulting
+        counts instead of being reloaded. The latest modification time only
+        needs the videos when the removed video was the latest of its tag,
+        it is then read back from the (tags, lastModifyTime) index.
+
+        Args:
+            deltas: Dictionary mapping tag name to the changes of its count,
+                    totalSize and totalDuration fields
+            added_times: Latest modification time of the videos added to each tag
+            removed_times: Latest modification time of the videos removed from each tag
+            areas: The data areas changed by the write, besides the tags
+        """
+        operations = []
+        for tag, delta in deltas.items():
+            increments = {field: value for field, value in delta.items() if value}
+            update = {}
+            if increments:
+                update["$inc"] = increments
+            if tag in added_times:
+                update["$max"] = {"latestModifyTime": added_times[tag]}
+            if not update:
+                continue
+            if delta["count"] > 0:
+                inserted_fields = {"name": tag}
+                if self.use_tag_ids and tag in self.tag_id_by_name:
+                    # Recreate the tag with the id already stored in the videos
+                    inserted_fields["tagId"] = self.tag_id_by_name[tag]
+                update["$setOnInsert"] = inserted_fields
+                operations.append(UpdateOne({"name": tag}, update, upsert=True))
+            else:
+                operations.append(UpdateOne({"name": tag}, update))
+        if not operations:
+            return
+        self.tags_collection.bulk_write(operations, ordered=False)
+
+        # Read back the resulting counts and statistics, missing tags count as deleted
+        new_counts = dict.fromkeys(deltas, 0)
+        new_stats = {}
+        stale_times = []
+        projection = dict.fromkeys(["name"] + TAG_SORT_FIELDS, 1)
+        projection["_id"] = 0
+        for doc in self.tags_collection.find({"name": {"$in": list(deltas)}}, projection):
+            new_counts[doc["name"]] = doc["count"]
+            new_stats[doc["name"]] = {field: doc[field] for field in TAG_SORT_FIELDS[1:] if field in doc}
+            if doc["count"] > 0 and doc["name"] in removed_times \
+                    and doc.get("latestModifyTime", 0) <= removed_times[doc["name"]]:
+                stale_times.append(doc["name"])
+
+        # Remove tags with count <= 0
+        if any(count <= 0 for count in new_counts.values()):
+            self.tags_collection.delete_many({"count": {"$lte": 0}})
+
+        if stale_times:
+            for tag, latest in self._refresh_latest_modify_times(stale_times).items():
+                new_stats[tag]["latestModifyTime"] = latest
+
+        self._publish_tag_counts(new_counts, areas, new_stats)
 
-    def search_similar_tags(self, query: str, limit: int = 10) -> List[str]:
+    def _refresh_latest_modify_times(self, tags: List[str]) -> Dict[str, float]:
+        """Recompute the latest modification time of tags from the newest of their videos
+
+        Returns:
+            The new latest modification time of each tag that still has videos
+        """
+        operations = []
+        latest_times = {}
+        for tag in tags:
+            encoded_tags = self._encode_tags([tag])
+            if not encoded_tags:
+                continue
+            latest = self.videos_collection.find_one({"tags": encoded_tags[0]}, {"lastModifyTime": 1, "_id": 0},
+                                                     sort=[("lastModifyTime", -1)])
+            if latest:
+                operations.append(UpdateOne({"name": tag}, {"$set": {"latestModifyTime": latest["lastModifyTime"]}}))
+                latest_times[tag] = latest["lastModifyTime"]
+        if operations:
+            self.tags_collection.bulk_write(operations, ordered=False)
+        return latest_times
+
+    def _publish_tag_counts(self, new_counts: Dict[str, int], areas: Tuple[str, ...] = ("videos",),
+                            new_stats: Optional[Dict[str, Dict[str, Any]]] = None) -> None:
+        """Update the in-memory caches with new tag counts and bump the version of the tags
+
+        Args:
+            new_counts: Dictionary mapping each changed tag to its new count (<= 0 means deleted)
+            areas: The other data areas changed by the write (see DB/change_tracker.py)
+            new_stats: New statistics fields of the changed tags, when the write read them back
+        """
+        self.top_tags_cache.apply_counts(new_counts, new_stats)
+        self.fuzzy_index.apply_counts(new_counts)
+        # Every tag whose count or statistics changed had videos (or folders) written
+        self.query_cache.bump(new_counts)
+        for tag, count in new_counts.items():
+            if count <= 0:
+                self.tag_id_by_name.pop(tag, None)
+
+        # Writes of other clients in between are detected by the bump and invalidate the caches
+        self.changes.bump("tags", *areas)
+
+    def search_similar_tags(self, query: str, limit: int = 10, with_counts: bool = False,
+                            context: Optional[List[str]] = None) -> List[Any]:
         """Find tags that match or are similar to the query
         
         Args:
-            query: Text to search for in tags
+            query: Text to search for in tags (matched literally, case-insensitive)
             limit: Maximum number of suggestions to return (default: 10)
+            with_counts: If True, return (name, count) tuples instead of names
+            context: Tags already entered; suggestions often used together with
+                     them are ranked first, and the context tags are excluded
         
         Returns:
             List of tag names that match the query
         """
-        if not query:
+        context = [tag for tag in (context or []) if tag]
+        if context:
+            suggestions = self._search_tags_in_context(query, limit, context)
+        elif not query:
             # If query is empty, just return top tags
-            top_tags = self.get_top_tags(limit)
-            return [tag["name"] for tag in top_tags]
-        
+            suggestions = [(tag["name"], tag["count"]) for tag in self.get_top_tags(limit)]
+        else:
+            suggestions = self._search_tags_by_text(query, limit)
+
+        if with_counts:
+            return suggestions
+        return [name for name, _ in suggestions]
+
+    def _search_tags_by_text(self, query: str, limit: int) -> List[Tuple[str, int]]:
+        """Tags starting with the query, then tags containing it, each group by count,
+        then tags within a few typos of it, by distance then count"""
         # First, look for tags that start with the query (higher priority)
-        prefix_pattern = f"^{query}"
+        escaped_query = re.escape(query)
+        prefix_pattern = f"^{escaped_query}"
         prefix_matches = list(self.tags_collection.find(
             {"name": {"$regex": prefix_pattern, "$options": "i"}},
-            {"name": 1, "_id": 0}
+            {"name": 1, "count": 1, "_id": 0}
         ).sort("count", -1).limit(limit))
 
         prefix_match_names = [tag["name"] for tag in prefix_matches]
@@ -108,16 +726,94 @@ class DBManager:
         # If we haven't reached the limit, look for tags that contain the query anywhere
         remaining_slots = limit - len(prefix_match_names)
         if remaining_slots > 0:
-            contains_pattern = f".*{query}.*"
+            contains_pattern = f".*{escaped_query}.*"
             contains_matches = list(self.tags_collection.find(
                 {"name": {"$regex": contains_pattern, "$options": "si", "$nin": prefix_match_names}},  # Exclude tags we already found
-                {"name": 1, "_id": 0}
+                {"name": 1, "count": 1, "_id": 0}
             ).sort("count", -1).limit(remaining_slots))
             
             # Combine both lists - prefix matches first, then contains matches
-            prefix_match_names.extend([tag["name"] for tag in contains_matches])
-        
-        return prefix_match_names
+            prefix_matches.extend(contains_matches)
+
+        suggestions = [(tag["name"], tag["count"]) for tag in prefix_matches]
+
+        # Fill the remaining slots with misspelled variants
+        remaining_slots = limit - len(suggestions)
+        if remaining_slots > 0 and allowed_distance(normalize_name(query)) > 0:
+            suggestions.extend(self.find_fuzzy_tags(query, remaining_slots, [name for name, _ in suggestions]))
+
+        return suggestions
+
+    def find_fuzzy_tags(self, query: str, limit: int = 10, exclude: Optional[List[str]] = None,
+                        build: bool = True) -> Optional[List[Tuple[str, int]]]:
+        """Find tags within a few typos of the query (edit distance, case-insensitive)
+
+        Args:
+            query: Possibly misspelled tag name
+            limit: Maximum number of matches
+            exclude: Tag names left out of the result
+            build: If False and the index is not in memory yet, return None instead
+                   of loading it (for callers on the GUI thread)
+
+        Returns:
+            List of (tag name, count), by distance then count
+        """
+        if build:
+            self.changes.poll()
+        if not self.fuzzy_index.loaded:
+            if not build:
+                return None
+            self._load_fuzzy_index()
+        return [(name, count) for name, count, _ in self.fuzzy_index.lookup(query, limit, exclude or [])]
+
+    def find_similar_tags(self) -> List[Tuple[str, int, str, int, int]]:
+        """Report pairs of tags whose names are probably duplicates (typos, case variants)
+
+        Returns:
+            List of (tag name, count, similar tag name, count, edit distance), closest first
+        """
+        self.changes.poll()
+        if not self.fuzzy_index.loaded:
+            self._load_fuzzy_index()
+        return self.fuzzy_index.similar_pairs()
+
+    def _load_fuzzy_index(self) -> None:
+        self.fuzzy_index.load((doc["name"], doc["count"])
+                              for doc in self.tags_collection.find({}, {"name": 1, "count": 1, "_id": 0}))
+
+    def _search_tags_in_context(self, query: str, limit: int, context: List[str]) -> List[Tuple[str, int]]:
+        """Rank text matches (or related tags for an empty query) by co-occurrence with the context"""
+        if not query:
+            related = self.get_related_tags(context, limit)
+            counts = {doc["name"]: doc["count"] for doc in self.tags_collection.find(
+                {"name": {"$in": [name for name, _ in related]}}, {"name": 1, "count": 1, "_id": 0})}
+            suggestions = [(name, counts.get(name, 0)) for name, _ in related]
+            # Fill the remaining slots with the most used tags
+            for tag in self.get_top_tags(limit + len(context)):
+                if len(suggestions) >= limit:
+                    break
+                if tag["name"] not in context and tag["name"] not in counts:
+                    suggestions.append((tag["name"], tag["count"]))
+            return suggestions
+
+        candidates = [candidate for candidate in
+                      self._search_tags_by_text(query, (limit + len(context)) * CONTEXT_CANDIDATE_FACTOR)
+                      if candidate[0] not in context]
+        if not candidates:
+            return []
+
+        scores = {}
+        for doc in self.tag_pairs_collection.find(
+                {"a": {"$in": context}, "b": {"$in": [name for name, _ in candidates]}},
+                {"b": 1, "count": 1, "_id": 0}):
+            scores[doc["b"]] = scores.get(doc["b"], 0) + doc["count"]
+
+        # Literal matches stay ahead of misspelled variants; the stable sort keeps
+        # the text ranking (prefix first, then by count) among equal scores
+        folded_query = query.casefold()
+        candidates.sort(key=lambda candidate: (folded_query not in candidate[0].casefold(),
+                                               -scores.get(candidate[0], 0)))
+        return candidates[:limit]
 
     def add_or_update_tags(self, file_path: str, tags: List[str], append: bool = True) -> None:
         """Add tags to a video file, update tag counts, and store file info
@@ -136,11 +832,13 @@ class DBManager:
 
         # Get file information
         file_stat = os.stat(file_path)
-        file_name = os.path.basename(file_path)
 
         # Get existing document if it exists
         existing_doc = self.videos_collection.find_one({"path": file_path})
-        existing_tags = existing_doc.get("tags", []) if existing_doc else []
+        existing_tags = self._decode_tags(existing_doc.get("tags", [])) if existing_doc else []
+
+        # Ignore duplicates in the requested tags
+        tags = list(dict.fromkeys(tags))
 
         # Determine final tags list (either append or replace)
         if append and existing_tags:
@@ -151,14 +849,13 @@ class DBManager:
             final_tags = tags
 
         # Create or update the file document
-        file_doc = {
-            "name": file_name,
-            "path": file_path,
-            "size": file_stat.st_size,
-            "lastModifyTime": file_stat.st_mtime,
-            "isDir": False,
-            "tags": final_tags
-        }
+        file_doc = self._build_file_doc(file_path, file_stat.st_size, file_stat.st_mtime)
+        file_doc["tags"] = self._encode_tags(final_tags, create=True)
+
+        # Read the video headers once, so duration and resolution filters can match this file
+        existing_meta = existing_doc.get("meta") if existing_doc else None
+        if not self._is_cache_valid(existing_meta, file_stat.st_size, file_stat.st_mtime):
+            file_doc["meta"] = self._build_meta_doc(file_path, file_stat.st_size, file_stat.st_mtime)
 
         # Update the videos collection (upsert means insert if not exists, update if exists)
         self.videos_collection.update_one(
@@ -167,30 +864,511 @@ class DBManager:
             upsert=True
         )
 
-        # Update tag counts in the tags collection for newly added tags
-        new_tags = [tag for tag in tags if tag not in existing_tags]
-        for tag in new_tags:
-            self.tags_collection.update_one(
-                {"name": tag},
-                {"$inc": {"count": 1}, "$setOnInsert": {"name": tag}},
-                upsert=True
+        # Update tag counts, statistics and co-occurrence from the tags the file gained and lost
+        new_doc = dict(file_doc, meta=file_doc.get("meta", existing_meta))
+        self._apply_tag_changes([(existing_tags, final_tags, existing_doc, new_doc)])
+
+    def enable_write_behind(self, journal_path: str = DEFAULT_JOURNAL_PATH,
+                            listener: Optional[Callable[[List[Tuple[str, str]]], None]] = None) -> None:
+        """Route queue_tags and queue_remove_tags through a journaled write-behind queue
+
+        Edits left in the journal by a previous run are written again.
+
+        Args:
+            journal_path: Local journal of the pending edits
+            listener: Called from the flush thread after each flush with the (path, error) of the dropped edits
+        """
+        if self.write_behind is None:
+            self.write_behind = WriteBehindQueue(self, journal_path, listener)
+
+    def close_write_behind(self, timeout: Optional[float] = None) -> bool:
+        """Write the pending edits and stop the queue; returns False if some edits stay in the journal"""
+        if self.write_behind is None:
+            return True
+        flushed = self.write_behind.close(timeout)
+        self.write_behind = None
+        return flushed
+
+    def flush_writes(self, timeout: Optional[float] = WRITE_BEHIND_SYNC_TIMEOUT) -> bool:
+        """Wait for the pending write-behind edits to be written; returns False on timeout"""
+        return self.write_behind.flush(timeout) if self.write_behind is not None else True
+
+    def queue_tags(self, file_path: str, tags: List[str], append: bool = True) -> None:
+        """Like add_or_update_tags, but written in the background when write-behind is enabled
+
+        The edit is journaled and visible in the tags read through this class
+        at once; the database, the tag counts and tag searches follow at the flush.
+
+        Raises:
+            FileNotFoundError: If the file does not exist
+        """
+        if self.write_behind is None:
+            self.add_or_update_tags(file_path, tags, append)
+            return
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"File not found: {file_path}")
+        self.write_behind.add_tags(file_path, tags, append)
+
+    def queue_remove_tags(self, file_path: str) -> None:
+        """Like remove_tags_from_file, but written in the background when write-behind is enabled"""
+        if self.write_behind is None:
+            self.remove_tags_from_file(file_path)
+        else:
+            self.write_behind.remove_tags(file_path)
+
+    def _apply_pending_tags(self, items: List[FileInfoItem]) -> None:
+        """Overlay the pending write-behind edits on the tags of listed videos"""
+        if self.write_behind is None or not self.write_behind.pending_count():
+            return
+        for item in items:
+            if not item.isDir:
+                item.tags = self.write_behind.effective_tags(self.get_path_standard_format(item.path), item.tags)
+
+    def bulk_add_tags(self, tags_by_path: Dict[str, List[str]]) -> int:
+        """Add tags to many video files in batched bulk writes
+
+        One read and one unordered bulk write per DB_BATCH_SIZE files, and one
+        tag count update per batch, instead of the round trips of
+        add_or_update_tags for every file. Files already having all their
+        tags are skipped.
+
+        Args:
+            tags_by_path: Dictionary mapping a video file path to the tags to add to it
+
+        Returns:
+            Number of videos that gained tags
+        """
+        items = [(self.get_path_standard_format(path), list(dict.fromkeys(tags)))
+                 for path, tags in tags_by_path.items() if tags]
+        changed = 0
+        for start in range(0, len(items), DB_BATCH_SIZE):
+            batch = items[start:start + DB_BATCH_SIZE]
+            existing = {doc["path"]: doc for doc in self.videos_collection.find(
+                {"path": {"$in": [path for path, _ in batch]}},
+                {"path": 1, "tags": 1, "size": 1, "lastModifyTime": 1, "meta": 1, "_id": 0}
+            )}
+
+            names = list(dict.fromkeys(tag for _, tags in batch for tag in tags))
+            encoded = dict(zip(names, self._encode_tags(names, create=True)))
+
+            operations = []
+            tag_changes = []
+            for path, tags in batch:
+                doc = existing.get(path)
+                old_tags = self._decode_tags(doc.get("tags", [])) if doc else []
+                added = [tag for tag in tags if tag not in old_tags]
+                if not added:
+                    continue
+                update = {"$addToSet": {"tags": {"$each": [encoded[tag] for tag in added]}}}
+                new_doc = doc
+                if doc is None:
+                    try:
+                        file_stat = os.stat(path)
+                    except OSError as e:
+                        print(f"Error getting file info: {e}, path: {path}")
+                        continue
+                    new_doc = self._build_file_doc(path, file_stat.st_size, file_stat.st_mtime)
+                    update["$set"] = new_doc
+                operations.append(UpdateOne({"path": path}, update, upsert=True))
+                # A created document has no previous state (it may already have matched searches through its folders)
+                tag_changes.append((old_tags, old_tags + added, doc, new_doc))
+
+            if operations:
+                self.videos_collection.bulk_write(operations, ordered=False)
+                self._apply_tag_changes(tag_changes)
+                changed += len(operations)
+        return changed
+
+    def bulk_remove_tags(self, file_paths: List[str], tags: Optional[List[str]] = None) -> int:
+        """Remove tags from many video files in batched bulk writes
+
+        The documents are kept (with their remaining tags, possibly none), so
+        the files stay indexed. Files having none of the tags are skipped.
+
+        Args:
+            file_paths: Paths of the video files
+            tags: Tags to remove, None removes every tag
+
+        Returns:
+            Number of videos that lost tags
+        """
+        paths = list(dict.fromkeys(self.get_path_standard_format(path) for path in file_paths))
+        removed_tags = set(tags) if tags is not None else None
+        changed = 0
+        for start in range(0, len(paths), DB_BATCH_SIZE):
+            operations = []
+            tag_changes = []
+            docs = self.videos_collection.find(
+                {"path": {"$in": paths[start:start + DB_BATCH_SIZE]}, "tags.0": {"$exists": True}},
+                {"path": 1, "tags": 1, "size": 1, "lastModifyTime": 1, "meta": 1, "_id": 0}
             )
+            for doc in docs:
+                old_tags = self._decode_tags(doc["tags"])
+                new_tags = [tag for tag in old_tags if removed_tags is not None and tag not in removed_tags]
+                if len(new_tags) == len(old_tags):
+                    continue
+                operations.append(UpdateOne({"path": doc["path"]},
+                                            {"$set": {"tags": self._encode_tags(new_tags)}}))
+                tag_changes.append((old_tags, new_tags, doc, doc))
+
+            if operations:
+                self.videos_collection.bulk_write(operations, ordered=False)
+                self._apply_tag_changes(tag_changes)
+                changed += len(operations)
+        return changed
+
+    def remove_stale_videos(self, root_path: Optional[str] = None, dry_run: bool = False) -> Iterator[str]:
+        """Delete the documents of videos and tagged folders that no longer exist on disk
+
+        Unlike a library scan, which keeps tagged documents of missing files,
+        this drops them and their tags. The documents are streamed and deleted
+        per batch of DB_BATCH_SIZE.
+
+        Args:
+            root_path: Only check the videos and folders below this folder (the whole library if None)
+            dry_run: Only report the stale paths
+
+        Yields:
+            Path of every stale video or folder, once its batch is deleted
+        """
+        query = {"ancestors": self.get_path_standard_format(root_path)} if root_path else {}
+        docs = self.videos_collection.find(
+            query, {"path": 1, "tags": 1, "size": 1, "lastModifyTime": 1, "meta": 1, "_id": 0}
+        ).batch_size(DB_BATCH_SIZE)
+
+        batch = []
+        for doc in docs:
+            if os.path.exists(doc["path"]):
+                continue
+            batch.append(doc)
+            if len(batch) >= DB_BATCH_SIZE:
+                yield from self._remove_video_docs(batch, dry_run)
+                batch = []
+        if batch:
+            yield from self._remove_video_docs(batch, dry_run)
+
+        folder_query = {"$or": [{"path": query["ancestors"]}, query]} if root_path else {}
+        for doc in list(self.folders_collection.find(folder_query, {"path": 1, "_id": 0})):
+            if not os.path.isdir(doc["path"]):
+                if not dry_run:
+                    self.remove_folder_tags(doc["path"])
+                yield doc["path"]
 
-        # If we're replacing tags, find and decrease count for tags that were removed
-        if not append and existing_tags:
-            removed_tags = [tag for tag in existing_tags if tag not in tags]
-            for tag in removed_tags:
-                self.tags_collection.update_one(
-                    {"name": tag},
-                    {"$inc": {"count": -1}}
-                )
-                # Remove tags with count <= 0
-                self.tags_collection.delete_many({"count": {"$lte": 0}})
+    def _remove_video_docs(self, docs: List[Dict[str, Any]], dry_run: bool) -> Iterator[str]:
+        """Delete video documents, updating the tags they carried, and yield their paths"""
+        if not dry_run:
+            self.videos_collection.delete_many({"path": {"$in": [doc["path"] for doc in docs]}})
+            self._apply_tag_changes([(self._decode_tags(doc.get("tags", [])), [], doc, None) for doc in docs])
+        for doc in docs:
+            yield doc["path"]
+
+    def get_path_rules(self) -> List[Dict[str, Any]]:
+        """Get the path rules, in the order they were saved (list of {"pattern", "tags"})"""
+        return list(self.path_rules_collection.find({}, {"_id": 0, "pattern": 1, "tags": 1}).sort("order", 1))
+
+    def save_path_rules(self, rules: List[Dict[str, Any]]) -> None:
+        """Replace the path rules (validate them with PathRuleSet first)"""
+        self.path_rules_collection.delete_many({})
+        if rules:
+            self.path_rules_collection.insert_many([
+                {"order": order, "pattern": rule["pattern"], "tags": rule["tags"]}
+                for order, rule in enumerate(rules)
+            ])
+        self.changes.bump("path_rules")
 
     def get_path_standard_format(self, path: str) -> str:
         """Standardize path format"""
         return os.path.normpath(path).replace("\\", "/")
 
+    def _build_file_doc(self, file_path: str, size: float, last_modify_time: float) -> Dict[str, Any]:
+        """Build the file information fields of a video document (everything except tags)"""
+        file_name = os.path.basename(file_path)
+        return {
+            "name": file_name,
+            "path": file_path,
+            "size": size,
+            "lastModifyTime": last_modify_time,
+            "isDir": False,
+            "nameGrams": name_grams(file_name),
+            # Name in the normalized form the bigrams are built from, matched by the server-side search
+            "normName": normalize_name(file_name),
+            "parentDir": os.path.dirname(file_path),
+            "ancestors": path_ancestors(file_path)
+        }
+
+    def backfill_path_index(self) -> None:
+        """Add parentDir and ancestors to the video documents written before they existed, in batches"""
+        while True:
+            docs = list(self.videos_collection.find({"ancestors": {"$exists": False}}, {"path": 1})
+                        .limit(DB_BATCH_SIZE))
+            if not docs:
+                break
+            self.videos_collection.bulk_write([
+                UpdateOne({"_id": doc["_id"]}, {"$set": {"parentDir": os.path.dirname(doc["path"]),
+                                                         "ancestors": path_ancestors(doc["path"])}})
+                for doc in docs
+            ], ordered=False)
+        self.meta_collection.update_one({"_id": "path_index"}, {"$set": {"builtAt": time.time()}}, upsert=True)
+
+    def get_folder_tag_stats(self, folder_path: str, top_tags: int = 3) -> Dict[str, Dict[str, Any]]:
+        """Count the tagged videos below each subfolder of a folder, with their most used tags
+
+        One aggregation for all subfolders: the videos below the folder are
+        selected through the ancestors index, and grouped by the ancestor one
+        level below the folder.
+
+        Args:
+            folder_path: Folder whose subfolders are summarized
+            top_tags: Number of most used tags returned per subfolder
+
+        Returns:
+            Dictionary mapping subfolder path to {"taggedCount": int, "topTags": [tag names]}
+        """
+        folder_path = self.get_path_standard_format(folder_path)
+        # Position of the subfolders in the ancestors of the videos below them
+        child_depth = len(path_ancestors(folder_path)) + 1
+
+        pipeline = [
+            {"$match": {"ancestors": folder_path, "tags.0": {"$exists": True}}},
+            {"$project": {"_id": 0, "tags": 1, "child": {"$arrayElemAt": ["$ancestors", child_depth]}}},
+            # Videos directly in the folder have no subfolder
+            {"$match": {"child": {"$exists": True}}},
+            {"$facet": {
+                "counts": [{"$group": {"_id": "$child", "count": {"$sum": 1}}}],
+                "tags": [
+                    {"$unwind": "$tags"},
+                    {"$group": {"_id": {"child": "$child", "tag": "$tags"}, "count": {"$sum": 1}}},
+                    {"$sort": {"count": -1, "_id.tag": 1}},
+                    {"$group": {"_id": "$_id.child", "tags": {"$push": "$_id.tag"}}},
+                    {"$project": {"tags": {"$slice": ["$tags", top_tags]}}}
+                ]
+            }}
+        ]
+
+        result = next(self.videos_collection.aggregate(pipeline, allowDiskUse=True))
+        stats = {doc["_id"]: {"taggedCount": doc["count"], "topTags": []} for doc in result["counts"]}
+        for doc in result["tags"]:
+            if doc["_id"] in stats:
+                stats[doc["_id"]]["topTags"] = self._decode_tags(doc["tags"])
+        return stats
+
+    def get_folder_tags(self, folder_path: str) -> List[str]:
+        """Get the tags applied to a folder itself (not those it inherits)"""
+        folder_path = self.get_path_standard_format(folder_path)
+        doc = self.folders_collection.find_one({"path": folder_path}, {"tags": 1, "_id": 0})
+        return self._decode_tags(doc.get("tags", [])) if doc else []
+
+    def add_or_update_folder_tags(self, folder_path: str, tags: List[str], append: bool = True) -> None:
+        """Tag a folder, every video below it inherits the tags at query time
+
+        The tags are stored once on the folder record, a single write whatever
+        the number of videos below the folder. A tagged folder adds one to the
+        count of each of its tags, the size and duration statistics only
+        describe the videos tagged directly.
+
+        Args:
+            folder_path: Path to the folder
+            tags: List of tags to add
+            append: If True, append new tags to existing ones; if False, replace existing tags
+        """
+        folder_path = self.get_path_standard_format(folder_path)
+        if not os.path.isdir(folder_path):
+            raise FileNotFoundError(f"Folder not found: {folder_path}")
+
+        tags = list(dict.fromkeys(tags))
+        if not append and not tags:
+            self.remove_folder_tags(folder_path)
+            return
+
+        encoded_tags = self._encode_tags(tags, create=True)
+        if append:
+            update = {"$addToSet": {"tags": {"$each": encoded_tags}}}
+        else:
+            update = {"$set": {"tags": encoded_tags}}
+        update["$setOnInsert"] = {"ancestors": path_ancestors(folder_path)}
+        existing_doc = self.folders_collection.find_one_and_update(
+            {"path": folder_path}, update, projection={"tags": 1, "_id": 0}, upsert=True
+        )
+
+        existing_tags = self._decode_tags(existing_doc.get("tags", [])) if existing_doc else []
+        final_tags = list(dict.fromkeys(existing_tags + tags)) if append else tags
+        self._apply_folder_tag_changes([(existing_tags, final_tags)])
+
+    def remove_folder_tags(self, folder_path: str, recursive: bool = False) -> None:
+        """Remove the tags of a folder, and of all folders below it if recursive is True"""
+        folder_path = self.get_path_standard_format(folder_path)
+        query = {"$or": [{"path": folder_path}, {"ancestors": folder_path}]} if recursive else {"path": folder_path}
+
+        changes = [(self._decode_tags(doc.get("tags", [])), [])
+                   for doc in self.folders_collection.find(query, {"tags": 1, "_id": 0})]
+        if not changes:
+            return
+        self.folders_collection.delete_many(query)
+        self._apply_folder_tag_changes(changes)
+
+    def _apply_folder_tag_changes(self, changes: List[Tuple[List[str], List[str]]]) -> None:
+        """Update tag counts after folder records were written, from (tags before, tags after) tuples"""
+        deltas = {}
+        for old_tags, new_tags in changes:
+            old_tags, new_tags = set(old_tags), set(new_tags)
+            for tag in old_tags ^ new_tags:
+                delta = deltas.setdefault(tag, {"count": 0, "totalSize": 0, "totalDuration": 0})
+                delta["count"] += 1 if tag in new_tags else -1
+        self._apply_tag_stat_deltas(deltas, {}, {}, ("folders",))
+        # Every video below the folders gained or lost the tags
+        if deltas:
+            self.saved_searches.rematerialize(list(deltas))
+
+    def _find_tagged_folders(self, encoded_tags: List[Any]) -> Dict[Any, List[str]]:
+        """Map each stored tag value to the paths of the folders carrying it"""
+        folders = {}
+        for doc in self.folders_collection.find({"tags": {"$in": encoded_tags}}, {"path": 1, "tags": 1, "_id": 0}):
+            for tag in doc["tags"]:
+                folders.setdefault(tag, []).append(doc["path"])
+        return folders
+
+    def _attach_folder_tags(self, items: List[FileInfoItem]) -> None:
+        """Fill the tags of folder items and the tags every item inherits from the folders above it
+
+        The folder records of all the items are read in batched "$in" queries.
+        """
+        if not items or self.folders_collection.find_one({}, {"_id": 1}) is None:
+            return
+
+        standard_paths = {item.path: self.get_path_standard_format(item.path) for item in items}
+        ancestors = {path: path_ancestors(standard_path) for path, standard_path in standard_paths.items()}
+        wanted = {folder for folders in ancestors.values() for folder in folders}
+        wanted.update(standard_paths[item.path] for item in items if item.isDir)
+
+        wanted = list(wanted)
+        folder_tags = {}
+        for start in range(0, len(wanted), DB_BATCH_SIZE):
+            for doc in self.folders_collection.find({"path": {"$in": wanted[start:start + DB_BATCH_SIZE]}},
+                                                    {"path": 1, "tags": 1, "_id": 0}):
+                folder_tags[doc["path"]] = self._decode_tags(doc.get("tags", []))
+
+        for item in items:
+            if item.isDir:
+                item.tags = folder_tags.get(standard_paths[item.path], [])
+            inherited = [tag for folder in ancestors[item.path] for tag in folder_tags.get(folder, [])
+                         if tag not in item.tags]
+            item.inheritedTags = list(dict.fromkeys(inherited))
+
+    def _find_inherited_tags(self, paths: List[str]) -> Dict[str, List[str]]:
+        """Map each video path to the tags it inherits from the tagged folders above it"""
+        if not paths or self.folders_collection.find_one({}, {"_id": 1}) is None:
+            return {}
+        ancestors = {path: path_ancestors(path) for path in paths}
+        wanted = list({folder for folders in ancestors.values() for folder in folders})
+        folder_tags = {}
+        for start in range(0, len(wanted), DB_BATCH_SIZE):
+            for doc in self.folders_collection.find({"path": {"$in": wanted[start:start + DB_BATCH_SIZE]}},
+                                                    {"path": 1, "tags": 1, "_id": 0}):
+                folder_tags[doc["path"]] = self._decode_tags(doc.get("tags", []))
+        return {path: list(dict.fromkeys(tag for folder in folders for tag in folder_tags.get(folder, [])))
+                for path, folders in ancestors.items()}
+
+    @staticmethod
+    def _is_cache_valid(cached: Optional[Dict[str, Any]], size: float, last_modify_time: float) -> bool:
+        """Check that a cached sub-document was computed for the current version of the file"""
+        return bool(cached) and cached.get("size") == size and cached.get("lastModifyTime") == last_modify_time
+
+    @staticmethod
+    def _build_meta_doc(file_path: str, size: float, last_modify_time: float) -> Dict[str, Any]:
+        """Read the video headers and build the cached metadata sub-document"""
+        meta_doc = {"size": size, "lastModifyTime": last_modify_time}
+        # Unsupported containers are cached too, so they are not parsed again
+        meta_doc.update(extract_metadata(file_path) or {})
+        return meta_doc
+
+    def apply_cached_metadata(self, file_infos: List[FileInfoItem]) -> List[FileInfoItem]:
+        """Fill duration, resolution and codec of the given files from the metadata cached in the videos collection
+
+        No file is read: metadata is only used when size and modification
+        time still match, see ensure_metadata for the files it returns.
+
+        Args:
+            file_infos: Files to complete (directories are ignored), updated in place
+
+        Returns:
+            The files without valid cached metadata
+        """
+        return self._apply_cached_metadata(file_infos)[0]
+
+    def _apply_cached_metadata(self, file_infos: List[FileInfoItem]
+                               ) -> Tuple[List[FileInfoItem], Dict[str, Dict[str, Any]]]:
+        """Like apply_cached_metadata, also returning the video documents read by path"""
+        files = [item for item in file_infos if not item.isDir]
+        paths = [item.path for item in files]
+
+        cached = {}
+        existing_docs = {}
+        for start in range(0, len(paths), DB_BATCH_SIZE):
+            docs = self.videos_collection.find(
+                {"path": {"$in": paths[start:start + DB_BATCH_SIZE]}},
+                {"path": 1, "meta": 1, "tags": 1, "size": 1, "lastModifyTime": 1, "_id": 0}
+            )
+            for doc in docs:
+                existing_docs[doc["path"]] = doc
+                if "meta" in doc:
+                    cached[doc["path"]] = doc["meta"]
+
+        missing = []
+        for item in files:
+            meta = cached.get(item.path)
+            if self._is_cache_valid(meta, item.size, item.lastModifyTime):
+                item.set_meta(meta)
+            else:
+                missing.append(item)
+        return missing, existing_docs
+
+    def ensure_metadata(self, file_infos: List[FileInfoItem]) -> int:
+        """Fill duration, resolution and codec of the given files
+
+        Metadata cached in the videos collection is reused when size and
+        modification time still match; the other files have their headers
+        parsed in a thread pool and the results are cached for next time.
+        This reads files and writes documents, the library scanner calls it
+        in the background (listings only use apply_cached_metadata).
+
+        Args:
+            file_infos: Files to complete (directories are ignored), updated in place
+
+        Returns:
+            Number of files whose headers were parsed
+        """
+        missing, existing_docs = self._apply_cached_metadata(file_infos)
+        if not missing:
+            return 0
+
+        with ThreadPoolExecutor(max_workers=METADATA_WORKERS) as executor:
+            meta_docs = list(executor.map(
+                lambda item: self._build_meta_doc(item.path, item.size, item.lastModifyTime), missing))
+
+        operations = []
+        tag_changes = []
+        for item, meta_doc in zip(missing, meta_docs):
+            item.set_meta(meta_doc)
+            file_doc = self._build_file_doc(item.path, item.size, item.lastModifyTime)
+            file_doc["tags"] = []
+            operations.append(UpdateOne(
+                {"path": item.path},
+                {"$set": {"meta": meta_doc}, "$setOnInsert": file_doc},
+                upsert=True
+            ))
+            # A new duration changes the statistics of the tags of the video, and range filters may match it
+            existing_doc = existing_docs.get(item.path)
+            if existing_doc:
+                tags = self._decode_tags(existing_doc.get("tags", []))
+                tag_changes.append((tags, tags, existing_doc, dict(existing_doc, meta=meta_doc)))
+            else:
+                tag_changes.append(([], [], None, dict(file_doc, meta=meta_doc)))
+        for start in range(0, len(operations), DB_BATCH_SIZE):
+            self.videos_collection.bulk_write(operations[start:start + DB_BATCH_SIZE], ordered=False)
+        if tag_changes:
+            self._apply_tag_changes(tag_changes)
+        return len(missing)
+
     def get_total_size_and_latest_mod_time(self, folder_path: str) -> Tuple[float, float]:
         """Calculate total size and latest modified time for video files in a directory"""
         total_size = 0.0
@@ -252,86 +1430,514 @@ class DBManager:
                     elif self.is_video_file(entry.name):
                         try:
                             file_info = entry.stat()
-                            file_path = self.get_path_standard_format(entry.path)
-
-                            # Check if this video exists in database and has tags
-                            video_doc = self.videos_collection.find_one({"path": file_path})
-                            tags = video_doc.get("tags", []) if video_doc else []
-
                             result_list.append(FileInfoItem(
                                 entry.name,
-                                file_path,
+                                self.get_path_standard_format(entry.path),
                                 file_info.st_size,
                                 file_info.st_mtime,
-                                False,
-                                tags
+                                False
                             ))
                         except OSError as e:
                             print(f"Error getting file info: {e}, filename: {entry.name}, path: {entry.path}")
         except OSError as e:
             print(f"Error scanning directory: {e}, path: {current_path}")
 
+        # Tagged video counts and most used tags of all subfolders in one aggregation
+        folders = [item for item in result_list if item.isDir]
+        if folders:
+            folder_stats = self.get_folder_tag_stats(current_path)
+            for item in folders:
+                stats = folder_stats.get(self.get_path_standard_format(item.path))
+                if stats:
+                    item.taggedCount = stats["taggedCount"]
+                    item.topTags = stats["topTags"]
+
+        # Look up tags for all videos of the folder in batched queries
+        files = [item for item in result_list if not item.isDir]
+        tags_by_path = self.get_tags_for_files([item.path for item in files])
+        for item in files:
+            item.tags = tags_by_path.get(item.path, [])
+        self._attach_folder_tags(result_list)
+
+        # Headers of new or changed files are parsed by the library scan, not while browsing
+        self.apply_cached_metadata(files)
+
         return result_list
 
-    def find_videos_by_tag(self, tag: str) -> List[FileInfoItem]:
-        """Find all videos that have the specified tag"""
-        videos = []
+    @staticmethod
+    def _build_range_query(ranges: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]]) -> Dict[str, Any]:
+        """Translate range filters into MongoDB predicates
 
-        # Find all videos with this tag
-        video_docs = self.videos_collection.find({"tags": tag})
+        Args:
+            ranges: Dictionary mapping a key of RANGE_FIELDS to a (minimum, maximum)
+                    tuple, either bound may be None
 
-        for doc in video_docs:
-            # Verify the file still exists
-            if os.path.exists(doc["path"]):
-                videos.append(FileInfoItem.from_dict(doc))
+        Returns:
+            Query fragment to merge into a find filter
+        """
+        query = {}
+        for name, (minimum, maximum) in (ranges or {}).items():
+            if name not in RANGE_FIELDS:
+                raise ValueError(f"Unsupported range filter: {name}")
+            predicate = {}
+            if minimum is not None:
+                predicate["$gte"] = minimum
+            if maximum is not None:
+                predicate["$lte"] = maximum
+            if predicate:
+                query[RANGE_FIELDS[name]] = predicate
+        return query
 
-        return videos
+    @staticmethod
+    def _range_value(doc: Optional[Dict[str, Any]], name: str) -> Any:
+        """Value of the field of a range filter (a key of RANGE_FIELDS) in a video document, None if absent"""
+        value = doc
+        for part in RANGE_FIELDS[name].split("."):
+            if not isinstance(value, dict):
+                return None
+            value = value.get(part)
+        return value
 
-    def find_videos_by_tags(self, tags: List[str]) -> List[FileInfoItem]:
+    def find_videos_by_tag(self, tag: str,
+                           ranges: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None
+                           ) -> List[FileInfoItem]:
+        """Find all videos that have the specified tag, optionally within the given ranges"""
+        return self.find_videos_by_tags([tag], ranges)
+
+    def find_videos_by_tags(self, tags: List[str],
+                            ranges: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None
+                            ) -> List[FileInfoItem]:
         """Find all videos that have all the specified tags (AND operation)
 
+        A video has a tag when it carries it directly or inherits it from a
+        tagged folder above it. The tagged folders are resolved first, each tag
+        then matches {"tags": tag} or {"ancestors": {"$in": folders}}, both
+        served by an index.
+
+        Results are cached per tag set and range filters (see TagQueryCache):
+        repeating a search costs no query until a write changes one of its
+        tags, and the paths are not checked on disk again.
+
         Args:
             tags: List of tags that videos must all have
+            ranges: Optional range filters, see _build_range_query
 
         Returns:
             List of FileInfoItem objects for videos with all specified tags
         """
-        if not tags:
-            return []
+        self.changes.poll()
+        key = self.query_cache.make_key(tags, ranges)
+        docs = self.query_cache.get(key)
+        if docs is None:
+            snapshot = self.query_cache.snapshot(key)
+            query, uses_folders = self._build_tags_query(tags, ranges)
+            docs = list(self._find_existing_videos(query)) if query is not None else []
+            self.query_cache.put(key, snapshot, docs, uses_folders)
 
-        # Create a query that finds documents containing all the specified tags
-        query = {"tags": {"$all": tags}}
-        
-        # Find all videos matching the query
-        video_docs = self.videos_collection.find(query)
-        
+        videos = [FileInfoItem.from_dict(doc) for doc in docs]
+        self._apply_pending_tags(videos)
+        self._attach_folder_tags(videos)
+        return videos
+
+    def get_saved_search_items(self, name: str) -> List[FileInfoItem]:
+        """Return the videos of a saved search (smart folder) from its materialized members
+
+        The member paths are read through an index and their documents by
+        batched "$in" lookups on the path index, the search itself is not run.
+        """
+        paths = self.saved_searches.member_paths(name)
         videos = []
-        for doc in video_docs:
+        for start in range(0, len(paths), DB_BATCH_SIZE):
+            docs = self.videos_collection.find({"path": {"$in": paths[start:start + DB_BATCH_SIZE]}},
+                                               VIDEO_PROJECTION)
+            # Verify the files still exist
+            videos.extend(FileInfoItem.from_dict(self._decode_doc(doc))
+                          for doc in docs if os.path.exists(doc["path"]))
+        self._apply_pending_tags(videos)
+        self._attach_folder_tags(videos)
+        return videos
+
+    def iter_videos_by_tags(self, tags: List[str],
+                            ranges: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None
+                            ) -> Iterator[Dict[str, Any]]:
+        """Stream the documents of the existing videos having all the specified tags
+
+        Same matching as find_videos_by_tags, but the documents are yielded as
+        the cursor is read, so a result of any size is processed in constant
+        memory. The stored tags are decoded, inherited folder tags are not added.
+        """
+        query, _ = self._build_tags_query(tags, ranges)
+        if query is not None:
+            yield from self._find_existing_videos(query)
+
+    def _build_tags_query(self, tags: List[str],
+                          ranges: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]]
+                          ) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """Build the query of a tag search
+
+        Returns:
+            (query, whether a tag matches through tagged folders), the query
+            is None when a tag does not exist
+        """
+        tags = list(dict.fromkeys(tags))
+        encoded_tags = self._encode_tags(tags)
+        # A tag that does not exist matches no video
+        if not tags or len(encoded_tags) < len(tags):
+            return None, False
+
+        # Create a query that finds documents containing all the specified tags
+        tagged_folders = self._find_tagged_folders(encoded_tags)
+        direct_tags = [tag for tag in encoded_tags if tag not in tagged_folders]
+        inherited_clauses = [[{"tags": tag}, {"ancestors": {"$in": tagged_folders[tag]}}]
+                             for tag in encoded_tags if tag in tagged_folders]
+        query = {}
+        if direct_tags:
+            query["tags"] = {"$all": direct_tags}
+        if inherited_clauses:
+            # A top-level $or is planned branch by branch, each on its own index
+            query["$or"] = inherited_clauses[0]
+            if len(inherited_clauses) > 1:
+                query["$and"] = [{"$or": clause} for clause in inherited_clauses[1:]]
+        query.update(self._build_range_query(ranges))
+        return query, bool(inherited_clauses)
+
+    def _find_existing_videos(self, query: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """Stream the decoded documents matching a query whose file still exists"""
+        for doc in self.videos_collection.find(query, VIDEO_PROJECTION).batch_size(DB_BATCH_SIZE):
             # Verify the file still exists
             if os.path.exists(doc["path"]):
-                videos.append(FileInfoItem.from_dict(doc))
-                
+                yield self._decode_doc(doc)
+
+    def search_videos_by_name(self, text: str, limit: int = 5000) -> List[FileInfoItem]:
+        """Find videos anywhere in the indexed library whose name contains the text
+
+        Candidates are selected through the bigram index (every bigram of the
+        query must be present in the name), then checked for the actual
+        substring, so the match is exact but never scans the whole collection.
+        Single character queries fall back to a case-insensitive regex.
+
+        Args:
+            text: Name fragment to search for (case-insensitive, CJK supported)
+            limit: Maximum number of results
+
+        Returns:
+            List of FileInfoItem objects for the matching videos
+        """
+        query_text = normalize_name(text.strip())
+        if not query_text:
+            return []
+
+        if len(query_text) < 2:
+            query = {"name": {"$regex": re.escape(text.strip()), "$options": "i"}}
+        else:
+            query = {"nameGrams": {"$all": name_grams(query_text)}}
+
+        videos = []
+        for doc in self.videos_collection.find(query, VIDEO_PROJECTION):
+            if query_text in normalize_name(doc["name"]) and os.path.exists(doc["path"]):
+                videos.append(FileInfoItem.from_dict(self._decode_doc(doc)))
+                if len(videos) >= limit:
+                    break
+
+        self._apply_pending_tags(videos)
+        self._attach_folder_tags(videos)
         return videos
 
     def get_tags_for_file(self, file_path: str) -> List[str]:
         """Get all tags for a specific file"""
         file_path = self.get_path_standard_format(file_path)
         video_doc = self.videos_collection.find_one({"path": file_path})
-        return video_doc.get("tags", []) if video_doc else []
+        tags = self._decode_tags(video_doc.get("tags", [])) if video_doc else []
+        return self.write_behind.effective_tags(file_path, tags) if self.write_behind is not None else tags
+
+    def get_tags_for_files(self, file_paths: List[str]) -> Dict[str, List[str]]:
+        """Get the tags of many files at once (batched "$in" queries instead of one query per file)"""
+        file_paths = [self.get_path_standard_format(path) for path in file_paths]
+        result = {}
+        for start in range(0, len(file_paths), DB_BATCH_SIZE):
+            docs = self.videos_collection.find(
+                {"path": {"$in": file_paths[start:start + DB_BATCH_SIZE]}},
+                {"path": 1, "tags": 1, "_id": 0}
+            )
+            for doc in docs:
+                result[doc["path"]] = self._decode_tags(doc.get("tags", []))
+
+        if self.write_behind is not None:
+            for path in set(file_paths).intersection(self.write_behind.pending_paths()):
+                result[path] = self.write_behind.effective_tags(path, result.get(path, []))
+        return result
 
     def remove_tags_from_file(self, file_path: str) -> None:
         """Remove a tag from a file and update tag counts"""
         file_path = self.get_path_standard_format(file_path)
 
-        # Decrease the tag count
-        for tag in self.get_tags_for_file(file_path):
-            self.tags_collection.update_one(
-                {"name": tag},
-                {"$inc": {"count": -1}}
+        # Remove the video from the database
+        video_doc = self.videos_collection.find_one_and_delete({"path": file_path})
+        if not video_doc:
+            return
+
+        # Decrease the tag counts and statistics (tags reaching zero are removed)
+        tags = self._decode_tags(video_doc.get("tags", []))
+        self._apply_tag_changes([(tags, [], video_doc, None)])
+
+    def rename_tag(self, old_tag: str, new_tag: str) -> int:
+        """Rename a tag on every video (merges into new_tag if it already exists)
+
+        With integer tag ids, renaming to a new name only rewrites the tag
+        document and its co-occurrence documents, the videos are unchanged.
+
+        Returns:
+            Number of videos carrying the renamed tag
+        """
+        return self.merge_tags([old_tag], new_tag)
+
+    def merge_tags(self, source_tags: List[str], target_tag: str) -> int:
+        """Replace the source tags by target_tag on every video, server-side
+
+        The videos and tagged folders are rewritten by two update_many calls
+        each whatever their number ($addToSet then $pull, so videos that had
+        several of the tags end up with target_tag once). Counts and
+        co-occurrence of the tags involved are then recomputed from the
+        indexed tag field.
+
+        Args:
+            source_tags: Tags to replace
+            target_tag: Tag replacing them (created if it does not exist)
+
+        Returns:
+            Number of videos changed
+        """
+        target_tag = target_tag.strip()
+        source_tags = [tag for tag in dict.fromkeys(source_tags) if tag and tag != target_tag]
+        if not target_tag or not source_tags:
+            return 0
+        # Pending edits could still add the source tags back
+        self.flush_writes()
+
+        if self.use_tag_ids and len(source_tags) == 1 and not self.tags_collection.find_one({"name": target_tag}):
+            renamed = self._rename_tag_document(source_tags[0], target_tag)
+            if renamed is not None:
+                # Same videos under a new name, the members are unchanged
+                self.saved_searches.rename_tags(source_tags, target_tag)
+                return renamed
+
+        encoded_sources = self._encode_tags(source_tags)
+        if not encoded_sources:
+            return 0
+        encoded_target = self._encode_tags([target_tag], create=True)[0]
+
+        match = {"tags": {"$in": encoded_sources}}
+        self.videos_collection.update_many(match, {"$addToSet": {"tags": encoded_target}})
+        result = self.videos_collection.update_many(match, {"$pull": {"tags": {"$in": encoded_sources}}})
+        self.folders_collection.update_many(match, {"$addToSet": {"tags": encoded_target}})
+        self.folders_collection.update_many(match, {"$pull": {"tags": {"$in": encoded_sources}}})
+
+        # Count and statistics of the target are recomputed from its videos and folders
+        target_stats = next(self.videos_collection.aggregate([
+            {"$match": {"tags": encoded_target}},
+            {"$group": dict(TAG_STATS_GROUP, _id=None)}
+        ]), None)
+        if not target_stats or not target_stats["count"]:
+            # Only folders carry the target, there is no latest modification time to store
+            target_stats = {"_id": None, "count": 0, "totalSize": 0, "totalDuration": 0}
+        target_stats["count"] += self.folders_collection.count_documents({"tags": encoded_target})
+        target_count = target_stats["count"]
+        self.tags_collection.delete_many({"name": {"$in": source_tags}})
+        if target_count > 0:
+            del target_stats["_id"]
+            self.tags_collection.update_one({"name": target_tag}, {"$set": target_stats}, upsert=True)
+        else:
+            self.tags_collection.delete_one({"name": target_tag})
+
+        self._rebuild_tag_pairs_for(target_tag, encoded_target, source_tags)
+
+        new_counts = dict.fromkeys(source_tags, 0)
+        new_counts[target_tag] = target_count
+        self._publish_tag_counts(new_counts, ("videos", "folders"))
+        # Cached results of other tags hold the rewritten videos too, with their old tags
+        self.query_cache.invalidate()
+        self.saved_searches.rename_tags(source_tags, target_tag)
+        self.saved_searches.rematerialize([target_tag])
+        return result.modified_count
+
+    def _rename_tag_document(self, old_tag: str, new_tag: str) -> Optional[int]:
+        """Rename a tag that has an integer id without touching the videos
+
+        Returns:
+            Number of videos carrying the tag, or None if the tag has no id
+        """
+        doc = self.tags_collection.find_one_and_update(
+            {"name": old_tag, "tagId": {"$exists": True}},
+            {"$set": {"name": new_tag}}
+        )
+        if doc is None:
+            return None
+
+        self.tag_pairs_collection.update_many({"a": old_tag}, {"$set": {"a": new_tag}})
+        self.tag_pairs_collection.update_many({"b": old_tag}, {"$set": {"b": new_tag}})
+
+        self.tag_id_by_name.pop(old_tag, None)
+        self.tag_id_by_name[new_tag] = doc["tagId"]
+        self.tag_name_by_id[doc["tagId"]] = new_tag
+        self._publish_tag_counts({old_tag: 0, new_tag: doc["count"]})
+        # Cached results of other tags list the renamed tag on their videos
+        self.query_cache.invalidate()
+        return doc["count"]
+
+    def _rebuild_tag_pairs_for(self, tag: str, stored_tag: Any, removed_tags: List[str]) -> None:
+        """Recompute the co-occurrence of one tag, and drop that of tags that no longer exist
+
+        Pairs between other tags are unchanged by a merge, so only these are rebuilt.
+
+        Args:
+            tag: Name of the tag to rebuild
+            stored_tag: Value of the tag in video documents (its name or integer id)
+            removed_tags: Names of tags whose co-occurrence is dropped
+        """
+        names = [tag] + removed_tags
+        self.tag_pairs_collection.delete_many({"$or": [{"a": {"$in": names}}, {"b": {"$in": names}}]})
+
+        pipeline = [
+            {"$match": {"tags": stored_tag}},
+            {"$unwind": "$tags"},
+            {"$match": {"tags": {"$ne": stored_tag}}},
+            {"$group": {"_id": "$tags", "count": {"$sum": 1}}}
+        ]
+        batch = []
+        for doc in self.videos_collection.aggregate(pipeline, allowDiskUse=True):
+            other_tag = self._decode_tags([doc["_id"]])
+            if not other_tag:
+                continue
+            batch.append({"a": tag, "b": other_tag[0], "count": doc["count"]})
+            batch.append({"a": other_tag[0], "b": tag, "count": doc["count"]})
+            if len(batch) >= DB_BATCH_SIZE:
+                self.tag_pairs_collection.insert_many(batch, ordered=False)
+                batch = []
+        if batch:
+            self.tag_pairs_collection.insert_many(batch, ordered=False)
+
+    def get_cached_fingerprints(self, file_infos: List[FileInfoItem]) -> Dict[str, Dict[str, Any]]:
+        """Return the stored fingerprints that are still valid for the given files
+
+        A fingerprint is only returned if it was computed for the current size
+        and modification time of the file, so edited files are hashed again.
+
+        Args:
+            file_infos: Files to look up (path, size and lastModifyTime are used)
+
+        Returns:
+            Dictionary mapping file path to its fingerprint sub-document
+        """
+        by_path = {item.path: item for item in file_infos}
+        paths = list(by_path)
+        result = {}
+
+        for start in range(0, len(paths), DB_BATCH_SIZE):
+            docs = self.videos_collection.find(
+                {"path": {"$in": paths[start:start + DB_BATCH_SIZE]}, "fingerprint": {"$exists": True}},
+                {"path": 1, "fingerprint": 1, "_id": 0}
             )
+            for doc in docs:
+                fingerprint = doc["fingerprint"]
+                item = by_path[doc["path"]]
+                if fingerprint.get("size") == item.size and fingerprint.get("lastModifyTime") == item.lastModifyTime:
+                    result[doc["path"]] = fingerprint
 
-        # Remove the video from the database
-        self.videos_collection.delete_one({"path": file_path})
+        return result
+
+    def store_fingerprints(self, fingerprints: Dict[str, Dict[str, Any]]) -> None:
+        """Store fingerprints computed by the duplicate finder
+
+        Files without a document yet get an untagged one, so the fingerprint
+        can be reused on the next scan.
+
+        Args:
+            fingerprints: Dictionary mapping file path to a fingerprint sub-document
+                          (size, lastModifyTime, sampled and optionally full hash)
+        """
+        operations = []
+        for file_path, fingerprint in fingerprints.items():
+            update = {"$set": {"fingerprint": fingerprint}}
+            try:
+                file_stat = os.stat(file_path)
+                file_doc = self._build_file_doc(file_path, file_stat.st_size, file_stat.st_mtime)
+                file_doc["tags"] = []
+                update["$setOnInsert"] = file_doc
+            except OSError as e:
+                print(f"Error getting file info: {e}, path: {file_path}")
+                continue
+            operations.append(UpdateOne({"path": file_path}, update, upsert=True))
+
+        for start in range(0, len(operations), DB_BATCH_SIZE):
+            self.videos_collection.bulk_write(operations[start:start + DB_BATCH_SIZE], ordered=False)
+
+    def find_duplicate_groups(self) -> List[List[FileInfoItem]]:
+        """Group the stored videos whose fingerprints are identical
+
+        Uses the full hash when both sides have one, otherwise the sampled hash.
+        Only files that still exist on disk are returned.
+
+        Returns:
+            List of groups, each group being a list of at least two FileInfoItem objects
+        """
+        pipeline = [
+            {"$match": {"fingerprint.sampled": {"$exists": True}}},
+            {"$group": {
+                "_id": {"size": "$size", "sampled": "$fingerprint.sampled"},
+                "docs": {"$push": {
+                    "name": "$name", "path": "$path", "size": "$size", "lastModifyTime": "$lastModifyTime",
+                    "isDir": "$isDir", "tags": "$tags", "fingerprint": "$fingerprint"
+                }},
+                "count": {"$sum": 1}
+            }},
+            {"$match": {"count": {"$gt": 1}}}
+        ]
+
+        groups = []
+        for group in self.videos_collection.aggregate(pipeline, allowDiskUse=True):
+            # Split the sampled group further by full hash where available
+            by_full_hash = {}
+            for doc in group["docs"]:
+                if os.path.exists(doc["path"]):
+                    key = doc["fingerprint"].get("full")
+                    by_full_hash.setdefault(key, []).append(FileInfoItem.from_dict(self._decode_doc(doc)))
+
+            # Files without a full hash can only be attached to a single verified group
+            unverified = by_full_hash.pop(None, [])
+            if len(by_full_hash) == 1:
+                items = next(iter(by_full_hash.values())) + unverified
+                if len(items) > 1:
+                    groups.append(items)
+                continue
+
+            for items in by_full_hash.values():
+                if len(items) > 1:
+                    groups.append(items)
+            if len(unverified) > 1:
+                groups.append(unverified)
+
+        return groups
+
+    def merge_tags_for_files(self, file_paths: List[str]) -> List[str]:
+        """Give every file the union of the tags of all the given files
+
+        Typically used on a group of duplicate videos that were tagged separately.
+
+        Args:
+            file_paths: Paths of the files whose tags are merged
+
+        Returns:
+            The merged list of tags
+        """
+        self.flush_writes()
+        merged_tags = []
+        for file_path in file_paths:
+            for tag in self.get_tags_for_file(file_path):
+                if tag not in merged_tags:
+                    merged_tags.append(tag)
+
+        if merged_tags:
+            for file_path in file_paths:
+                self.add_or_update_tags(file_path, merged_tags, append=True)
 
-        # Remove tag if count reaches zero
-        self.tags_collection.delete_many({"count": {"$lte": 0}})
\ No newline at end of file
+        return merged_tags
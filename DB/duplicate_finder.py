@@ -0,0 +1,165 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional
+
+from DB.db_manager import DBManager, FileInfoItem, iter_video_files
+from utils.file_hash import compute_full_hash, compute_sampled_hash, is_sample_complete
+
+# Pipeline stages, reported to the progress callback
+STAGE_SIZE = "size"
+STAGE_SAMPLED = "sampled"
+STAGE_FULL = "full"
+
+
+def _hash_file(args):
+    """Worker function for the process pool (must stay at module level to be picklable)"""
+    file_path, full = args
+    try:
+        return file_path, (compute_full_hash(file_path) if full else compute_sampled_hash(file_path))
+    except OSError as e:
+        print(f"Error hashing file: {e}, path: {file_path}")
+        return file_path, None
+
+
+class DuplicateFinder:
+    """Find duplicate videos with a staged pipeline that reads as few bytes as possible
+
+    1. Group files by size (no file content read at all)
+    2. Hash a few sampled blocks of every file sharing its size with another file
+    3. Optionally stream the full content of the files still grouped together
+
+    Sampled and full hashes are cached in the videos collection, keyed by size
+    and modification time, so unchanged files are never read twice.
+    """
+    def __init__(self, db_manager: DBManager, max_workers: Optional[int] = None):
+        self.db_manager = db_manager
+        self.max_workers = max_workers
+        self.cancelled = False
+
+    def cancel(self):
+        """Stop the pipeline at the next checkpoint"""
+        self.cancelled = True
+
+    def find_duplicates_in_folder(self, root_path: str, full_hash: bool = False,
+                                  progress_callback: Optional[Callable[[str, int, int], None]] = None
+                                  ) -> List[List[FileInfoItem]]:
+        """Find duplicate videos anywhere below root_path
+
+        Args:
+            root_path: Folder to scan recursively
+            full_hash: If True, confirm sampled matches by hashing the whole files
+            progress_callback: Called with (stage, done, total) while the pipeline runs
+
+        Returns:
+            List of duplicate groups, each a list of at least two FileInfoItem objects
+        """
+        file_infos = []
+        for entry in iter_video_files(root_path):
+            try:
+                file_stat = entry.stat()
+            except OSError as e:
+                print(f"Error getting file info: {e}, filename: {entry.name}, path: {entry.path}")
+                continue
+            file_infos.append(FileInfoItem(
+                entry.name,
+                self.db_manager.get_path_standard_format(entry.path),
+                file_stat.st_size,
+                file_stat.st_mtime
+            ))
+            if progress_callback and len(file_infos) % 500 == 0:
+                progress_callback(STAGE_SIZE, len(file_infos), 0)
+            if self.cancelled:
+                return []
+
+        return self.find_duplicates(file_infos, full_hash, progress_callback)
+
+    def find_duplicates(self, file_infos: List[FileInfoItem], full_hash: bool = False,
+                        progress_callback: Optional[Callable[[str, int, int], None]] = None
+                        ) -> List[List[FileInfoItem]]:
+        """Run the staged pipeline over an already listed set of files"""
+        # Stage 1: group by size, empty files are never considered duplicates
+        by_size = {}
+        for item in file_infos:
+            if item.size > 0:
+                by_size.setdefault(item.size, []).append(item)
+        candidates = [item for group in by_size.values() if len(group) > 1 for item in group]
+        if progress_callback:
+            progress_callback(STAGE_SIZE, len(file_infos), len(file_infos))
+        if not candidates:
+            return []
+
+        # Stage 2: sampled hash, reusing cached fingerprints
+        fingerprints = self.db_manager.get_cached_fingerprints(candidates)
+        to_hash = [item for item in candidates if item.path not in fingerprints]
+        hashed = self._run_pool(to_hash, False, STAGE_SAMPLED, progress_callback)
+        for item in to_hash:
+            if hashed.get(item.path):
+                fingerprints[item.path] = {
+                    "size": item.size,
+                    "lastModifyTime": item.lastModifyTime,
+                    "sampled": hashed[item.path]
+                }
+        new_fingerprints = {path: fingerprints[path] for path in hashed if path in fingerprints}
+
+        groups = self._group_by(candidates, fingerprints, "sampled")
+
+        # Stage 3: full hash, only for large files still grouped together
+        if full_hash and not self.cancelled:
+            need_full = [item for group in groups for item in group
+                         if not is_sample_complete(item.size) and "full" not in fingerprints[item.path]]
+            hashed = self._run_pool(need_full, True, STAGE_FULL, progress_callback)
+            for path, digest in hashed.items():
+                if digest:
+                    fingerprints[path]["full"] = digest
+                    new_fingerprints[path] = fingerprints[path]
+
+            confirmed = []
+            for group in groups:
+                for item in group:
+                    # The sampled hash already covered the whole file
+                    if is_sample_complete(item.size):
+                        fingerprints[item.path].setdefault("full", fingerprints[item.path]["sampled"])
+                confirmed.extend(self._group_by(group, fingerprints, "full"))
+            groups = confirmed
+
+        if new_fingerprints:
+            self.db_manager.store_fingerprints(new_fingerprints)
+
+        # Attach the current tags so the caller can show and merge them
+        tags_by_path = self.db_manager.get_tags_for_files([item.path for group in groups for item in group])
+        for group in groups:
+            for item in group:
+                item.tags = tags_by_path.get(item.path, [])
+
+        return groups
+
+    def _run_pool(self, items: List[FileInfoItem], full: bool, stage: str,
+                  progress_callback: Optional[Callable[[str, int, int], None]]) -> Dict[str, Optional[str]]:
+        """Hash the given files in a process pool, reporting progress as results arrive"""
+        results = {}
+        if not items:
+            return results
+
+        total = len(items)
+        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [executor.submit(_hash_file, (item.path, full)) for item in items]
+            for done, future in enumerate(as_completed(futures), 1):
+                file_path, digest = future.result()
+                results[file_path] = digest
+                if progress_callback:
+                    progress_callback(stage, done, total)
+                if self.cancelled:
+                    for pending in futures:
+                        pending.cancel()
+                    break
+
+        return results
+
+    @staticmethod
+    def _group_by(items: List[FileInfoItem], fingerprints: Dict[str, Dict], key: str) -> List[List[FileInfoItem]]:
+        """Group files by size and the given fingerprint field, keeping groups of two or more"""
+        groups = {}
+        for item in items:
+            digest = fingerprints.get(item.path, {}).get(key)
+            if digest:
+                groups.setdefault((item.size, digest), []).append(item)
+        return [group for group in groups.values() if len(group) > 1]
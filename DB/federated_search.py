@@ -0,0 +1,72 @@
+import heapq
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Callable, Dict, List, Optional, Tuple
+
+from DB.db_manager import DBManager, FileInfoItem
+
+# Maximum number of libraries searched at the same time
+FEDERATED_WORKERS = 8
+
+# Sort keys of the merged results (unknown durations and resolutions sort first)
+SORT_KEYS: Dict[str, Callable[[FileInfoItem], object]] = {
+    "name": lambda item: item.name.upper(),
+    "size": lambda item: item.size,
+    "time": lambda item: item.lastModifyTime,
+    "duration": lambda item: item.duration or 0,
+    "resolution": lambda item: (item.width or 0) * (item.height or 0),
+}
+
+
+class FederatedSearch:
+    """Tag search across several libraries, merged into one sorted result
+
+    Each library is searched in its own thread through its DBManager (so
+    the per-library result cache applies), sorted by the requested key and
+    cut to the limit; the sorted results are then combined by a k-way merge
+    (heapq.merge), which only compares the heads of the k lists. With a
+    limit, no library returns more than the limit, the merge stops as soon
+    as it is reached.
+    """
+    def __init__(self, managers: Dict[str, DBManager], max_workers: int = FEDERATED_WORKERS):
+        """
+        Args:
+            managers: DBManager of each library to search, by library name
+            max_workers: Maximum number of libraries searched at the same time
+        """
+        self.managers = managers
+        self.max_workers = max_workers
+
+    def find_videos_by_tags(self, tags: List[str],
+                            ranges: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None,
+                            sort_by: str = "name", descending: bool = False,
+                            limit: Optional[int] = None) -> List[FileInfoItem]:
+        """Find the videos having all the tags in every library
+
+        Args:
+            tags: List of tags that videos must all have
+            ranges: Optional range filters, see DBManager._build_range_query
+            sort_by: One of SORT_KEYS
+            descending: Sort from the largest value
+            limit: Maximum number of videos returned, None for all
+
+        Returns:
+            The merged videos, each with its library set
+        """
+        if sort_by not in SORT_KEYS:
+            raise ValueError(f"Unsupported sort key: {sort_by}")
+        key = SORT_KEYS[sort_by]
+
+        def search(library):
+            videos = self.managers[library].find_videos_by_tags(tags, ranges)
+            for item in videos:
+                item.library = library
+            videos.sort(key=key, reverse=descending)
+            return videos[:limit] if limit is not None else videos
+
+        libraries = list(self.managers)
+        if not libraries:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(libraries))) as executor:
+            results = list(executor.map(search, libraries))
+        return list(islice(heapq.merge(*results, key=key, reverse=descending), limit))
@@ -0,0 +1,210 @@
+import threading
+from itertools import combinations
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from utils.name_index import normalize_name
+
+# Largest edit distance the index can answer
+MAX_EDIT_DISTANCE = 2
+# Only this many leading characters are expanded into deletes, longer names are
+# verified on their full length (bounds the index size for long tags)
+PREFIX_LENGTH = 7
+
+
+def allowed_distance(text: str) -> int:
+    """Edit distance tolerated for a name of this length (short names allow fewer typos)"""
+    if len(text) < 4:
+        return 0
+    if len(text) < 7:
+        return 1
+    return MAX_EDIT_DISTANCE
+
+
+def edit_distance(a: str, b: str, max_distance: int) -> int:
+    """Optimal string alignment distance (a transposition counts as one edit)
+
+    Returns max_distance + 1 as soon as the distance is known to exceed max_distance.
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    if a == b:
+        return 0
+
+    previous_previous = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        row_min = i
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (previous_previous is not None and i > 1 and j > 1
+                    and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]):
+                value = min(value, previous_previous[j - 2] + 1)
+            current[j] = value
+            row_min = min(row_min, value)
+        if row_min > max_distance:
+            return max_distance + 1
+        previous_previous, previous = previous, current
+    return min(previous[-1], max_distance + 1)
+
+
+def _deletes(text: str, max_distance: int = MAX_EDIT_DISTANCE) -> Set[str]:
+    """Every string obtained by removing up to max_distance characters from the prefix"""
+    level = {text[:PREFIX_LENGTH]}
+    result = set(level)
+    for _ in range(max_distance):
+        level = {item[:i] + item[i + 1:] for item in level for i in range(len(item))}
+        result |= level
+    return result
+
+
+class FuzzyTagIndex:
+    """Symmetric-delete index over normalized tag names, for typo-tolerant lookups
+
+    Every tag is stored under each string obtained by deleting up to
+    MAX_EDIT_DISTANCE characters from it. A query generates its own deletes:
+    two names within distance d always share one, so the candidates come from
+    a few dictionary lookups and only those are verified with an edit distance,
+    instead of scanning the whole vocabulary.
+
+    Like TopTagsCache, the index is loaded once and then kept current from the
+    counts returned by the write paths.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.loaded = False
+        # Normalized name -> {tag name: count} (tags differing only by case share a key)
+        self.names = {}
+        # Delete string -> normalized name, or list of them when shared (most deletes
+        # belong to a single name, a bare string keeps large vocabularies compact)
+        self.deletes = {}
+
+    def invalidate(self):
+        with self.lock:
+            self.loaded = False
+            self.names = {}
+            self.deletes = {}
+
+    def load(self, tags: Iterable[Tuple[str, int]]):
+        """Build the index from (name, count) pairs of the whole vocabulary"""
+        # Built aside and swapped in, lookups are not blocked during the build
+        index = FuzzyTagIndex()
+        for name, count in tags:
+            index._add(name, count)
+        with self.lock:
+            self.names = index.names
+            self.deletes = index.deletes
+            self.loaded = True
+
+    def apply_counts(self, new_counts: Dict[str, int]):
+        """Apply the new counts of tags changed by a write (count <= 0 means deleted)"""
+        with self.lock:
+            if not self.loaded:
+                return
+            for name, count in new_counts.items():
+                if count > 0:
+                    self._add(name, count)
+                else:
+                    self._remove(name)
+
+    def lookup(self, query: str, limit: int, exclude: Iterable[str] = ()) -> List[Tuple[str, int, int]]:
+        """Return tags close to the query
+
+        Args:
+            query: Text typed by the user
+            limit: Maximum number of matches
+            exclude: Tag names left out of the result
+
+        Returns:
+            List of (tag name, count, distance), by distance then count
+        """
+        key = normalize_name(query)
+        max_distance = allowed_distance(key)
+        exclude = set(exclude)
+        with self.lock:
+            matches = [(distance, -count, name)
+                       for distance, candidate in self._candidate_keys(key, max_distance)
+                       for name, count in self.names[candidate].items() if name not in exclude]
+        matches.sort()
+        return [(name, -count, distance) for distance, count, name in matches[:limit]]
+
+    def similar_pairs(self) -> List[Tuple[str, int, str, int, int]]:
+        """Return every pair of tags close enough to be probable duplicates
+
+        Returns:
+            List of (tag name, count, similar tag name, count, distance), closest first
+        """
+        with self.lock:
+            keys = list(self.names)
+        pairs = []
+        for key in keys:
+            with self.lock:
+                variants = sorted(self.names.get(key, {}).items())
+                # Each pair once (from its smaller key), within the tolerance of both names
+                neighbours = [(distance, sorted(self.names[candidate].items()))
+                              for distance, candidate in self._candidate_keys(key, allowed_distance(key))
+                              if candidate > key and distance <= allowed_distance(candidate)]
+            # Names equal once normalized (case, full-width characters) are distance 0
+            for (name_a, count_a), (name_b, count_b) in combinations(variants, 2):
+                pairs.append((name_a, count_a, name_b, count_b, 0))
+            for distance, others in neighbours:
+                for name_a, count_a in variants:
+                    for name_b, count_b in others:
+                        pairs.append((name_a, count_a, name_b, count_b, distance))
+
+        pairs.sort(key=lambda pair: (pair[4], -(pair[1] + pair[3]), pair[0], pair[2]))
+        return pairs
+
+    def _candidate_keys(self, key: str, max_distance: int) -> List[Tuple[int, str]]:
+        """Return (distance, normalized name) of every indexed name within max_distance of key (lock held)"""
+        if max_distance == 0:
+            return [(0, key)] if key in self.names else []
+
+        seen = set()
+        result = []
+        for delete in _deletes(key, max_distance):
+            entry = self.deletes.get(delete)
+            if entry is None:
+                continue
+            for candidate in ((entry,) if isinstance(entry, str) else entry):
+                if candidate in seen:
+                    continue
+                seen.add(candidate)
+                distance = edit_distance(key, candidate, max_distance)
+                if distance <= max_distance:
+                    result.append((distance, candidate))
+        return result
+
+    def _add(self, name: str, count: int):
+        key = normalize_name(name)
+        variants = self.names.get(key)
+        if variants is None:
+            variants = self.names[key] = {}
+            for delete in _deletes(key):
+                entry = self.deletes.get(delete)
+                if entry is None:
+                    self.deletes[delete] = key
+                elif isinstance(entry, str):
+                    self.deletes[delete] = [entry, key]
+                else:
+                    entry.append(key)
+        variants[name] = count
+
+    def _remove(self, name: str):
+        key = normalize_name(name)
+        variants: Optional[Dict[str, int]] = self.names.get(key)
+        if variants is None or name not in variants:
+            return
+        del variants[name]
+        if variants:
+            return
+        del self.names[key]
+        for delete in _deletes(key):
+            entry = self.deletes.get(delete)
+            if entry == key:
+                del self.deletes[delete]
+            elif isinstance(entry, list):
+                entry.remove(key)
+                if len(entry) == 1:
+                    self.deletes[delete] = entry[0]
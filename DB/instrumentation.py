@@ -0,0 +1,392 @@
+import functools
+import inspect
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from typing import Any, Callable, Dict, List, Optional
+
+from utils.memory_profiler import MemoryProfiler
+
+# Durations kept per operation for the percentiles (older ones are dropped)
+ROLLING_WINDOW = 1000
+# Calls slower than this are written to the slow-operation log
+DEFAULT_SLOW_MS = 200.0
+
+# Collection methods that reach the server
+MONGO_METHODS = {
+    "find", "find_one", "aggregate", "count_documents", "estimated_document_count", "distinct",
+    "insert_one", "insert_many", "update_one", "update_many", "replace_one", "delete_one", "delete_many",
+    "bulk_write", "find_one_and_update", "find_one_and_delete", "find_one_and_replace",
+    "create_index", "drop_index", "drop"
+}
+# Methods returning a cursor, the server is reached while iterating it
+CURSOR_METHODS = {"find", "aggregate"}
+
+
+def query_shape(value: Any, depth: int = 0) -> Any:
+    """Return the shape of a query: keys and operators are kept, values are replaced by placeholders"""
+    if depth > 4:
+        return "..."
+    if isinstance(value, dict):
+        return {key: query_shape(item, depth + 1) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        if value and all(isinstance(item, dict) for item in value):
+            return [query_shape(item, depth + 1) for item in value[:3]] + (["..."] if len(value) > 3 else [])
+        if value and hasattr(value[0], "_filter"):
+            # bulk_write operations
+            return dict(Counter(type(item).__name__ for item in value))
+        return f"<{len(value)} values>"
+    return "?"
+
+
+class OperationStats:
+    """Counters and a rolling window of durations for one instrumented operation"""
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.durations = deque(maxlen=ROLLING_WINDOW)
+        # User actions only: round trips of every run and the database calls they made
+        self.round_trips = deque(maxlen=ROLLING_WINDOW)
+        self.calls = Counter()
+
+    def add(self, duration_ms: float, round_trips: Optional[int] = None, calls: Optional[Counter] = None):
+        self.count += 1
+        self.total_ms += duration_ms
+        self.max_ms = max(self.max_ms, duration_ms)
+        self.durations.append(duration_ms)
+        if round_trips is not None:
+            self.round_trips.append(round_trips)
+            self.calls.update(calls)
+
+    def summary(self) -> Dict[str, Any]:
+        durations = sorted(self.durations)
+
+        def percentile(fraction):
+            return round(durations[min(len(durations) - 1, int(len(durations) * fraction))], 3)
+
+        result = {
+            "count": self.count,
+            "total_ms": round(self.total_ms, 3),
+            "p50_ms": percentile(0.5),
+            "p95_ms": percentile(0.95),
+            "p99_ms": percentile(0.99),
+            "max_ms": round(self.max_ms, 3),
+        }
+        if self.round_trips:
+            result["round_trips_mean"] = round(sum(self.round_trips) / len(self.round_trips), 2)
+            result["round_trips_max"] = max(self.round_trips)
+            result["top_calls"] = dict(self.calls.most_common(5))
+        return result
+
+
+class Instrumentation:
+    """Opt-in timing of DBManager methods, database round trips and user actions
+
+    Operations are named "db.<method>", "mongo.<collection>.<method>" and
+    "action.<name>". Each user action counts the round trips made by its
+    thread while it runs, which exposes N+1 query patterns. Disabled, the
+    only cost is one attribute check per decorated user action.
+    """
+    def __init__(self):
+        self.enabled = False
+        self.slow_threshold_ms = DEFAULT_SLOW_MS
+        self.slow_log_path = None
+        self.lock = threading.Lock()
+        self.stats = {}
+        # Memory of the user actions, measured only when enabled with memory=True
+        self.memory_profiler = None
+        # Per thread stack of the user actions in progress
+        self.local = threading.local()
+
+    def enable(self, slow_threshold_ms: float = DEFAULT_SLOW_MS, slow_log_path: Optional[str] = None,
+               memory: bool = False):
+        """
+        Args:
+            slow_threshold_ms: Calls slower than this are logged with their query shape
+            slow_log_path: File the slow calls are appended to as JSON lines (stderr if None)
+            memory: Also measure the memory allocated by every user action with tracemalloc (slow)
+        """
+        self.enabled = True
+        self.slow_threshold_ms = slow_threshold_ms
+        self.slow_log_path = slow_log_path
+        if memory and self.memory_profiler is None:
+            self.memory_profiler = MemoryProfiler()
+
+    def configure_from_environment(self):
+        """Enable if VIDEO_TAG_INSTRUMENT or VIDEO_TAG_MEMORY is set (VIDEO_TAG_SLOW_MS and VIDEO_TAG_SLOW_LOG are optional)"""
+        memory = os.environ.get("VIDEO_TAG_MEMORY", "") not in ("", "0")
+        if memory or os.environ.get("VIDEO_TAG_INSTRUMENT", "") not in ("", "0"):
+            self.enable(float(os.environ.get("VIDEO_TAG_SLOW_MS", DEFAULT_SLOW_MS)),
+                        os.environ.get("VIDEO_TAG_SLOW_LOG") or None, memory)
+
+    def reset(self):
+        with self.lock:
+            self.stats = {}
+        if self.memory_profiler is not None:
+            self.memory_profiler.reports = []
+
+    def record(self, name: str, duration_ms: float, shape: Any = None):
+        """Record one call, counting it as a round trip of the user actions in progress if it reached the server"""
+        with self.lock:
+            self.stats.setdefault(name, OperationStats()).add(duration_ms)
+        if name.startswith("mongo."):
+            for action in getattr(self.local, "actions", ()):
+                action["round_trips"] += 1
+                action["calls"][name] += 1
+        if duration_ms >= self.slow_threshold_ms:
+            self._log_slow(name, duration_ms, shape)
+
+    def _log_slow(self, name: str, duration_ms: float, shape: Any):
+        actions = getattr(self.local, "actions", [])
+        entry = {
+            "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "operation": name,
+            "duration_ms": round(duration_ms, 3),
+            "action": actions[-1]["name"] if actions else None,
+            "shape": shape,
+        }
+        line = json.dumps(entry, ensure_ascii=False, default=str)
+        with self.lock:
+            if self.slow_log_path:
+                try:
+                    with open(self.slow_log_path, "a", encoding="utf-8") as f:
+                        f.write(line + "\n")
+                    return
+                except OSError as e:
+                    print(f"Error writing slow operation log: {e}")
+            print(f"Slow operation: {line}", file=sys.stderr)
+
+    def run_action(self, name: str, function: Callable, *args, **kwargs):
+        """Run a user action, recording its duration and the round trips it made"""
+        actions = getattr(self.local, "actions", None)
+        if actions is None:
+            actions = self.local.actions = []
+        if self.memory_profiler is not None and not actions and threading.current_thread() is threading.main_thread():
+            # Outermost GUI actions only, tracemalloc measures the whole process
+            with self.memory_profiler.measure(f"action.{name}"):
+                return self._run_action(name, actions, function, *args, **kwargs)
+        return self._run_action(name, actions, function, *args, **kwargs)
+
+    def _run_action(self, name: str, actions: List[Dict[str, Any]], function: Callable, *args, **kwargs):
+        action = {"name": name, "round_trips": 0, "calls": Counter()}
+        actions.append(action)
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            actions.pop()
+            with self.lock:
+                self.stats.setdefault(f"action.{name}", OperationStats()).add(
+                    duration_ms, action["round_trips"], action["calls"])
+            if duration_ms >= self.slow_threshold_ms:
+                self._log_slow(f"action.{name}", duration_ms, {"round_trips": action["round_trips"]})
+
+    def report(self) -> Dict[str, Dict[str, Any]]:
+        """Return the summary of every operation, by operation name"""
+        with self.lock:
+            return {name: stats.summary() for name, stats in sorted(self.stats.items())}
+
+    def dump(self, path: str) -> None:
+        """Write the report as JSON"""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, indent=2)
+
+
+def format_report(report: Dict[str, Dict[str, Any]]) -> str:
+    """Format a report as a text table, user actions first then by total time"""
+    rows = sorted(report.items(), key=lambda item: (not item[0].startswith("action."), -item[1]["total_ms"]))
+    lines = [f"{'operation':<48}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+             f"{'total ms':>12}{'trips':>8}"]
+    for name, stats in rows:
+        trips = f"{stats['round_trips_mean']:.1f}" if "round_trips_mean" in stats else ""
+        lines.append(f"{name:<48}{stats['count']:>8}{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}"
+                     f"{stats['p99_ms']:>10.2f}{stats['max_ms']:>10.2f}{stats['total_ms']:>12.1f}{trips:>8}")
+    return "\n".join(lines)
+
+
+# Instrumentation of the application, enabled from the environment by main.py
+INSTRUMENTATION = Instrumentation()
+
+
+def user_action(name: str):
+    """Decorator marking a GUI handler as a user action, counted by the instrumentation when enabled"""
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not INSTRUMENTATION.enabled:
+                return function(*args, **kwargs)
+            return INSTRUMENTATION.run_action(name, function, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class InstrumentedCursor:
+    """Cursor proxy recording the time spent creating and iterating the cursor as one round trip"""
+    def __init__(self, cursor, instrumentation: Instrumentation, name: str, elapsed_ms: float, shape: Any):
+        self._cursor = cursor
+        self._instrumentation = instrumentation
+        self._name = name
+        self._elapsed_ms = elapsed_ms
+        self._shape = shape
+        self._recorded = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        start = time.perf_counter()
+        exhausted = False
+        try:
+            return next(self._cursor)
+        except StopIteration:
+            exhausted = True
+            raise
+        finally:
+            self._elapsed_ms += (time.perf_counter() - start) * 1000
+            if exhausted:
+                self._record()
+
+    def _record(self):
+        if not self._recorded:
+            self._recorded = True
+            self._instrumentation.record(self._name, self._elapsed_ms, self._shape)
+
+    def close(self):
+        self._record()
+        self._cursor.close()
+
+    def __del__(self):
+        # Cursors abandoned before exhaustion (next() on an aggregation) are recorded when released
+        try:
+            self._record()
+        except Exception:
+            # Interpreter shutdown
+            pass
+
+    def __getattr__(self, name):
+        attribute = getattr(self._cursor, name)
+        if not callable(attribute):
+            return attribute
+
+        @functools.wraps(attribute)
+        def call(*args, **kwargs):
+            result = attribute(*args, **kwargs)
+            # Chained modifiers (sort, limit, skip...) keep the proxy
+            return self if result is self._cursor else result
+        return call
+
+
+class InstrumentedCollection:
+    """Collection proxy timing every call that reaches the server"""
+    def __init__(self, collection, instrumentation: Instrumentation):
+        self._collection = collection
+        self._instrumentation = instrumentation
+
+    def __getattr__(self, name):
+        attribute = getattr(self._collection, name)
+        if name not in MONGO_METHODS:
+            return attribute
+
+        label = f"mongo.{self._collection.name}.{name}"
+        instrumentation = self._instrumentation
+
+        @functools.wraps(attribute)
+        def call(*args, **kwargs):
+            start = time.perf_counter()
+            result = attribute(*args, **kwargs)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            shape = query_shape(args[0]) if args else None
+            if name in CURSOR_METHODS:
+                return InstrumentedCursor(result, instrumentation, label, elapsed_ms, shape)
+            instrumentation.record(label, elapsed_ms, shape)
+            return result
+        return call
+
+
+def instrument(db_manager, instrumentation: Instrumentation = INSTRUMENTATION) -> None:
+    """Time every public method and every collection call of a DBManager instance
+
+    The collections are replaced by proxies and the public methods by timing
+    wrappers, on the instance only: other instances are unaffected. The
+    collections of the helper objects it owns (change tracker, saved
+    searches) are replaced too.
+    """
+    _instrument_collections(db_manager, instrumentation)
+    for value in list(vars(db_manager).values()):
+        if value is not db_manager and hasattr(value, "__dict__") and not callable(value):
+            _instrument_collections(value, instrumentation)
+
+    for name in dir(type(db_manager)):
+        if name.startswith("_"):
+            continue
+        method = getattr(db_manager, name)
+        if callable(method):
+            setattr(db_manager, name, _timed(method, f"db.{name}", instrumentation))
+
+
+def _instrument_collections(owner, instrumentation: Instrumentation) -> None:
+    """Replace the collections held by an object ("collection" or "..._collection" attributes) by proxies"""
+    for attribute, value in list(vars(owner).items()):
+        if ((attribute == "collection" or attribute.endswith("_collection")) and hasattr(value, "bulk_write")
+                and not isinstance(value, InstrumentedCollection)):
+            setattr(owner, attribute, InstrumentedCollection(value, instrumentation))
+
+
+def _timed(method: Callable, label: str, instrumentation: Instrumentation) -> Callable:
+    if inspect.isgeneratorfunction(method):
+        return _timed_generator(method, label, instrumentation)
+
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            instrumentation.record(label, (time.perf_counter() - start) * 1000)
+    return wrapper
+
+
+def _timed_generator(method: Callable, label: str, instrumentation: Instrumentation) -> Callable:
+    """Like _timed for generator methods, which do their work while consumed: the time of every step is recorded
+
+    The call is recorded once, when the generator is exhausted, closed or
+    released; the time the consumer spends between the steps is not counted.
+    """
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        generator = method(*args, **kwargs)
+        elapsed_ms = 0.0
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = next(generator)
+                except StopIteration:
+                    return
+                finally:
+                    elapsed_ms += (time.perf_counter() - start) * 1000
+                yield item
+        finally:
+            generator.close()
+            instrumentation.record(label, elapsed_ms)
+    return wrapper
+
+
+def _print_report(paths: List[str]) -> None:
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            print(f"== {path}")
+            print(format_report(json.load(f)))
+
+
+if __name__ == "__main__":
+    # python -m DB.instrumentation diagnostics.json [...]
+    if len(sys.argv) < 2:
+        print("Usage: python -m DB.instrumentation <diagnostics.json> [...]")
+        sys.exit(2)
+    _print_report(sys.argv[1:])
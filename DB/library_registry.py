@@ -0,0 +1,100 @@
+import os
+import uuid
+from typing import Any, Dict, List, Optional
+
+from pymongo import MongoClient
+from pymongo.errors import DuplicateKeyError
+
+from DB.db_manager import DBManager
+from DB.write_behind import DEFAULT_JOURNAL_PATH
+
+# Database holding the list of libraries, shared by every client of the server
+REGISTRY_DB_NAME = "video_tag_libraries"
+# Library using the database of the versions without multiple libraries
+DEFAULT_LIBRARY = "default"
+DEFAULT_DB_NAME = "video_tag_db"
+# Prefix of the databases created for new libraries
+LIBRARY_DB_PREFIX = "video_tag_lib_"
+
+
+class LibraryRegistry:
+    """Named libraries, each stored in its own database of the same server
+
+    Every library has its own collections and indexes (videos, tags, folder
+    tags, saved searches...), so an archive and a working set can be split
+    and each index stays the size of its library. The registry is a small
+    collection of {name, dbName, root} documents in REGISTRY_DB_NAME; the
+    default library maps to the database used before libraries existed.
+    Database names are generated, so library names can be any text.
+    """
+    def __init__(self, client: MongoClient):
+        self.client = client
+        self.collection = client[REGISTRY_DB_NAME]["libraries"]
+        self.collection.create_index("name", unique=True)
+        self.collection.create_index("dbName", unique=True)
+        self.collection.update_one({"name": DEFAULT_LIBRARY},
+                                   {"$setOnInsert": {"dbName": DEFAULT_DB_NAME, "root": None}}, upsert=True)
+
+    def get_all(self) -> List[Dict[str, Any]]:
+        """Return the libraries sorted by name, as {"name", "dbName", "root"}"""
+        return list(self.collection.find({}, {"_id": 0}).sort("name", 1))
+
+    def get(self, name: str) -> Dict[str, Any]:
+        """Return a library
+
+        Raises:
+            KeyError: If there is no library of that name
+        """
+        doc = self.collection.find_one({"name": name}, {"_id": 0})
+        if doc is None:
+            raise KeyError(f"Unknown library: {name}")
+        return doc
+
+    def create(self, name: str, root: Optional[str] = None) -> Dict[str, Any]:
+        """Register a new library with an empty database
+
+        Args:
+            name: Name shown to the user
+            root: Folder the library usually browses, optional
+
+        Raises:
+            ValueError: If the name is empty or already used
+        """
+        name = name.strip()
+        if not name:
+            raise ValueError("A library needs a name")
+        doc = {"name": name, "dbName": LIBRARY_DB_PREFIX + uuid.uuid4().hex[:12], "root": root}
+        try:
+            self.collection.insert_one(dict(doc))
+        except DuplicateKeyError:
+            raise ValueError(f"A library named {name} already exists")
+        return doc
+
+    def set_root(self, name: str, root: str) -> None:
+        """Remember the folder a library browses"""
+        self.collection.update_one({"name": name}, {"$set": {"root": root}})
+
+    def remove(self, name: str, drop: bool = False) -> None:
+        """Unregister a library, deleting its database if drop is True
+
+        Raises:
+            ValueError: For the default library
+            KeyError: If there is no library of that name
+        """
+        if name == DEFAULT_LIBRARY:
+            raise ValueError("The default library cannot be removed")
+        doc = self.get(name)
+        self.collection.delete_one({"name": name})
+        if drop:
+            self.client.drop_database(doc["dbName"])
+
+    def open(self, name: str) -> DBManager:
+        """Connect a DBManager to the database of a library"""
+        return DBManager(db_name=self.get(name)["dbName"], client=self.client)
+
+    def journal_path(self, name: str) -> str:
+        """Write-behind journal of a library, the default library keeps the journal of earlier versions"""
+        db_name = self.get(name)["dbName"]
+        if db_name == DEFAULT_DB_NAME:
+            return DEFAULT_JOURNAL_PATH
+        return os.path.join(os.path.dirname(DEFAULT_JOURNAL_PATH), f"tag_journal.{db_name}.ndjson")
@@ -0,0 +1,169 @@
+import os
+from typing import Callable, Optional
+
+from pymongo import DeleteOne, UpdateOne
+
+from DB.db_manager import DB_BATCH_SIZE, DBManager, FileInfoItem, iter_video_files
+from utils.path_rules import PathRuleSet
+
+
+class LibraryScanner:
+    """Walk a library folder and keep its video documents (and filename index) up to date
+
+    Only new or changed files are written, in batched bulk writes, so a rescan
+    of an unchanged library costs one directory walk and one read per batch.
+
+    With path rules, the tags they give are added through the bulk tagging
+    path, per batch: the rules cost one regex match per file and only files
+    missing some of their rule tags are written.
+
+    The headers of new or changed files are parsed here too (duration,
+    resolution, codec), so browsing a folder only reads the cached values.
+    """
+    def __init__(self, db_manager: DBManager, rules: Optional[PathRuleSet] = None):
+        self.db_manager = db_manager
+        self.rules = rules
+        self.cancelled = False
+        # Number of videos that gained tags from the path rules
+        self.rule_tagged_count = 0
+        # Number of videos whose headers were parsed
+        self.metadata_count = 0
+        # Set when the scan wrote video documents, published to the other clients at the end
+        self.changed = False
+
+    def cancel(self):
+        """Stop the scan at the next batch"""
+        self.cancelled = True
+
+    def scan(self, root_path: str, progress_callback: Optional[Callable[[int], None]] = None) -> int:
+        """Index every video below root_path
+
+        Untagged documents of files that disappeared from the folder are removed.
+        Tagged documents are kept, their tags may still be useful if the file
+        comes back (they are filtered out of search results while missing).
+
+        Args:
+            root_path: Library folder to scan recursively
+            progress_callback: Called with the number of files seen so far after each batch
+
+        Returns:
+            Number of video files found
+        """
+        root_path = self.db_manager.get_path_standard_format(root_path)
+        seen_paths = set()
+        batch = []
+
+        for entry in iter_video_files(root_path):
+            try:
+                file_stat = entry.stat()
+            except OSError as e:
+                print(f"Error getting file info: {e}, filename: {entry.name}, path: {entry.path}")
+                continue
+            file_path = self.db_manager.get_path_standard_format(entry.path)
+            seen_paths.add(file_path)
+            batch.append((file_path, file_stat.st_size, file_stat.st_mtime))
+
+            if len(batch) >= DB_BATCH_SIZE:
+                self._write_batch(batch)
+                batch = []
+                if progress_callback:
+                    progress_callback(len(seen_paths))
+                if self.cancelled:
+                    self._publish_changes()
+                    return len(seen_paths)
+
+        if batch:
+            self._write_batch(batch)
+        if progress_callback:
+            progress_callback(len(seen_paths))
+
+        self._remove_missing(root_path, seen_paths)
+        self._publish_changes()
+        return len(seen_paths)
+
+    def _publish_changes(self):
+        """Tell the caches and the other clients that the scan wrote video documents"""
+        if self.changed:
+            self.db_manager.changes.bump("videos")
+
+    def _write_batch(self, batch):
+        """Upsert the files of a batch whose document is missing or out of date"""
+        existing = {}
+        docs = self.db_manager.videos_collection.find(
+            {"path": {"$in": [file_path for file_path, _, _ in batch]}},
+            {"path": 1, "size": 1, "lastModifyTime": 1, "normName": 1, "tags": 1, "meta": 1, "_id": 0}
+        )
+        for doc in docs:
+            existing[doc["path"]] = doc
+
+        operations = []
+        tag_changes = []
+        for file_path, size, last_modify_time in batch:
+            doc = existing.get(file_path)
+            if doc and doc.get("size") == size and doc.get("lastModifyTime") == last_modify_time \
+                    and "normName" in doc:
+                continue
+            # A changed file changes the statistics of its tags, a new one can match searches through its folders
+            file_doc = self.db_manager._build_file_doc(file_path, size, last_modify_time)
+            if doc:
+                tags = self.db_manager._decode_tags(doc.get("tags", []))
+                tag_changes.append((tags, tags, doc, dict(doc, size=size, lastModifyTime=last_modify_time)))
+            else:
+                tag_changes.append(([], [], None, dict(file_doc, tags=[])))
+            operations.append(UpdateOne(
+                {"path": file_path},
+                {"$set": file_doc, "$setOnInsert": {"tags": []}},
+                upsert=True
+            ))
+
+        if operations:
+            self.db_manager.videos_collection.bulk_write(operations, ordered=False)
+            self.changed = True
+        if tag_changes:
+            self.db_manager._apply_tag_changes(tag_changes)
+
+        self._fill_metadata(batch, existing)
+        if self.rules:
+            self._apply_rules(batch, existing)
+
+    def _fill_metadata(self, batch, existing):
+        """Parse the headers of the files of a batch whose cached metadata is missing or out of date"""
+        missing = [FileInfoItem(os.path.basename(file_path), file_path, size, last_modify_time, False)
+                   for file_path, size, last_modify_time in batch
+                   if not self.db_manager._is_cache_valid((existing.get(file_path) or {}).get("meta"),
+                                                          size, last_modify_time)]
+        if missing:
+            self.metadata_count += self.db_manager.ensure_metadata(missing)
+            self.changed = True
+
+    def _apply_rules(self, batch, existing):
+        """Add the tags given by the path rules to the files of a batch that miss some of them"""
+        pending = {}
+        for file_path, _, _ in batch:
+            tags = self.rules.match(file_path)
+            if not tags:
+                continue
+            doc = existing.get(file_path)
+            current_tags = set(self.db_manager._decode_tags(doc.get("tags", []))) if doc else set()
+            if not current_tags.issuperset(tags):
+                pending[file_path] = tags
+        if pending:
+            self.rule_tagged_count += self.db_manager.bulk_add_tags(pending)
+
+    def _remove_missing(self, root_path: str, seen_paths):
+        """Delete untagged documents below root_path whose file was not seen by the scan"""
+        # Answered by the ancestors index
+        docs = self.db_manager.videos_collection.find(
+            {"ancestors": root_path, "tags": {"$size": 0}},
+            {"path": 1, "size": 1, "lastModifyTime": 1, "meta": 1, "_id": 0}
+        )
+
+        missing = [doc for doc in docs if doc["path"] not in seen_paths]
+        if missing:
+            self.changed = True
+        for start in range(0, len(missing), DB_BATCH_SIZE):
+            batch = missing[start:start + DB_BATCH_SIZE]
+            self.db_manager.videos_collection.bulk_write([DeleteOne({"path": doc["path"]}) for doc in batch],
+                                                         ordered=False)
+            # They still matched searches through their folders
+            self.db_manager._apply_tag_changes([([], [], doc, None) for doc in batch])
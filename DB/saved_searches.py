@@ -0,0 +1,210 @@
+import threading
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from pymongo import DeleteOne, ReplaceOne, UpdateOne
+
+# Member documents per insert when a search is materialized
+MATERIALIZE_BATCH_SIZE = 1000
+
+
+class SavedSearches:
+    """Saved tag searches shown as smart folders, with materialized member sets
+
+    A saved search is a list of tags (AND) and optional range filters, stored
+    by name in the saved_searches collection. Its result is materialized once
+    as one {search, path} document per member in saved_search_members, then
+    kept current from the tag deltas of every video write: only the searches
+    whose tags a write added or removed (or whose range fields it changed)
+    are evaluated, against the written document. Changes that rewrite the
+    tags of many videos at once (folder tags, merges, imports) materialize
+    the searches involved again.
+
+    Opening a smart folder reads its member paths through the (search, path)
+    index and their documents through the unique path index, without running
+    the search. Range bounds are stored as absolute values: a "modified in
+    the last days" filter keeps the date it was saved with.
+    """
+    def __init__(self, db_manager):
+        """
+        Args:
+            db_manager: DBManager owning the collections, which calls apply_video_changes on every video write
+        """
+        self.db_manager = db_manager
+        self.collection = db_manager.db["saved_searches"]
+        self.members_collection = db_manager.db["saved_search_members"]
+        self.collection.create_index("name", unique=True)
+        self.members_collection.create_index([("search", 1), ("path", 1)], unique=True)
+        self.members_collection.create_index("path")
+
+        self.lock = threading.Lock()
+        # Definitions of the saved searches, read once and dropped when any client changes them
+        self.definitions = None
+        db_manager.changes.subscribe(["saved_searches"], lambda areas: self.invalidate())
+
+    def invalidate(self) -> None:
+        with self.lock:
+            self.definitions = None
+
+    def _load(self) -> List[Dict[str, Any]]:
+        with self.lock:
+            if self.definitions is None:
+                self.definitions = [self._from_doc(doc) for doc in
+                                    self.collection.find({}, {"_id": 0, "name": 1, "tags": 1, "ranges": 1})]
+            return self.definitions
+
+    @staticmethod
+    def _from_doc(doc: Dict[str, Any]) -> Dict[str, Any]:
+        ranges = {name: tuple(bounds) for name, bounds in doc.get("ranges", {}).items()}
+        return {"name": doc["name"], "tags": doc["tags"], "ranges": ranges}
+
+    def get_all(self) -> List[Dict[str, Any]]:
+        """Return the saved searches sorted by name, as {"name", "tags", "ranges", "count"}"""
+        return list(self.collection.find({}, {"_id": 0, "name": 1, "tags": 1, "ranges": 1, "count": 1})
+                    .sort("name", 1))
+
+    def save(self, name: str, tags: List[str],
+             ranges: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None) -> int:
+        """Save a search (replacing a search of the same name) and materialize its members
+
+        Args:
+            name: Name of the smart folder
+            tags: Tags the videos must all have
+            ranges: Optional range filters, see DBManager._build_range_query
+
+        Returns:
+            Number of members
+
+        Raises:
+            ValueError: If the name or the tags are empty, or a range filter is unsupported
+        """
+        name = name.strip()
+        tags = [tag for tag in dict.fromkeys(tag.strip() for tag in tags) if tag]
+        if not name or not tags:
+            raise ValueError("A saved search needs a name and at least one tag")
+        ranges = ranges or {}
+        self.db_manager._build_range_query(ranges)
+
+        # Pending edits would otherwise be missed by the materialization
+        self.db_manager.flush_writes()
+        self.collection.update_one(
+            {"name": name},
+            {"$set": {"tags": tags, "ranges": {key: list(bounds) for key, bounds in ranges.items()}, "count": 0}},
+            upsert=True
+        )
+        self.invalidate()
+        count = self._materialize({"name": name, "tags": tags, "ranges": ranges})
+        self.db_manager.changes.bump("saved_searches")
+        return count
+
+    def delete(self, name: str) -> None:
+        """Delete a saved search and its members"""
+        self.collection.delete_one({"name": name})
+        self.members_collection.delete_many({"search": name})
+        self.invalidate()
+        self.db_manager.changes.bump("saved_searches")
+
+    def member_paths(self, name: str) -> List[str]:
+        """Return the paths of the members of a saved search"""
+        return [doc["path"] for doc in self.members_collection.find({"search": name}, {"path": 1, "_id": 0})]
+
+    def rematerialize(self, tags: Optional[List[str]] = None) -> None:
+        """Materialize again the searches using any of the tags, every search if tags is None"""
+        for search in self._load():
+            if tags is None or set(search["tags"]) & set(tags):
+                self._materialize(search)
+
+    def _materialize(self, search: Dict[str, Any]) -> int:
+        """Replace the members of a search by the result of running it"""
+        name = search["name"]
+        self.members_collection.delete_many({"search": name})
+        count = 0
+        batch = []
+        for doc in self.db_manager.iter_videos_by_tags(search["tags"], search["ranges"]):
+            batch.append({"search": name, "path": doc["path"]})
+            if len(batch) >= MATERIALIZE_BATCH_SIZE:
+                self.members_collection.insert_many(batch, ordered=False)
+                count += len(batch)
+                batch = []
+        if batch:
+            self.members_collection.insert_many(batch, ordered=False)
+            count += len(batch)
+        self.collection.update_one({"name": name}, {"$set": {"count": count}})
+        return count
+
+    def rename_tags(self, source_tags: List[str], target_tag: str) -> None:
+        """Replace source tags by target_tag in the saved searches, after a rename or merge"""
+        changed = False
+        for search in self._load():
+            if not set(search["tags"]) & set(source_tags):
+                continue
+            tags = list(dict.fromkeys(target_tag if tag in source_tags else tag for tag in search["tags"]))
+            self.collection.update_one({"name": search["name"]}, {"$set": {"tags": tags}})
+            changed = True
+        if changed:
+            self.invalidate()
+            self.db_manager.changes.bump("saved_searches")
+
+    def apply_video_changes(self, changes: List[Tuple[List[str], List[str], Optional[Dict], Optional[Dict]]]) -> None:
+        """Update the members of the saved searches after video documents were written
+
+        Args:
+            changes: Same tuples as DBManager._apply_tag_changes; a search is
+                     evaluated for a video when the write created or deleted
+                     its document, added or removed one of the tags of the
+                     search, or changed one of its range fields
+        """
+        searches = self._load()
+        if not searches:
+            return
+
+        range_value = self.db_manager._range_value
+        candidates = []
+        for old_tags, new_tags, old_doc, new_doc in changes:
+            changed_tags = set(old_tags) ^ set(new_tags)
+            affected = [search for search in searches
+                        if old_doc is None or new_doc is None or changed_tags & set(search["tags"])
+                        or any(range_value(old_doc, key) != range_value(new_doc, key) for key in search["ranges"])]
+            if affected:
+                candidates.append((set(old_tags), set(new_tags), old_doc, new_doc, affected))
+        if not candidates:
+            return
+
+        inherited = self.db_manager._find_inherited_tags(
+            [(new_doc or old_doc)["path"] for _, _, old_doc, new_doc, _ in candidates])
+        operations = []
+        count_deltas = {}
+        for old_tags, new_tags, old_doc, new_doc, affected in candidates:
+            path = (new_doc or old_doc)["path"]
+            folder_tags = set(inherited.get(path, []))
+            for search in affected:
+                was_member = self._matches(search, old_tags | folder_tags, old_doc)
+                is_member = self._matches(search, new_tags | folder_tags, new_doc)
+                if was_member == is_member:
+                    continue
+                member = {"search": search["name"], "path": path}
+                if is_member:
+                    operations.append(ReplaceOne(member, member, upsert=True))
+                else:
+                    operations.append(DeleteOne(member))
+                count_deltas[search["name"]] = count_deltas.get(search["name"], 0) + (1 if is_member else -1)
+
+        if operations:
+            self.members_collection.bulk_write(operations, ordered=False)
+            count_updates = [UpdateOne({"name": name}, {"$inc": {"count": delta}})
+                             for name, delta in count_deltas.items() if delta]
+            if count_updates:
+                self.collection.bulk_write(count_updates, ordered=False)
+
+    def _matches(self, search: Dict[str, Any], tags: Set[str], doc: Optional[Dict[str, Any]]) -> bool:
+        """Evaluate a saved search against a video document and its tags (inherited included)"""
+        if doc is None or not set(search["tags"]) <= tags:
+            return False
+        for key, (minimum, maximum) in search["ranges"].items():
+            value = self.db_manager._range_value(doc, key)
+            if minimum is None and maximum is None:
+                continue
+            if value is None:
+                return False
+            if (minimum is not None and value < minimum) or (maximum is not None and value > maximum):
+                return False
+        return True
@@ -0,0 +1,159 @@
+import os
+import re
+from typing import Any, Dict, List, Tuple
+
+from DB.db_manager import DB_BATCH_SIZE, VIDEO_PROJECTION, DBManager, FileInfoItem
+from utils.name_index import name_grams, normalize_name
+
+# Relevance weights, each tier outranks every combination of the tiers below it
+SCORE_TAG_EXACT = 4
+SCORE_TAG_PREFIX = 2
+SCORE_NAME = 1
+
+# Maximum number of tags considered as prefix matches of the query
+MAX_PREFIX_TAGS = 50
+# Maximum number of candidates ranked in-process by the fallback path
+MAX_FALLBACK_CANDIDATES = 20000
+
+
+class SearchEngine:
+    """Search box over both file names and tags, ranked by relevance
+
+    Relevance order: exact tag match > tag prefix match > name match, ties
+    broken by name. Candidates always come from indexes (tags, name bigrams).
+    Plain ASCII queries are scored, sorted and paginated by MongoDB itself;
+    other queries (CJK, full-width characters...) need the NFKC normalization
+    of the name index, which the server cannot do, so their candidates are
+    ranked in-process instead.
+    """
+    def __init__(self, db_manager: DBManager):
+        self.db_manager = db_manager
+
+    def search(self, query: str, page: int = 0, page_size: int = 100) -> Tuple[List[FileInfoItem], int]:
+        """Return one page of videos matching the query by name or tag
+
+        Args:
+            query: Text typed in the search box
+            page: Zero-based page number
+            page_size: Number of results per page
+
+        Returns:
+            Tuple of (videos of the requested page, total number of matches)
+        """
+        query = query.strip()
+        if not query:
+            return [], 0
+
+        exact_tags, prefix_tags = self._find_matching_tags(query)
+        # Compared with the values stored in the videos (names or integer tag ids)
+        exact_tags = self.db_manager._encode_tags(exact_tags)
+        prefix_tags = self.db_manager._encode_tags(prefix_tags)
+        candidate_query = self._build_candidate_query(query, exact_tags + prefix_tags)
+
+        if query.isascii():
+            docs, total = self._search_server_side(query, candidate_query, exact_tags, prefix_tags, page, page_size)
+        else:
+            docs, total = self._search_in_process(query, candidate_query, exact_tags, prefix_tags, page, page_size)
+
+        # Files deleted outside the application are dropped from the page
+        videos = [FileInfoItem.from_dict(self.db_manager._decode_doc(doc)) for doc in docs if os.path.exists(doc["path"])]
+        # Ranking only uses the tags stored on the videos, pending edits and inherited folder tags are shown
+        self.db_manager._apply_pending_tags(videos)
+        self.db_manager._attach_folder_tags(videos)
+        return videos, total
+
+    def _find_matching_tags(self, query: str) -> Tuple[List[str], List[str]]:
+        """Split the tags matching the query into exact matches and prefix matches"""
+        normalized_query = normalize_name(query)
+        tags_collection = self.db_manager.tags_collection
+        # Looked up on their own: an exact tag used by few videos may not be among the most used prefix matches
+        exact_tags = [doc["name"] for doc in tags_collection.find(
+            {"name": {"$regex": "^" + re.escape(query) + "$", "$options": "i"}}, {"name": 1, "_id": 0}
+        ) if normalize_name(doc["name"]) == normalized_query]
+
+        docs = tags_collection.find(
+            {"name": {"$regex": "^" + re.escape(query), "$options": "i", "$nin": exact_tags}},
+            {"name": 1, "_id": 0}
+        ).sort("count", -1).limit(MAX_PREFIX_TAGS)
+        prefix_tags = [doc["name"] for doc in docs if normalize_name(doc["name"]) != normalized_query]
+        return exact_tags, prefix_tags
+
+    @staticmethod
+    def _build_candidate_query(query: str, tags: List[Any]) -> Dict[str, Any]:
+        """Indexed filter selecting every document that can match by tag or by name"""
+        normalized_query = normalize_name(query)
+        if len(normalized_query) < 2:
+            name_clause = {"name": {"$regex": re.escape(query), "$options": "i"}}
+        else:
+            name_clause = {"nameGrams": {"$all": name_grams(normalized_query)}}
+
+        if not tags:
+            return name_clause
+        return {"$or": [{"tags": {"$in": tags}}, name_clause]}
+
+    def _search_server_side(self, query: str, candidate_query: Dict[str, Any], exact_tags: List[Any],
+                            prefix_tags: List[Any], page: int, page_size: int) -> Tuple[List[Dict], int]:
+        """Score, sort and paginate inside a single aggregation"""
+        def tag_score(tags, weight):
+            matching = {"$filter": {"input": {"$ifNull": ["$tags", []]}, "cond": {"$in": ["$$this", tags]}}}
+            return {"$cond": [{"$gt": [{"$size": matching}, 0]}, weight, 0]}
+
+        pipeline = [
+            {"$match": candidate_query},
+            {"$addFields": {"score": {"$add": [
+                tag_score(exact_tags, SCORE_TAG_EXACT),
+                tag_score(prefix_tags, SCORE_TAG_PREFIX),
+                # Same normalized name as the bigrams, documents written before it existed use the stored name
+                {"$cond": [{"$regexMatch": {"input": {"$ifNull": ["$normName", "$name"]},
+                                            "regex": re.escape(normalize_name(query)), "options": "i"}},
+                           SCORE_NAME, 0]}
+            ]}}},
+            # Candidates selected by bigrams but not containing the query are dropped
+            {"$match": {"score": {"$gt": 0}}},
+            {"$facet": {
+                "results": [
+                    {"$sort": {"score": -1, "name": 1}},
+                    {"$skip": page * page_size},
+                    {"$limit": page_size},
+                    {"$project": dict(VIDEO_PROJECTION, score=0)}
+                ],
+                "total": [{"$count": "count"}]
+            }}
+        ]
+
+        result = next(self.db_manager.videos_collection.aggregate(pipeline, allowDiskUse=True))
+        total = result["total"][0]["count"] if result["total"] else 0
+        return result["results"], total
+
+    def _search_in_process(self, query: str, candidate_query: Dict[str, Any], exact_tags: List[Any],
+                           prefix_tags: List[Any], page: int, page_size: int) -> Tuple[List[Dict], int]:
+        """Rank lightweight candidates in Python, then load the full documents of one page"""
+        normalized_query = normalize_name(query)
+        exact_tags, prefix_tags = set(exact_tags), set(prefix_tags)
+
+        scored = []
+        candidates = self.db_manager.videos_collection.find(
+            candidate_query, {"name": 1, "path": 1, "tags": 1, "_id": 0}
+        ).limit(MAX_FALLBACK_CANDIDATES)
+        for doc in candidates:
+            tags = set(doc.get("tags", []))
+            score = 0
+            if tags & exact_tags:
+                score += SCORE_TAG_EXACT
+            if tags & prefix_tags:
+                score += SCORE_TAG_PREFIX
+            if normalized_query in normalize_name(doc["name"]):
+                score += SCORE_NAME
+            if score:
+                scored.append((-score, doc["name"], doc["path"]))
+
+        scored.sort()
+        page_paths = [path for _, _, path in scored[page * page_size:(page + 1) * page_size]]
+
+        docs_by_path = {}
+        for start in range(0, len(page_paths), DB_BATCH_SIZE):
+            for doc in self.db_manager.videos_collection.find(
+                    {"path": {"$in": page_paths[start:start + DB_BATCH_SIZE]}}, VIDEO_PROJECTION):
+                docs_by_path[doc["path"]] = doc
+
+        return [docs_by_path[path] for path in page_paths if path in docs_by_path], len(scored)
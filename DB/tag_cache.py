@@ -0,0 +1,203 @@
+import bisect
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+
+class TopTagsCache:
+    """In-memory window of the most used tags, kept current from tag-count deltas
+
+    The window holds up to `capacity` tags sorted by (count desc, name).
+    `floor` is an upper bound of the count of every tag outside the window:
+    as long as the requested number of tags all have a count >= floor, the
+    answer is exact and served without touching the database. Otherwise the
+    window is reloaded.
+
+    The statistics of the tags (total size, duration, latest modification)
+    are kept next to their counts when the write paths provide them; a tag
+    changed without its statistics only misses for the views showing them.
+    """
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.lock = threading.Lock()
+        self.loaded = False
+        self.counts = {}
+        # Name -> statistics fields of the tag document, for the tags of the window whose statistics are known
+        self.stats = {}
+        # Sorted list of (-count, name)
+        self.entries = []
+        self.floor = 0
+
+    def invalidate(self):
+        with self.lock:
+            self.loaded = False
+
+    def load(self, tag_docs: List[Dict[str, Any]]):
+        """Replace the window with the result of a count-sorted query limited to capacity"""
+        with self.lock:
+            self.counts = {doc["name"]: doc["count"] for doc in tag_docs}
+            self.stats = {doc["name"]: self._stats_of(doc) for doc in tag_docs}
+            self.entries = sorted((-count, name) for name, count in self.counts.items())
+            # A short result means there is no tag outside the window
+            self.floor = self.entries[-1][0] * -1 if len(self.entries) >= self.capacity else 0
+            self.loaded = True
+
+    @staticmethod
+    def _stats_of(doc: Dict[str, Any]) -> Dict[str, Any]:
+        return {field: value for field, value in doc.items() if field not in ("name", "count", "_id")}
+
+    def get(self, limit: int, with_stats: bool = False) -> Tuple[bool, List[Dict[str, Any]]]:
+        """Return (hit, tags); hit is False when the window cannot answer exactly
+
+        With with_stats, the tags also carry their statistics fields, and a
+        tag whose statistics are not known is a miss.
+        """
+        with self.lock:
+            if not self.loaded or limit > self.capacity:
+                return False, []
+            top = self.entries[:limit]
+            if len(top) < limit and self.floor > 0:
+                return False, []
+            if top and -top[-1][0] < self.floor:
+                return False, []
+            if not with_stats:
+                return True, [{"name": name, "count": -count} for count, name in top]
+            if any(name not in self.stats for _, name in top):
+                return False, []
+            return True, [dict(self.stats[name], name=name, count=-count) for count, name in top]
+
+    def apply_counts(self, new_counts: Dict[str, int], stats: Optional[Dict[str, Dict[str, Any]]] = None):
+        """Apply the new counts of tags changed by a write (count <= 0 means deleted)
+
+        Args:
+            new_counts: Dictionary mapping each changed tag to its new count
+            stats: New statistics fields of the changed tags, when the write read them back
+        """
+        stats = stats or {}
+        with self.lock:
+            if not self.loaded:
+                return
+            for name, count in new_counts.items():
+                old_count = self.counts.pop(name, None)
+                self.stats.pop(name, None)
+                if old_count is not None:
+                    self.entries.remove((-old_count, name))
+                if count <= 0:
+                    continue
+                # Tags outside the window only enter it if they overtake the floor
+                if old_count is None and count <= self.floor:
+                    continue
+                self.counts[name] = count
+                if name in stats:
+                    self.stats[name] = stats[name]
+                bisect.insort(self.entries, (-count, name))
+
+            # Trim to capacity, evicted tags raise the floor
+            while len(self.entries) > self.capacity:
+                count, name = self.entries.pop()
+                del self.counts[name]
+                self.stats.pop(name, None)
+                self.floor = max(self.floor, -count)
+
+
+def estimate_size(value: Any) -> int:
+    """Approximate memory used by a document (nested dicts and lists included)"""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(estimate_size(item) for item in value.values())
+    elif isinstance(value, list):
+        size += sum(estimate_size(item) for item in value)
+    return size
+
+
+class TagQueryCache:
+    """LRU cache of tag search results, invalidated by per-tag version counters
+
+    Entries are keyed by the tag set (order-independent) and the range
+    filters. Every write path bumps the version of the tags whose videos it
+    changed, and an entry is only served while its tags still have the
+    versions read before its query ran: a write racing with the query makes
+    the result stale before it is stored. Results of searches that match
+    through tagged folders are also dropped by writes of untagged videos,
+    which can enter or leave a folder without any tag delta.
+
+    Results are kept until their estimated size exceeds max_bytes, then the
+    least recently used ones are evicted. A result larger than the whole
+    budget is not cached. The cached documents are shared: callers build new
+    objects from them and never modify them.
+    """
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        # key -> (uses folder tags, documents, estimated size), stale entries are dropped by the writes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.versions = {}
+        # Incremented when every entry, or every entry using folder tags, is dropped
+        self.generation = 0
+        self.folder_generation = 0
+
+    @staticmethod
+    def make_key(tags: Iterable[str], ranges: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]]
+                 ) -> Tuple[FrozenSet[str], Tuple]:
+        return frozenset(tags), tuple(sorted((name, tuple(bounds)) for name, bounds in (ranges or {}).items()))
+
+    def snapshot(self, key: Tuple[FrozenSet[str], Tuple]) -> Tuple[int, int, Dict[str, int]]:
+        """Versions to pass to put, read before running the query of key"""
+        with self.lock:
+            return self.generation, self.folder_generation, {tag: self.versions.get(tag, 0) for tag in key[0]}
+
+    def get(self, key: Tuple[FrozenSet[str], Tuple]) -> Optional[List[Dict[str, Any]]]:
+        """Return the cached documents of a search, None if absent or stale"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            self.entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: Tuple[FrozenSet[str], Tuple], snapshot: Tuple[int, int, Dict[str, int]],
+            docs: List[Dict[str, Any]], uses_folders: bool) -> None:
+        """Store the result of a search, unless a write changed its tags since snapshot"""
+        size = sum(estimate_size(doc) for doc in docs)
+        if size > self.max_bytes:
+            return
+        generation, folder_generation, versions = snapshot
+        with self.lock:
+            if generation != self.generation or (uses_folders and folder_generation != self.folder_generation):
+                return
+            if any(self.versions.get(tag, 0) != version for tag, version in versions.items()):
+                return
+            self._drop(key)
+            self.entries[key] = (uses_folders, docs, size)
+            self.size += size
+            while self.size > self.max_bytes:
+                self._drop(next(iter(self.entries)))
+
+    def bump(self, tags: Iterable[str]) -> None:
+        """Record a write changing the videos (or the tag) of each of the tags"""
+        tags = set(tags)
+        with self.lock:
+            for tag in tags:
+                self.versions[tag] = self.versions.get(tag, 0) + 1
+            for key in [key for key in self.entries if not key[0].isdisjoint(tags)]:
+                self._drop(key)
+
+    def invalidate_folder_searches(self) -> None:
+        """Drop the results of searches matching through tagged folders, after untagged videos were written"""
+        with self.lock:
+            self.folder_generation += 1
+            for key in [key for key, entry in self.entries.items() if entry[0]]:
+                self._drop(key)
+
+    def invalidate(self) -> None:
+        with self.lock:
+            self.generation += 1
+            self.entries.clear()
+            self.size = 0
+
+    def _drop(self, key: Tuple[FrozenSet[str], Tuple]) -> None:
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[2]
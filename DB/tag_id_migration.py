@@ -0,0 +1,120 @@
+import sys
+from typing import Callable, Optional
+
+from pymongo import UpdateOne
+
+from DB.db_manager import DB_BATCH_SIZE, DBManager
+
+
+class TagIdMigration:
+    """Convert the tags stored in video and folder documents between tag names and integer tag ids
+
+    With integer ids every video stores small numbers instead of repeating
+    the tag strings, which shrinks the videos collection and its tag indexes,
+    and a tag rename no longer touches the videos.
+
+    The conversion runs in batches and is resumable: only documents still
+    holding the other representation are selected, so an interrupted run is
+    completed by running it again. DBManager reads both representations, but
+    tag searches only find converted documents, so the application should not
+    be used until the migration has completed.
+    """
+    def __init__(self, db_manager: DBManager):
+        self.db_manager = db_manager
+
+    def migrate(self, progress_callback: Optional[Callable[[int], None]] = None) -> int:
+        """Store integer tag ids in every video document
+
+        Args:
+            progress_callback: Called with the number of converted documents after each batch
+
+        Returns:
+            Number of converted documents
+        """
+        db_manager = self.db_manager
+        self._assign_missing_ids()
+
+        # Switched first, new writes already store ids while the videos are converted
+        db_manager.meta_collection.update_one({"_id": "schema"}, {"$set": {"tagIds": True}}, upsert=True)
+        db_manager.use_tag_ids = True
+        # Running clients switch at their next check of the versions
+        db_manager.changes.bump("tags")
+
+        # Every tag has an id now, the whole dictionary is loaded once
+        db_manager._load_tag_ids({})
+
+        def convert(tags):
+            names = db_manager._decode_tags(tags)
+            # Tags without a tag document (inconsistent data) get one
+            missing = [name for name in names if name not in db_manager.tag_id_by_name]
+            if missing:
+                db_manager._encode_tags(missing, create=True)
+            return [db_manager.tag_id_by_name[name] for name in names]
+
+        query = {"tags": {"$elemMatch": {"$type": "string"}}}
+        converted = self._convert_documents(db_manager.videos_collection, query, convert, progress_callback)
+        self._convert_documents(db_manager.folders_collection, query, convert, None)
+        db_manager.changes.bump("tags", "videos", "folders")
+        return converted
+
+    def revert(self, progress_callback: Optional[Callable[[int], None]] = None) -> int:
+        """Store tag names in every video document again
+
+        Args:
+            progress_callback: Called with the number of converted documents after each batch
+
+        Returns:
+            Number of converted documents
+        """
+        db_manager = self.db_manager
+        db_manager.meta_collection.update_one({"_id": "schema"}, {"$set": {"tagIds": False}}, upsert=True)
+        db_manager.use_tag_ids = False
+        db_manager.changes.bump("tags")
+        db_manager._load_tag_ids({})
+
+        query = {"tags": {"$elemMatch": {"$type": "number"}}}
+        converted = self._convert_documents(db_manager.videos_collection, query, db_manager._decode_tags,
+                                         progress_callback)
+        self._convert_documents(db_manager.folders_collection, query, db_manager._decode_tags, None)
+        db_manager.changes.bump("tags", "videos", "folders")
+        return converted
+
+    def _assign_missing_ids(self) -> None:
+        """Give an id to every tag document that has none, in batches"""
+        db_manager = self.db_manager
+        while True:
+            names = [doc["name"] for doc in db_manager.tags_collection.find(
+                {"tagId": {"$exists": False}}, {"name": 1, "_id": 0}).limit(DB_BATCH_SIZE)]
+            if not names:
+                return
+            db_manager._allocate_tag_ids(names)
+
+    @staticmethod
+    def _convert_documents(collection, query, convert, progress_callback) -> int:
+        """Rewrite the tags of the matching documents (videos or folders) in batches until none is left
+
+        Each update is conditioned on the tags read, so a document changed in
+        between is left for the next batch instead of being overwritten.
+        """
+        converted = 0
+        while True:
+            docs = list(collection.find(query, {"_id": 1, "tags": 1}).limit(DB_BATCH_SIZE))
+            if not docs:
+                return converted
+
+            operations = [UpdateOne({"_id": doc["_id"], "tags": doc["tags"]}, {"$set": {"tags": convert(doc["tags"])}})
+                          for doc in docs]
+            result = collection.bulk_write(operations, ordered=False)
+            converted += result.modified_count
+            if progress_callback:
+                progress_callback(converted)
+
+
+if __name__ == "__main__":
+    # python -m DB.tag_id_migration [--revert]
+    migration = TagIdMigration(DBManager())
+    if "--revert" in sys.argv[1:]:
+        total = migration.revert(lambda done: print(f"{done} videos converted"))
+    else:
+        total = migration.migrate(lambda done: print(f"{done} videos converted"))
+    print(f"Done, {total} videos converted.")
@@ -0,0 +1,261 @@
+import json
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from pymongo.errors import PyMongoError
+
+# Journal of the tag writes not yet in the database, replayed at the next start
+DEFAULT_JOURNAL_PATH = os.path.join(os.path.expanduser("~"), ".video_tag_manager", "tag_journal.ndjson")
+
+# Seconds a write waits for more writes before the flush, edits of the same files in this window are coalesced
+FLUSH_DELAY = 0.5
+# Delay between flush attempts while the database is unreachable, doubled up to the maximum
+RETRY_DELAY = 1.0
+MAX_RETRY_DELAY = 30.0
+
+
+class WriteBehindQueue:
+    """Journaled write-behind queue for the tag edits of video files
+
+    Every edit is appended to a local journal (flushed to disk before the
+    call returns) and coalesced per file with the edits still pending: the
+    latest state of a file is what gets written. A background thread writes
+    the pending edits through DBManager in batches, after FLUSH_DELAY, and
+    keeps retrying while the database is unreachable (database errors); an
+    edit failing with any other error would fail the same way at every
+    retry, it is dropped and reported to the listener instead. The journal is
+    compacted after every flush, and replayed at the next start if the
+    application stopped with edits pending.
+
+    Pending edits are overlaid on the tags read through DBManager, so the
+    views show them at once; tag searches and counts see them after the flush.
+    """
+    def __init__(self, db_manager, journal_path: str = DEFAULT_JOURNAL_PATH,
+                 listener: Optional[Callable[[List[Tuple[str, str]]], None]] = None, flush_delay: float = FLUSH_DELAY):
+        """
+        Args:
+            db_manager: DBManager the edits are written through
+            journal_path: Journal file, created if needed
+            listener: Called from the flush thread after each flush with the (path, error) of the dropped edits
+            flush_delay: Seconds to wait for more edits before a flush
+        """
+        self.db_manager = db_manager
+        self.journal_path = journal_path
+        self.listener = listener
+        self.flush_delay = flush_delay
+        self.condition = threading.Condition()
+        # Standardized path -> {"mode": "add" | "replace" | "remove", "tags": [...], "version": int}
+        self.pending = {}
+        self.version = 0
+        self.flush_requested = False
+        self.closed = False
+        # Set while the database cannot be reached
+        self.offline = False
+
+        journal_dir = os.path.dirname(journal_path)
+        if journal_dir:
+            os.makedirs(journal_dir, exist_ok=True)
+        self._replay()
+        self.journal = open(journal_path, "a", encoding="utf-8")
+        self.thread = threading.Thread(target=self._run, name="tag-write-behind", daemon=True)
+        self.thread.start()
+
+    def add_tags(self, file_path: str, tags: List[str], append: bool = True) -> None:
+        """Queue tags for a video file, appended to its tags or replacing them"""
+        self._record({"op": "tags", "path": self.db_manager.get_path_standard_format(file_path),
+                      "tags": list(dict.fromkeys(tags)), "append": append})
+
+    def remove_tags(self, file_path: str) -> None:
+        """Queue the removal of every tag of a video file (its document is deleted)"""
+        self._record({"op": "remove", "path": self.db_manager.get_path_standard_format(file_path)})
+
+    def pending_count(self) -> int:
+        with self.condition:
+            return len(self.pending)
+
+    def effective_tags(self, file_path: str, stored_tags: List[str]) -> List[str]:
+        """Return the tags of a file once its pending edit is written, given its stored tags"""
+        with self.condition:
+            state = self.pending.get(file_path)
+        if state is None:
+            return stored_tags
+        if state["mode"] == "add":
+            return stored_tags + [tag for tag in state["tags"] if tag not in stored_tags]
+        return list(state["tags"])
+
+    def pending_paths(self) -> List[str]:
+        with self.condition:
+            return list(self.pending)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Write the pending edits now and wait for them
+
+        Returns:
+            True if nothing is pending anymore, False if the timeout expired first
+        """
+        with self.condition:
+            if not self.pending:
+                return True
+            self.flush_requested = True
+            self.condition.notify_all()
+            return self.condition.wait_for(lambda: not self.pending, timeout)
+
+    def close(self, timeout: Optional[float] = None) -> bool:
+        """Flush and stop the background thread; edits that could not be written stay in the journal
+
+        Returns:
+            True if every edit was written
+        """
+        flushed = self.flush(timeout)
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        self.thread.join(timeout)
+        with self.condition:
+            self.journal.close()
+        return flushed
+
+    def _record(self, entry: Dict[str, Any]) -> None:
+        with self.condition:
+            if self.closed:
+                raise RuntimeError("The write-behind queue is closed")
+            self.journal.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self.journal.flush()
+            os.fsync(self.journal.fileno())
+            self._coalesce(entry)
+            self.condition.notify_all()
+
+    def _coalesce(self, entry: Dict[str, Any]) -> None:
+        """Merge an edit into the pending state of its file"""
+        path = entry["path"]
+        previous = self.pending.get(path)
+        self.version += 1
+        if entry["op"] == "remove":
+            state = {"mode": "remove", "tags": []}
+        elif not entry["append"]:
+            state = {"mode": "replace", "tags": entry["tags"]}
+        elif previous is None or previous["mode"] == "add":
+            tags = previous["tags"] if previous else []
+            state = {"mode": "add", "tags": tags + [tag for tag in entry["tags"] if tag not in tags]}
+        else:
+            # Appending to replaced or removed tags is a replacement
+            tags = previous["tags"]
+            state = {"mode": "replace", "tags": tags + [tag for tag in entry["tags"] if tag not in tags]}
+        state["version"] = self.version
+        self.pending[path] = state
+
+    def _replay(self) -> None:
+        """Load the edits left in the journal by a previous run"""
+        if not os.path.exists(self.journal_path):
+            return
+        with open(self.journal_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    self._coalesce(json.loads(line))
+                except (ValueError, KeyError):
+                    # Last line cut by a crash
+                    print(f"Skipping damaged journal entry: {line.strip()}")
+        if self.pending:
+            print(f"Replaying {len(self.pending)} pending tag edits from {self.journal_path}")
+
+    def _compact(self) -> None:
+        """Rewrite the journal with the pending edits only (called with the lock held)"""
+        temporary_path = self.journal_path + ".tmp"
+        with open(temporary_path, "w", encoding="utf-8") as f:
+            for path, state in self.pending.items():
+                if state["mode"] == "remove":
+                    entry = {"op": "remove", "path": path}
+                else:
+                    entry = {"op": "tags", "path": path, "tags": state["tags"], "append": state["mode"] == "add"}
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.journal.close()
+        os.replace(temporary_path, self.journal_path)
+        self.journal = open(self.journal_path, "a", encoding="utf-8")
+
+    def _run(self) -> None:
+        retry_delay = RETRY_DELAY
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.pending or self.closed)
+                if not self.pending:
+                    return
+                if self.offline:
+                    # Wait before the next attempt, even when a flush is requested
+                    self.condition.wait_for(lambda: self.closed, retry_delay)
+                    retry_delay = min(retry_delay * 2, MAX_RETRY_DELAY)
+                else:
+                    # Coalescing window, new edits do not restart it
+                    self.condition.wait_for(lambda: self.flush_requested or self.closed, self.flush_delay)
+                snapshot = {path: dict(state) for path, state in self.pending.items()}
+
+            try:
+                dropped = self._write(snapshot)
+            except PyMongoError as e:
+                if not self.offline:
+                    print(f"Tag writes pending, database unavailable: {e}")
+                self.offline = True
+                with self.condition:
+                    if self.closed:
+                        # Replayed at the next start
+                        return
+                continue
+
+            self.offline = False
+            retry_delay = RETRY_DELAY
+            with self.condition:
+                for path, state in snapshot.items():
+                    if self.pending.get(path, {}).get("version") == state["version"]:
+                        del self.pending[path]
+                self._compact()
+                if not self.pending:
+                    self.flush_requested = False
+                self.condition.notify_all()
+            if self.listener:
+                self.listener(dropped)
+
+    def _write(self, snapshot: Dict[str, Dict[str, Any]]) -> List[Tuple[str, str]]:
+        """Write the edits of a snapshot, every write is idempotent so a failed flush can be retried whole
+
+        Database errors are raised, the whole flush is retried. Any other
+        error drops only the edit it came from, the rest is still written.
+
+        Returns:
+            (path, error) of the edits dropped because they cannot be written (file deleted meanwhile, bad data)
+        """
+        dropped = []
+        additions = {path: state["tags"] for path, state in snapshot.items() if state["mode"] == "add"}
+        for path in list(additions):
+            if not os.path.exists(path):
+                dropped.append((path, "file not found"))
+                del additions[path]
+        if additions:
+            try:
+                self.db_manager.bulk_add_tags(additions)
+            except PyMongoError:
+                raise
+            except Exception:
+                # Written one by one to find the failing edits, the others are kept
+                for path, tags in additions.items():
+                    self._write_edit(dropped, path, lambda: self.db_manager.bulk_add_tags({path: tags}))
+
+        for path, state in snapshot.items():
+            if state["mode"] == "replace":
+                self._write_edit(dropped, path,
+                                 lambda: self.db_manager.add_or_update_tags(path, state["tags"], append=False))
+            elif state["mode"] == "remove":
+                self._write_edit(dropped, path, lambda: self.db_manager.remove_tags_from_file(path))
+        return dropped
+
+    @staticmethod
+    def _write_edit(dropped: List[Tuple[str, str]], path: str, write: Callable[[], Any]) -> None:
+        """Write one edit, adding it to dropped if it fails for any other reason than the database"""
+        try:
+            write()
+        except PyMongoError:
+            raise
+        except Exception as e:
+            print(f"Dropping the tag edit of {path}: {e}")
+            dropped.append((path, str(e)))
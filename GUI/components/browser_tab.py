@@ -1,20 +1,32 @@
 import os
+import queue
 import shutil
+import threading
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 from tkinterdnd2 import DND_FILES
 from GUI.dialogs.tag_dialog import TagDialog
 from GUI.dialogs.folder_dialog import NewFolderDialog
-from utils.TagManage_utils import get_list_sorted
+from GUI.dialogs.duplicate_dialog import DuplicateDialog
+from GUI.dialogs.path_rules_dialog import PathRulesDialog
+from utils.TagManage_utils import build_file_row, get_list_sorted
+from DB.library_scanner import LibraryScanner
+from DB.search_engine import SearchEngine
+from DB.instrumentation import user_action
+from utils.path_rules import PathRuleSet
+
+# Number of results shown per page of a combined name and tag search
+SEARCH_PAGE_SIZE = 200
 
 class BrowseTab:
     """Tab for browsing and managing files"""
-    def __init__(self, parent, lang_manager, db_manager, on_refresh_tags):
+    def __init__(self, parent, lang_manager, db_manager, on_refresh_tags, on_directory_selected=None):
         self.parent = parent
         self.tab = ttk.Frame(parent)
         self.lang_manager = lang_manager
         self.db_manager = db_manager
         self.on_refresh_tags = on_refresh_tags
+        self.on_directory_selected = on_directory_selected
         
         # File state
         self.current_path = tk.StringVar()
@@ -23,10 +35,34 @@ class BrowseTab:
         self.file_list = []
         self.path_before_search = ""
 
+        # Combined name and tag search, paginated
+        self.search_engine = SearchEngine(db_manager)
+        self.combined_query = ""
+        self.combined_page = 0
+        self.combined_total = 0
+
+        # Saved search shown as a smart folder, and the names of the listed smart folders
+        self.smart_folder = None
+        self.smart_folder_names = {}
+
+        # DBManager of each library, set by a search across libraries so that edits of its results reach their library
+        self.library_managers = {}
+        # Library of each listed video found by a search across libraries
+        self.item_libraries = {}
+
+        # Background library indexing
+        self.scanner = None
+        self.scan_messages = queue.Queue()
+        # Set while _poll_scan_messages is scheduled, a single poller serves successive scans
+        self.scan_polling = False
+        self.index_status_var = tk.StringVar(value="")
+
         # Sort flags
         self.sort_by_name_desc = True
         self.sort_by_size_desc = True
         self.sort_by_time_desc = True
+        self.sort_by_duration_desc = True
+        self.sort_by_resolution_desc = True
 
         self._setup_ui()
         
@@ -58,6 +94,21 @@ class BrowseTab:
                                        command=self._create_folder_dialog, state=tk.DISABLED)
         self.new_folder_btn.pack(side=tk.LEFT, padx=5)
 
+        # Path rules, applied when the library is scanned
+        ttk.Button(dir_frame, text=self.lang_manager.get_text("path_rules"),
+                   command=self._edit_path_rules).pack(side=tk.LEFT, padx=5)
+
+        # Smart folders: saved tag searches, listed again each time the list opens
+        ttk.Label(dir_frame, text=self.lang_manager.get_text("smart_folders")).pack(side=tk.LEFT, padx=(10, 5))
+        self.smart_folder_var = tk.StringVar()
+        smart_folder_combo = ttk.Combobox(dir_frame, textvariable=self.smart_folder_var, width=20, state="readonly",
+                                          postcommand=self.refresh_smart_folders)
+        smart_folder_combo.pack(side=tk.LEFT, padx=5)
+        smart_folder_combo.bind("<<ComboboxSelected>>", lambda e: self._open_smart_folder())
+        self.smart_folder_combo = smart_folder_combo
+        ttk.Button(dir_frame, text=self.lang_manager.get_text("delete_smart_folder"),
+                   command=self._delete_smart_folder).pack(side=tk.LEFT, padx=5)
+
         # Search frame
         search_frame = ttk.Frame(self.tab)
         search_frame.pack(fill=tk.X, padx=10, pady=5)
@@ -67,6 +118,14 @@ class BrowseTab:
         search_entry = ttk.Entry(search_frame, textvariable=self.search_var, width=30)
         search_entry.pack(side=tk.LEFT, padx=5, fill=tk.X, expand=True)
 
+        # Search scope: current folder listing or the whole indexed library
+        self.search_scopes = [self.lang_manager.get_text("scope_current_dir"),
+                              self.lang_manager.get_text("scope_library"),
+                              self.lang_manager.get_text("scope_names_and_tags")]
+        self.search_scope_var = tk.StringVar(value=self.search_scopes[0])
+        ttk.Combobox(search_frame, textvariable=self.search_scope_var, values=self.search_scopes,
+                     width=12, state="readonly").pack(side=tk.LEFT, padx=5)
+
         search_btn = ttk.Button(search_frame, text=self.lang_manager.get_text("search_btn"), 
                               command=lambda: self._search_files(self.search_var.get()))
         search_btn.pack(side=tk.LEFT, padx=5)
@@ -75,6 +134,18 @@ class BrowseTab:
                                   command=lambda: self._go_back(True))
         end_search_btn.pack(side=tk.LEFT, padx=5)
 
+        ttk.Label(search_frame, textvariable=self.index_status_var).pack(side=tk.LEFT, padx=5)
+
+        # Page navigation, only enabled for combined searches
+        self.next_page_btn = ttk.Button(search_frame, text=">", width=3, state=tk.DISABLED,
+                                        command=lambda: self._show_combined_page(self.combined_page + 1))
+        self.next_page_btn.pack(side=tk.RIGHT, padx=(0, 5))
+        self.page_var = tk.StringVar(value="")
+        ttk.Label(search_frame, textvariable=self.page_var).pack(side=tk.RIGHT, padx=5)
+        self.prev_page_btn = ttk.Button(search_frame, text="<", width=3, state=tk.DISABLED,
+                                        command=lambda: self._show_combined_page(self.combined_page - 1))
+        self.prev_page_btn.pack(side=tk.RIGHT, padx=5)
+
         # Main file tree frame
         tree_frame = ttk.Frame(self.tab)
         tree_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
@@ -88,7 +159,7 @@ class BrowseTab:
         hsb.pack(side=tk.BOTTOM, fill=tk.X)
 
         # Create Treeview for files
-        self.tree = ttk.Treeview(tree_frame, columns=("type", "name", "size", "time", "tags"),
+        self.tree = ttk.Treeview(tree_frame, columns=("type", "name", "size", "time", "duration", "resolution", "tags"),
                                 show="headings", yscrollcommand=vsb.set, xscrollcommand=hsb.set,
                                 selectmode="extended")
 
@@ -104,6 +175,10 @@ class BrowseTab:
                         command=lambda: self._sort_by("size"))
         self.tree.heading("time", text=self.lang_manager.get_text("time"), 
                         command=lambda: self._sort_by("time"))
+        self.tree.heading("duration", text=self.lang_manager.get_text("duration"),
+                        command=lambda: self._sort_by("duration"))
+        self.tree.heading("resolution", text=self.lang_manager.get_text("resolution"),
+                        command=lambda: self._sort_by("resolution"))
         self.tree.heading("tags", text=self.lang_manager.get_text("tags"))
 
         # Set column widths
@@ -111,6 +186,8 @@ class BrowseTab:
         self.tree.column("name", width=300, anchor=tk.W)
         self.tree.column("size", width=100, anchor=tk.E)
         self.tree.column("time", width=150, anchor=tk.CENTER)
+        self.tree.column("duration", width=80, anchor=tk.E)
+        self.tree.column("resolution", width=90, anchor=tk.CENTER)
         self.tree.column("tags", width=250, anchor=tk.W)
 
         # Display the tree
@@ -137,6 +214,10 @@ class BrowseTab:
         remove_tag_btn = ttk.Button(tag_buttons_frame, text=self.lang_manager.get_text("remove_tags"),
                                   command=self._remove_tags_from_selected)
         remove_tag_btn.pack(side=tk.LEFT, padx=5)
+
+        duplicates_btn = ttk.Button(tag_buttons_frame, text=self.lang_manager.get_text("find_duplicates"),
+                                  command=self._find_duplicates)
+        duplicates_btn.pack(side=tk.RIGHT, padx=5)
         
     def update_language(self, lang_manager):
         """Update UI language"""
@@ -152,18 +233,99 @@ class BrowseTab:
         if self.file_list:
             self._update_treeview()
             
+    @user_action("browse.select_directory")
     def _select_directory(self):
         """Open directory selection dialog"""
         path = filedialog.askdirectory()
         if path:
-            self.current_path.set(path)
-            self.first_path = path
-            self.file_list = self.db_manager.get_calculated_list(path)
-            self.back_btn.config(state=tk.NORMAL)
-            self.new_folder_btn.config(state=tk.NORMAL)
-            self._set_drop_state(True)
-            self._update_treeview()
+            self.open_directory(path)
+            if self.on_directory_selected:
+                self.on_directory_selected(path)
+
+    def open_directory(self, path):
+        """Browse a directory and index it in the background"""
+        self.current_path.set(path)
+        self.first_path = path
+        self.file_list = self.db_manager.get_calculated_list(path)
+        self.back_btn.config(state=tk.NORMAL)
+        self.new_folder_btn.config(state=tk.NORMAL)
+        self._set_drop_state(True)
+        self._update_treeview()
+        self._start_library_scan(path)
+
+    def _edit_path_rules(self):
+        """Edit the path rules, the selected library is rescanned with the new rules"""
+        PathRulesDialog(self.parent, self.lang_manager, self.db_manager, self._on_path_rules_saved)
+
+    def _on_path_rules_saved(self):
+        if os.path.isdir(self.first_path):
+            self._start_library_scan(self.first_path)
+
+    def _start_library_scan(self, path):
+        """Index the selected library in a background thread"""
+        if self.scanner:
+            self.scanner.cancel()
+        scanner = LibraryScanner(self.db_manager, PathRuleSet(self.db_manager.get_path_rules()))
+        self.scanner = scanner
+
+        def worker():
+            try:
+                count = scanner.scan(path, lambda n: self.scan_messages.put((scanner, "progress", n)))
+                if scanner.cancelled:
+                    self.scan_messages.put((scanner, "cancelled", count))
+                else:
+                    self.scan_messages.put((scanner, "done",
+                                            (count, scanner.rule_tagged_count, scanner.metadata_count)))
+            except Exception as e:
+                self.scan_messages.put((scanner, "error", e))
+
+        threading.Thread(target=worker, daemon=True).start()
+        if not self.scan_polling:
+            self.scan_polling = True
+            self.parent.after(200, self._poll_scan_messages)
+
+    def cancel_library_scan(self):
+        """Stop the background indexing, e.g. before switching to another library"""
+        if self.scanner:
+            self.scanner.cancel()
+
+    def _poll_scan_messages(self):
+        """Show the indexing progress on the Tk thread, until the current scan ends"""
+        try:
+            while True:
+                scanner, kind, payload = self.scan_messages.get_nowait()
+                if scanner is not self.scanner:
+                    # Messages of a scan replaced by a newer one
+                    continue
+                if kind == "progress":
+                    self.index_status_var.set(self.lang_manager.get_text("indexing_library").format(payload))
+                elif kind == "done":
+                    count, rule_tagged_count, metadata_count = payload
+                    if not rule_tagged_count:
+                        self.index_status_var.set(self.lang_manager.get_text("library_indexed").format(count))
+                    else:
+                        self.index_status_var.set(self.lang_manager.get_text("library_indexed_with_rules").format(
+                            count, rule_tagged_count))
+                        self.on_refresh_tags()
+                    # The path rules tagged videos or the headers of new files were read, the listing is stale
+                    if (rule_tagged_count or metadata_count) and not self.path_before_search:
+                        self.refresh_file_list()
+                    self.scan_polling = False
+                    return
+                elif kind == "cancelled":
+                    self.index_status_var.set(self.lang_manager.get_text("library_index_cancelled").format(payload))
+                    self.scan_polling = False
+                    return
+                else:
+                    self.index_status_var.set("")
+                    print(f"Error indexing library: {payload}")
+                    self.scan_polling = False
+                    return
+        except queue.Empty:
+            pass
+        self.parent.after(200, self._poll_scan_messages)
             
+    @user_action("browse.back")
     def _go_back(self, after_search=False):
         """Navigate back to parent directory or clear search"""
         path = self.current_path.get()
@@ -182,6 +344,7 @@ class BrowseTab:
                 self.current_path.set(self.path_before_search)
 
         self.path_before_search = ""
+        self.combined_query = ""
         self.file_list = self.db_manager.get_calculated_list(self.current_path.get())
         self._update_treeview()
         
@@ -200,6 +363,7 @@ class BrowseTab:
             messagebox.showerror(self.lang_manager.get_text("error"), 
                               f"{self.lang_manager.get_text('create_folder_failed')}{str(e)}")
                               
+    @user_action("browse.open")
     def _on_double_click(self, event):
         """Handle double-click on file/folder in tree"""
         region = self.tree.identify_region(event.x, event.y)
@@ -255,6 +419,11 @@ class BrowseTab:
 
         if is_dir:
             menu.add_command(label="打开文件夹", command=lambda: self._on_double_click(event))
+            menu.add_separator()
+            menu.add_command(label=self.lang_manager.get_text("tag_folder"),
+                             command=lambda: self._tag_selected_files([item]))
+            menu.add_command(label=self.lang_manager.get_text("remove_folder_tags"),
+                             command=lambda: self._remove_tags_from_selected([item]))
         else:
             menu.add_command(label="打开文件", command=lambda: os.startfile(path))
             menu.add_separator()
@@ -267,6 +436,7 @@ class BrowseTab:
         # Display menu at cursor position
         menu.post(event.x_root, event.y_root)
         
+    @user_action("browse.delete")
     def _delete_file(self):
         """Delete selected file or directory"""
         selection = self.tree.selection()
@@ -294,11 +464,12 @@ class BrowseTab:
                 for file in os.listdir(path):
                     file_path = os.path.join(path, file)
                     if os.path.isfile(file_path):
-                        self.db_manager.remove_tags_from_file(file_path)
+                        self.db_manager.queue_remove_tags(file_path)
+                self.db_manager.remove_folder_tags(path, recursive=True)
                 shutil.rmtree(path)
             else:
                 # Remove tags from the file before deleting
-                self.db_manager.remove_tags_from_file(path)
+                self._manager_for(path).queue_remove_tags(path)
                 os.remove(path)
 
             self.file_list = self.db_manager.get_calculated_list(self.current_path.get())
@@ -345,11 +516,19 @@ class BrowseTab:
             self.tree.configure(cursor="no")
             self.tree.drop_target_unregister()
             
+    @user_action("browse.search")
     def _search_files(self, search_text):
-        """Search for files in current directory"""
+        """Search for files in current directory, or in the whole library"""
         if not search_text.strip():
             return
 
+        if self.search_scope_var.get() == self.lang_manager.get_text("scope_library"):
+            self._search_library_by_name(search_text)
+            return
+        if self.search_scope_var.get() == self.lang_manager.get_text("scope_names_and_tags"):
+            self._search_names_and_tags(search_text)
+            return
+
         self.path_before_search = self.current_path.get()
         filtered_list = []
 
@@ -361,6 +540,7 @@ class BrowseTab:
         self.file_list = filtered_list
         self._update_treeview()
         
+    @user_action("browse.sort")
     def _sort_by(self, column):
         """Sort file list by the given column"""
         if column == "name":
@@ -372,6 +552,12 @@ class BrowseTab:
         elif column == "time":
             self.file_list = get_list_sorted(self.file_list, "time", self.sort_by_time_desc)
             self.sort_by_time_desc = not self.sort_by_time_desc
+        elif column == "duration":
+            self.file_list = get_list_sorted(self.file_list, "duration", self.sort_by_duration_desc)
+            self.sort_by_duration_desc = not self.sort_by_duration_desc
+        elif column == "resolution":
+            self.file_list = get_list_sorted(self.file_list, "resolution", self.sort_by_resolution_desc)
+            self.sort_by_resolution_desc = not self.sort_by_resolution_desc
 
         self._update_treeview()
         
@@ -387,17 +573,13 @@ class BrowseTab:
         elif self.current_path.get() == self.first_path:
             self.back_btn.config(state=tk.DISABLED)
 
+        self._update_page_controls()
+        self.item_libraries = {item.path: item.library for item in self.file_list if item.library}
+
         # Add files and directories to tree
         for item in self.file_list:
-            tags_text = ", ".join(item.tags) if item.tags else ""
-
-            self.tree.insert("", "end", values=(
-                self.lang_manager.get_text("folder") if item.isDir else self.lang_manager.get_text("video"),
-                item.name,
-                item.getSizeConverted(),
-                item.getDateFormatted(),
-                tags_text
-            ), tags=(str(item.isDir), item.path))
+            self.tree.insert("", "end", values=build_file_row(item, self.lang_manager),
+                             tags=(str(item.isDir), item.path))
             
     def _tag_selected_files(self, items=None):
         """Show dialog to add tags to selected files"""
@@ -410,11 +592,13 @@ class BrowseTab:
             return
 
         # Get file paths
-        file_paths = []
-        for item in items:
-            item_data = self.tree.item(item, "tags")
-            if item_data and item_data[0] == "False":  # Only files, not directories
-                file_paths.append(item_data[1])
+        file_paths, folder_paths = self._split_selection(items)
+
+        if not file_paths and folder_paths:
+            # Folders only: the tags are stored on the folders and inherited by their videos
+            TagDialog(self.parent, self.lang_manager, self.db_manager, folder_paths, self._save_folder_tags,
+                      folders=True)
+            return
 
         if not file_paths:
             messagebox.showinfo(self.lang_manager.get_text("no_files"), 
@@ -423,7 +607,18 @@ class BrowseTab:
 
         # Create tagging dialog
         TagDialog(self.parent, self.lang_manager, self.db_manager, file_paths, self._save_tags)
+
+    def _split_selection(self, items):
+        """Return the (file paths, folder paths) of the given tree items"""
+        file_paths = []
+        folder_paths = []
+        for item in items:
+            item_data = self.tree.item(item, "tags")
+            if item_data:
+                (folder_paths if item_data[0] == "True" else file_paths).append(item_data[1])
+        return file_paths, folder_paths
         
+    @user_action("browse.save_tags")
     def _save_tags(self, file_paths, tag_text, append=True):
         """Save tags to the selected files"""
         # Parse tags
@@ -432,7 +627,7 @@ class BrowseTab:
         try:
             # Update each file
             for path in file_paths:
-                self.db_manager.add_or_update_tags(path, tags, append)
+                self._manager_for(path).queue_tags(path, tags, append)
 
             # Refresh the view
             self.file_list = self.db_manager.get_calculated_list(self.current_path.get())
@@ -443,7 +638,24 @@ class BrowseTab:
         except Exception as e:
             messagebox.showerror(self.lang_manager.get_text("error"), 
                                f"{self.lang_manager.get_text('save_tags_failed')}: {str(e)}")
+
+    @user_action("browse.save_folder_tags")
+    def _save_folder_tags(self, folder_paths, tag_text, append=True):
+        """Save tags to the selected folders (one write per folder)"""
+        tags = [t.strip() for t in tag_text.replace("，",",").split(",") if t.strip()]
+
+        try:
+            for path in folder_paths:
+                self.db_manager.add_or_update_folder_tags(path, tags, append)
+
+            self.file_list = self.db_manager.get_calculated_list(self.current_path.get())
+            self._update_treeview()
+            self.on_refresh_tags()
+        except Exception as e:
+            messagebox.showerror(self.lang_manager.get_text("error"),
+                               f"{self.lang_manager.get_text('save_tags_failed')}: {str(e)}")
             
+    @user_action("browse.remove_tags")
     def _remove_tags_from_selected(self, items=None):
         """Remove tags from selected files"""
         if items is None:
@@ -455,11 +667,11 @@ class BrowseTab:
             return
 
         # Get file paths
-        file_paths = []
-        for item in items:
-            item_data = self.tree.item(item, "tags")
-            if item_data and item_data[0] == "False":  # Only files, not directories
-                file_paths.append(item_data[1])
+        file_paths, folder_paths = self._split_selection(items)
+
+        if not file_paths and folder_paths:
+            self._remove_folder_tags(folder_paths)
+            return
 
         if not file_paths:
             messagebox.showinfo(self.lang_manager.get_text("no_files"), 
@@ -474,7 +686,7 @@ class BrowseTab:
         try:
             # Remove tags from each file
             for path in file_paths:
-                self.db_manager.remove_tags_from_file(path)
+                self._manager_for(path).queue_remove_tags(path)
 
             # Refresh views
             self.file_list = self.db_manager.get_calculated_list(self.current_path.get())
@@ -484,24 +696,166 @@ class BrowseTab:
         except Exception as e:
             messagebox.showerror(self.lang_manager.get_text("error"), 
                               f"{self.lang_manager.get_text('remove_tags_failed')}{str(e)}")
+
+    def _remove_folder_tags(self, folder_paths):
+        """Remove the tags of the selected folders (the tags of their videos are kept)"""
+        message = self.lang_manager.get_text("confirm_remove_folder_tags").format(len(folder_paths))
+        if not messagebox.askyesno(self.lang_manager.get_text("confirm"), message):
+            return
+
+        try:
+            for path in folder_paths:
+                self.db_manager.remove_folder_tags(path)
+
+            self.file_list = self.db_manager.get_calculated_list(self.current_path.get())
+            self._update_treeview()
+            self.on_refresh_tags()
+        except Exception as e:
+            messagebox.showerror(self.lang_manager.get_text("error"),
+                              f"{self.lang_manager.get_text('remove_tags_failed')}{str(e)}")
             
-    def search_videos_by_tag(self, tags):
-        """Search for videos with one or more tags"""
+    def _find_duplicates(self):
+        """Show dialog to find duplicate videos below the current directory"""
+        path = self.current_path.get()
+        if not path or not os.path.isdir(path):
+            messagebox.showinfo(self.lang_manager.get_text("no_selection"),
+                              self.lang_manager.get_text("select_directory_first"))
+            return
+
+        DuplicateDialog(self.parent, self.lang_manager, self.db_manager, path, self._on_duplicate_tags_merged)
+
+    def _on_duplicate_tags_merged(self):
+        """Refresh views after tags were merged across duplicates"""
+        self.refresh_file_list()
+        self.on_refresh_tags()
+
+    def refresh_file_list(self):
+        """Reload the tags of the displayed folder after they were changed elsewhere"""
+        if self.smart_folder and self.current_path.get() == self._smart_folder_title(self.smart_folder):
+            self.file_list = self.db_manager.get_saved_search_items(self.smart_folder)
+            self._update_treeview()
+        elif os.path.isdir(self.current_path.get()):
+            self.file_list = self.db_manager.get_calculated_list(self.current_path.get())
+            self._update_treeview()
+
+    def refresh_smart_folders(self):
+        """List the saved searches with their number of videos"""
+        self.smart_folder_names = {f"{doc['name']} ({doc.get('count', 0)})": doc["name"]
+                                   for doc in self.db_manager.saved_searches.get_all()}
+        self.smart_folder_combo.config(values=list(self.smart_folder_names))
+
+    def _smart_folder_title(self, name):
+        return self.lang_manager.get_text("smart_folder_results").format(name)
+
+    @user_action("browse.open_smart_folder")
+    def _open_smart_folder(self):
+        """Show the videos of the selected smart folder from its stored members"""
+        name = self.smart_folder_names.get(self.smart_folder_var.get())
+        if not name:
+            return
+        videos = self.db_manager.get_saved_search_items(name)
+        if not videos:
+            messagebox.showinfo(self.lang_manager.get_text("no_results"),
+                              self.lang_manager.get_text("smart_folder_empty").format(name))
+            return
+
+        if not self.path_before_search:
+            self.path_before_search = self.current_path.get()
+        self.smart_folder = name
+        self.current_path.set(self._smart_folder_title(name))
+        self.combined_query = ""
+        self.file_list = videos
+        self._update_treeview()
+
+    def _delete_smart_folder(self):
+        """Delete the selected smart folder (its videos are not changed)"""
+        name = self.smart_folder_names.get(self.smart_folder_var.get())
+        if not name:
+            return
+        if not messagebox.askyesno(self.lang_manager.get_text("confirm"),
+                                   self.lang_manager.get_text("confirm_delete_smart_folder").format(name)):
+            return
+        self.db_manager.saved_searches.delete(name)
+        self.smart_folder_var.set("")
+        self.refresh_smart_folders()
+
+    def _search_library_by_name(self, search_text):
+        """Search file names across the whole indexed library"""
+        videos = self.db_manager.search_videos_by_name(search_text)
+        if not videos:
+            messagebox.showinfo(self.lang_manager.get_text("no_results"),
+                              self.lang_manager.get_text("no_videos_with_name").format(search_text))
+            return
+
+        if not self.path_before_search:
+            self.path_before_search = self.current_path.get()
+        self.current_path.set(self.lang_manager.get_text("name_search_results").format(search_text))
+        self.combined_query = ""
+        self.file_list = videos
+        self._update_treeview()
+
+    def _search_names_and_tags(self, search_text):
+        """Search names and tags across the library, ranked by relevance"""
+        self.combined_query = search_text
+        if not self._show_combined_page(0):
+            self.combined_query = ""
+            messagebox.showinfo(self.lang_manager.get_text("no_results"),
+                              self.lang_manager.get_text("no_videos_with_name_or_tag").format(search_text))
+
+    @user_action("browse.combined_page")
+    def _show_combined_page(self, page):
+        """Show one page of the current combined search"""
+        videos, total = self.search_engine.search(self.combined_query, page, SEARCH_PAGE_SIZE)
+        if not total:
+            return False
+
+        self.combined_page = page
+        self.combined_total = total
+        if not self.path_before_search:
+            self.path_before_search = self.current_path.get()
+        self.current_path.set(self.lang_manager.get_text("combined_search_results").format(self.combined_query))
+        self.file_list = videos
+        self._update_treeview()
+        return True
+
+    def _update_page_controls(self):
+        """Enable the page buttons only while a combined search is displayed"""
+        page_count = (self.combined_total + SEARCH_PAGE_SIZE - 1) // SEARCH_PAGE_SIZE
+        active = self.combined_query and self.path_before_search
+        self.page_var.set(f"{self.combined_page + 1} / {page_count}" if active else "")
+        self.prev_page_btn.config(state=tk.NORMAL if active and self.combined_page > 0 else tk.DISABLED)
+        self.next_page_btn.config(state=tk.NORMAL if active and self.combined_page + 1 < page_count else tk.DISABLED)
+
+    def _manager_for(self, path):
+        """DBManager of the library a listed video was found in, the current library by default"""
+        return self.library_managers.get(self.item_libraries.get(path), self.db_manager)
+
+    @user_action("browse.tag_search")
+    def search_videos_by_tag(self, tags, ranges=None, federated=None):
+        """Search for videos with one or more tags, optionally within range filters
+
+        With a FederatedSearch, every library it holds is searched and the
+        results are merged by name.
+        """
         if not tags:
             return
             
         # Switch to browse tab
         
         # Set different messages for single vs multiple tag search
-        if len(tags) == 1:
+        if federated is not None:
+            self.current_path.set(f"{self.lang_manager.get_text('multi_tag_search_results').format(', '.join(tags))}")
+            tagged_videos = federated.find_videos_by_tags(tags, ranges, sort_by="name")
+            self.library_managers = federated.managers
+        elif len(tags) == 1:
             self.current_path.set(f"{self.lang_manager.get_text('tag_search_results').format(tags[0])}")
             # Find videos with a single tag
-            tagged_videos = self.db_manager.find_videos_by_tag(tags[0])
+            tagged_videos = self.db_manager.find_videos_by_tag(tags[0], ranges)
             search_description = tags[0]
         else:
             self.current_path.set(f"{self.lang_manager.get_text('multi_tag_search_results').format(', '.join(tags))}")
             # Multi-tag search (AND operation)
-            tagged_videos = self.db_manager.find_videos_by_tags(tags)
+            tagged_videos = self.db_manager.find_videos_by_tags(tags, ranges)
             
         if not tagged_videos:
             if len(tags) == 1:
@@ -515,6 +869,7 @@ class BrowseTab:
         self.path_before_search = self.current_path.get()
         
         # Update file list and view
+        self.combined_query = ""
         self.file_list = tagged_videos
         self._update_treeview()
         return True
\ No newline at end of file
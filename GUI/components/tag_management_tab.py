@@ -1,16 +1,33 @@
+import time
 import tkinter as tk
 from tkinter import ttk, messagebox
-from utils.TagManage_utils import replace_current_tag
+from utils.TagManage_utils import (replace_current_tag, update_suggestion_buttons,
+                                   format_size, format_duration, format_time)
+from utils.suggestion_pipeline import SuggestionPipeline
+from DB.instrumentation import user_action
+from GUI.dialogs.similar_tags_dialog import SimilarTagsDialog
+from GUI.dialogs.rename_tag_dialog import RenameTagDialog
+from GUI.dialogs.save_search_dialog import SaveSearchDialog
+
+# Minimum resolution choices for tag search, mapped to a minimum pixel height
+RESOLUTION_FILTERS = {"720p": 720, "1080p": 1080, "4K": 2160}
+
+# Number of bytes in a gigabyte, the unit of the size filters
+BYTES_PER_GB = 1024 ** 3
 
 class TagManagementTab:
     """Tab for managing and searching tags"""
-    def __init__(self, parent, lang_manager, db_manager, on_search_by_tag):
+    def __init__(self, parent, lang_manager, db_manager, on_search_by_tag, on_tags_changed=None):
         self.parent = parent
         self.tab = ttk.Frame(parent)
         self.lang_manager = lang_manager
         self.db_manager = db_manager
         self.on_search_by_tag = on_search_by_tag
+        self.on_tags_changed = on_tags_changed
         
+        # Field the top tags are sorted by (one of DBManager's TAG_SORT_FIELDS)
+        self.top_tags_sort = "count"
+
         # Search suggestions
         self.search_suggestion_buttons = []
         self.search_suggestion_max_width = 10
@@ -40,7 +57,8 @@ class TagManagementTab:
         hsb = ttk.Scrollbar(top_tags_tree_frame, orient="horizontal")
         
         # Increase height to show more tags at once
-        self.top_tags_tree = ttk.Treeview(top_tags_tree_frame, columns=("name", "count"),
+        self.top_tags_tree = ttk.Treeview(top_tags_tree_frame,
+                                        columns=("name", "count", "totalSize", "totalDuration", "latestModifyTime"),
                                         show="headings", height=8,
                                         yscrollcommand=vsb.set, xscrollcommand=hsb.set)
 
@@ -48,10 +66,17 @@ class TagManagementTab:
         hsb.config(command=self.top_tags_tree.xview)
         
         self.top_tags_tree.heading("name", text=self.lang_manager.get_text("tag_name"))
-        self.top_tags_tree.heading("count", text=self.lang_manager.get_text("usage_count"))
+        # Clicking a statistics heading sorts the top tags by it (on the server)
+        for column, text_key in (("count", "usage_count"), ("totalSize", "total_size"),
+                                 ("totalDuration", "total_duration"), ("latestModifyTime", "latest_modified")):
+            self.top_tags_tree.heading(column, text=self.lang_manager.get_text(text_key),
+                                       command=lambda field=column: self._sort_top_tags(field))
 
         self.top_tags_tree.column("name", width=200)
         self.top_tags_tree.column("count", width=100)
+        self.top_tags_tree.column("totalSize", width=100, anchor=tk.E)
+        self.top_tags_tree.column("totalDuration", width=100, anchor=tk.E)
+        self.top_tags_tree.column("latestModifyTime", width=130)
 
         # Grid layout for treeview and scrollbars
         self.top_tags_tree.grid(row=0, column=0, sticky='nsew')
@@ -62,10 +87,34 @@ class TagManagementTab:
         top_tags_tree_frame.grid_rowconfigure(0, weight=1)
         
         self.top_tags_tree.bind("<Double-1>", self._on_tag_double_click)
+        self.top_tags_tree.bind("<<TreeviewSelect>>", self._on_top_tag_select)
+
+        # Tags most often used together with the selected top tag
+        ttk.Label(top_tags_frame, text=self.lang_manager.get_text("related_tags")).pack(anchor=tk.W, pady=(5, 0))
+        self.related_tags_tree = ttk.Treeview(top_tags_frame, columns=("name", "count"),
+                                              show="headings", height=4)
+        self.related_tags_tree.heading("name", text=self.lang_manager.get_text("tag_name"))
+        self.related_tags_tree.heading("count", text=self.lang_manager.get_text("co_occurrence"))
+        self.related_tags_tree.column("name", width=200)
+        self.related_tags_tree.column("count", width=100)
+        self.related_tags_tree.pack(fill=tk.X, pady=5)
+        self.related_tags_tree.bind("<Double-1>", self._on_related_tag_double_click)
 
-        refresh_btn = ttk.Button(top_tags_frame, text=self.lang_manager.get_text("refresh"), 
+        top_tags_btn_frame = ttk.Frame(top_tags_frame)
+        top_tags_btn_frame.pack(fill=tk.X, pady=5)
+
+        refresh_btn = ttk.Button(top_tags_btn_frame, text=self.lang_manager.get_text("refresh"), 
                                command=self.refresh_top_tags)
-        refresh_btn.pack(anchor=tk.E, pady=5)
+        refresh_btn.pack(side=tk.RIGHT)
+
+        similar_tags_btn = ttk.Button(top_tags_btn_frame, text=self.lang_manager.get_text("find_similar_tags"),
+                                      command=lambda: SimilarTagsDialog(self.parent, self.lang_manager,
+                                                                        self.db_manager, self._merge_tags))
+        similar_tags_btn.pack(side=tk.RIGHT, padx=5)
+
+        rename_btn = ttk.Button(top_tags_btn_frame, text=self.lang_manager.get_text("rename_merge_tags"),
+                                command=self._rename_selected_tags)
+        rename_btn.pack(side=tk.RIGHT)
 
         # Search by tag section
         search_tag_frame = ttk.Frame(main_frame)
@@ -108,15 +157,58 @@ class TagManagementTab:
             btn.grid(row=row, column=col, padx=2, pady=2, sticky=tk.W)
             self.search_suggestion_buttons.append(btn)
         
-        # Connect the tag_search_var to the update function
+        # Connect the tag_search_var to the update function (debounced, looked up off the Tk thread)
+        self.suggestion_pipeline = SuggestionPipeline(
+            self.tab,
+            lambda query, limit, context: self.db_manager.search_similar_tags(query, limit, True, list(context)),
+            self._show_search_suggestions,
+            version=lambda: self.db_manager.tags_version,
+            fill=lambda query, limit, exclude: self.db_manager.find_fuzzy_tags(query, limit, exclude, build=False)
+        )
         self.tag_search_var.trace("w", lambda n, i, m, v=self.tag_search_var: self._update_search_suggestions(v))
 
+        # Range filters applied by the database together with the tags
+        filter_frame = ttk.Frame(search_tag_frame)
+        filter_frame.pack(fill=tk.X, pady=(0, 5))
+
+        ttk.Label(filter_frame, text=self.lang_manager.get_text("size_gb")).pack(side=tk.LEFT, padx=(0, 5))
+        self.min_size_var = tk.StringVar()
+        ttk.Entry(filter_frame, textvariable=self.min_size_var, width=6).pack(side=tk.LEFT)
+        ttk.Label(filter_frame, text=" - ").pack(side=tk.LEFT)
+        self.max_size_var = tk.StringVar()
+        ttk.Entry(filter_frame, textvariable=self.max_size_var, width=6).pack(side=tk.LEFT)
+
+        ttk.Label(filter_frame, text=self.lang_manager.get_text("modified_within_days")).pack(side=tk.LEFT, padx=(15, 5))
+        self.modified_days_var = tk.StringVar()
+        ttk.Entry(filter_frame, textvariable=self.modified_days_var, width=6).pack(side=tk.LEFT)
+
+        ttk.Label(filter_frame, text=self.lang_manager.get_text("duration_minutes")).pack(side=tk.LEFT, padx=(15, 5))
+        self.min_duration_var = tk.StringVar()
+        ttk.Entry(filter_frame, textvariable=self.min_duration_var, width=6).pack(side=tk.LEFT)
+        ttk.Label(filter_frame, text=" - ").pack(side=tk.LEFT)
+        self.max_duration_var = tk.StringVar()
+        ttk.Entry(filter_frame, textvariable=self.max_duration_var, width=6).pack(side=tk.LEFT)
+
+        ttk.Label(filter_frame, text=self.lang_manager.get_text("min_resolution")).pack(side=tk.LEFT, padx=(15, 5))
+        self.min_resolution_var = tk.StringVar(value=self.lang_manager.get_text("any"))
+        ttk.Combobox(filter_frame, textvariable=self.min_resolution_var, width=8, state="readonly",
+                     values=[self.lang_manager.get_text("any")] + list(RESOLUTION_FILTERS)).pack(side=tk.LEFT)
+
+        # Search every library instead of the current one, results merged by name
+        self.all_libraries_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(search_tag_frame, text=self.lang_manager.get_text("search_all_libraries"),
+                        variable=self.all_libraries_var).pack(anchor=tk.W, pady=(5, 0))
+
         # Search button
         search_tag_btn = ttk.Button(search_tag_frame, text=self.lang_manager.get_text("search_btn"), 
                                   style="Accent.TButton",
                                   command=lambda: self._search_videos_by_tag(self.tag_search_var.get()))
         search_tag_btn.pack(fill=tk.X, pady=5)
 
+        # Save the tags and filters as a smart folder of the browse tab
+        ttk.Button(search_tag_frame, text=self.lang_manager.get_text("save_search"),
+                   command=lambda: self._save_search(self.tag_search_var.get())).pack(fill=tk.X)
+
         # initialize the tag management tab
         self.refresh_top_tags()
         
@@ -125,24 +217,34 @@ class TagManagementTab:
         self.lang_manager = lang_manager
         
         # Rebuild UI with new language
+        self.suggestion_pipeline.close()
         for widget in self.tab.winfo_children():
             widget.destroy()
             
         self._setup_ui()
         
+    @user_action("tags.refresh_top_tags")
     def refresh_top_tags(self):
         """Refresh the top tags display"""
         # Clear current tags
         for item in self.top_tags_tree.get_children():
             self.top_tags_tree.delete(item)
 
-        # Get top tags
-        top_tags = self.db_manager.get_top_tags()
+        # Get top tags, sorted by the selected statistic
+        top_tags = self.db_manager.get_top_tags_with_stats(sort_by=self.top_tags_sort)
 
         # Add to tree
         for tag_info in top_tags:
-            self.top_tags_tree.insert("", "end", values=(tag_info["name"], tag_info["count"]))
-            
+            self.top_tags_tree.insert("", "end", values=(
+                tag_info["name"], tag_info["count"], format_size(tag_info.get("totalSize")),
+                format_duration(tag_info.get("totalDuration")), format_time(tag_info.get("latestModifyTime"))))
+
+    @user_action("tags.sort_top_tags")
+    def _sort_top_tags(self, field):
+        """Show the top tags by another statistic"""
+        self.top_tags_sort = field
+        self.refresh_top_tags()
+
     def _on_tag_double_click(self, event):
         """Handle double-click on a tag in top tags tree"""
         selection = self.top_tags_tree.selection()
@@ -156,53 +258,162 @@ class TagManagementTab:
         self.tag_search_var.set(tag_name)
         self._search_videos_by_tag(tag_name)
         
+    def _rename_selected_tags(self):
+        """Rename the selected top tag, or merge the selected top tags into one"""
+        selection = self.top_tags_tree.selection()
+        if not selection:
+            messagebox.showinfo(self.lang_manager.get_text("no_selection"),
+                                self.lang_manager.get_text("select_tags_first"))
+            return
+
+        tags = [self.top_tags_tree.item(item, "values")[0] for item in selection]
+        RenameTagDialog(self.parent, self.lang_manager, tags, self._merge_tags)
+
+    @user_action("tags.merge")
+    def _merge_tags(self, source_tags, target_tag):
+        """Replace the source tags by target_tag on every video, after confirmation
+
+        Returns:
+            True if the tags were merged
+        """
+        sources = [tag for tag in source_tags if tag != target_tag]
+        if not sources:
+            return True
+
+        message = self.lang_manager.get_text("confirm_merge_tags").format(", ".join(sources), target_tag)
+        if not messagebox.askyesno(self.lang_manager.get_text("confirm"), message):
+            return False
+
+        try:
+            changed = self.db_manager.merge_tags(sources, target_tag)
+        except Exception as e:
+            messagebox.showerror(self.lang_manager.get_text("error"), str(e))
+            return False
+
+        self.refresh_top_tags()
+        if self.on_tags_changed:
+            self.on_tags_changed()
+        messagebox.showinfo(self.lang_manager.get_text("merge_tags"),
+                            self.lang_manager.get_text("tags_merged").format(changed))
+        return True
+
+    @user_action("tags.select")
+    def _on_top_tag_select(self, event):
+        """Show the tags most often used together with the selected top tag"""
+        for item in self.related_tags_tree.get_children():
+            self.related_tags_tree.delete(item)
+
+        selection = self.top_tags_tree.selection()
+        if not selection:
+            return
+
+        tag_name = self.top_tags_tree.item(selection[0], "values")[0]
+        for name, count in self.db_manager.get_related_tags([tag_name]):
+            self.related_tags_tree.insert("", "end", values=(name, count))
+
+    def _on_related_tag_double_click(self, event):
+        """Add the double-clicked related tag to the tag search field"""
+        selection = self.related_tags_tree.selection()
+        if not selection:
+            return
+
+        tag_name = self.related_tags_tree.item(selection[0], "values")[0]
+        tags = [t.strip() for t in self.tag_search_var.get().replace("，", ",").split(",") if t.strip()]
+        if tag_name not in tags:
+            tags.append(tag_name)
+        self.tag_search_var.set(", ".join(tags))
+
+    @user_action("tags.search")
     def _search_videos_by_tag(self, tag):
         """Search for videos with one or more tags"""
+        search = self._read_search(tag)
+        if search:
+            # Let parent handle the actual search
+            self.on_search_by_tag(*search, all_libraries=self.all_libraries_var.get())
+
+    def _read_search(self, tag):
+        """Return the (tags, ranges) of the search controls, None after showing why they are invalid"""
         if not tag.strip():
             messagebox.showinfo(self.lang_manager.get_text("missing_tag"), 
                               self.lang_manager.get_text("enter_search_tag"))
-            return
+            return None
 
         # Split by comma to support multiple tag search
         tags = [t.strip() for t in tag.replace("，",",").split(",") if t.strip()]
-        
-        # Let parent handle the actual search
-        self.on_search_by_tag(tags)
+
+        try:
+            ranges = self._get_range_filters()
+        except ValueError:
+            messagebox.showerror(self.lang_manager.get_text("error"),
+                                 self.lang_manager.get_text("invalid_filter_value"))
+            return None
+        return tags, ranges
+
+    def _save_search(self, tag):
+        """Ask a name and save the current tag search as a smart folder"""
+        search = self._read_search(tag)
+        if not search:
+            return
+        names = [doc["name"] for doc in self.db_manager.saved_searches.get_all()]
+        SaveSearchDialog(self.parent, self.lang_manager, names, lambda name: self._store_search(name, *search))
+
+    @user_action("tags.save_search")
+    def _store_search(self, name, tags, ranges):
+        try:
+            count = self.db_manager.saved_searches.save(name, tags, ranges)
+        except Exception as e:
+            messagebox.showerror(self.lang_manager.get_text("error"),
+                                 f"{self.lang_manager.get_text('save_search_failed')}{str(e)}")
+            return
+        messagebox.showinfo(self.lang_manager.get_text("save_search"),
+                            self.lang_manager.get_text("smart_folder_saved").format(name, count))
+
+    def _get_range_filters(self):
+        """Read the range filter controls (raises ValueError on invalid numbers)"""
+        ranges = {}
+
+        min_size = self.min_size_var.get().strip()
+        max_size = self.max_size_var.get().strip()
+        if min_size or max_size:
+            ranges["size"] = (float(min_size) * BYTES_PER_GB if min_size else None,
+                              float(max_size) * BYTES_PER_GB if max_size else None)
+
+        modified_days = self.modified_days_var.get().strip()
+        if modified_days:
+            ranges["lastModifyTime"] = (time.time() - float(modified_days) * 86400, None)
+
+        min_duration = self.min_duration_var.get().strip()
+        max_duration = self.max_duration_var.get().strip()
+        if min_duration or max_duration:
+            # Entered in minutes, stored in seconds
+            ranges["duration"] = (float(min_duration) * 60 if min_duration else None,
+                                  float(max_duration) * 60 if max_duration else None)
+
+        min_height = RESOLUTION_FILTERS.get(self.min_resolution_var.get())
+        if min_height:
+            ranges["height"] = (min_height, None)
+
+        return ranges
         
     def _update_search_suggestions(self, tag_var):
         """Update search tag suggestions based on current input"""
         text = tag_var.get()
-        if not text:
-            for btn in self.search_suggestion_buttons:
-                btn.config(text="", state=tk.DISABLED)
-            return
 
         # Get the last tag being typed
         tags = [t.strip() for t in text.replace("，",",").split(",")]
         current_tag = tags[-1].strip() if tags else ""
+        context = tuple(t for t in tags[:-1] if t)
 
-        if not current_tag:
-            for btn in self.search_suggestion_buttons:
-                btn.config(text="", state=tk.DISABLED)
+        # With tags already entered, an empty fragment still suggests the tags used with them
+        if not current_tag and not context:
+            self.suggestion_pipeline.cancel()
+            self._show_search_suggestions([])
             return
 
-        # Get suggestions
-        suggestions = self.db_manager.search_similar_tags(current_tag)
-        
-        # Calculate the maximum width required for suggestions
-        max_width = self.search_suggestion_max_width  # Start with previously calculated width
-        for suggestion in suggestions:
-            suggestion_width = len(suggestion) + 2  # Add padding
-            max_width = max(max_width, suggestion_width)
-        
-        # Update all buttons to the new width for consistency
-        for btn in self.search_suggestion_buttons:
-            btn.config(width=max_width)
-        
-        # Update buttons
-        for i, btn in enumerate(self.search_suggestion_buttons):
-            if i < len(suggestions):
-                btn.config(text=suggestions[i], state=tk.NORMAL,
-                          command=lambda t=suggestions[i], ct=current_tag: replace_current_tag(tag_var, t))
-            else:
-                btn.config(text="", state=tk.DISABLED)
+        # Tags already entered rank the suggestions by co-occurrence
+        self.suggestion_pipeline.request(current_tag, context)
+
+    def _show_search_suggestions(self, suggestions):
+        """Display suggestions, only touching the buttons whose content changed"""
+        update_suggestion_buttons(self.search_suggestion_buttons, suggestions, self.search_suggestion_max_width,
+                                  lambda t: replace_current_tag(self.tag_search_var, t))
@@ -0,0 +1,75 @@
+import tkinter as tk
+from tkinter import ttk
+from GUI.dialogs.base_dialog import BaseDialog
+
+# Report fields shown as columns, after the operation name
+DIAGNOSTICS_COLUMNS = ["count", "p50_ms", "p95_ms", "p99_ms", "max_ms", "total_ms", "round_trips_mean"]
+
+
+class DiagnosticsDialog(BaseDialog):
+    """Dialog showing the instrumentation report: timings of user actions, DBManager methods and database calls"""
+    def __init__(self, parent, lang_manager, instrumentation):
+        super().__init__(parent, lang_manager.get_text("diagnostics"), "900x500")
+        self.lang_manager = lang_manager
+        self.instrumentation = instrumentation
+        self.dialog.resizable(True, True)
+        self._setup_ui()
+        self._refresh()
+
+    def _setup_ui(self):
+        tree_frame = ttk.Frame(self.dialog)
+        tree_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=(10, 5))
+
+        vsb = ttk.Scrollbar(tree_frame, orient="vertical")
+        vsb.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.tree = ttk.Treeview(tree_frame, columns=["operation"] + DIAGNOSTICS_COLUMNS,
+                                 show="headings", yscrollcommand=vsb.set)
+        vsb.config(command=self.tree.yview)
+        self.tree.heading("operation", text=self.lang_manager.get_text("operation"))
+        self.tree.column("operation", width=280, anchor=tk.W)
+        for column in DIAGNOSTICS_COLUMNS:
+            self.tree.heading(column, text=self.lang_manager.get_text(f"diagnostics_{column}"))
+            self.tree.column(column, width=80, anchor=tk.E)
+        self.tree.pack(fill=tk.BOTH, expand=True)
+
+        # Database calls made by the selected user action
+        self.calls_var = tk.StringVar(value="")
+        ttk.Label(self.dialog, textvariable=self.calls_var, wraplength=860,
+                  justify=tk.LEFT).pack(padx=10, anchor=tk.W)
+        self.tree.bind("<<TreeviewSelect>>", self._on_select)
+
+        btn_frame = ttk.Frame(self.dialog)
+        btn_frame.pack(pady=10, fill=tk.X)
+
+        ttk.Button(btn_frame, text=self.lang_manager.get_text("cancel"),
+                   command=self.destroy).pack(side=tk.RIGHT, padx=(5, 10))
+        ttk.Button(btn_frame, text=self.lang_manager.get_text("reset"),
+                   command=self._reset).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(btn_frame, text=self.lang_manager.get_text("refresh"),
+                   style="Accent.TButton", command=self._refresh).pack(side=tk.RIGHT)
+
+    def _refresh(self):
+        for item in self.tree.get_children():
+            self.tree.delete(item)
+        self.report = self.instrumentation.report()
+        # User actions first, then the most expensive operations
+        rows = sorted(self.report.items(), key=lambda item: (not item[0].startswith("action."),
+                                                             -item[1]["total_ms"]))
+        for name, stats in rows:
+            self.tree.insert("", "end", iid=name,
+                             values=[name] + [stats.get(column, "") for column in DIAGNOSTICS_COLUMNS])
+        self.calls_var.set("")
+
+    def _reset(self):
+        self.instrumentation.reset()
+        self._refresh()
+
+    def _on_select(self, event):
+        selection = self.tree.selection()
+        stats = self.report.get(selection[0]) if selection else None
+        if not stats or "top_calls" not in stats:
+            self.calls_var.set("")
+            return
+        calls = ", ".join(f"{name} x{count}" for name, count in stats["top_calls"].items())
+        self.calls_var.set(self.lang_manager.get_text("diagnostics_top_calls").format(calls))
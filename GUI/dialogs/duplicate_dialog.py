@@ -0,0 +1,166 @@
+import queue
+import threading
+import tkinter as tk
+from tkinter import ttk, messagebox
+from GUI.dialogs.base_dialog import BaseDialog
+from DB.duplicate_finder import DuplicateFinder
+
+
+class DuplicateDialog(BaseDialog):
+    """Dialog for finding duplicate videos in a folder and merging their tags"""
+    def __init__(self, parent, lang_manager, db_manager, root_path, on_tags_merged):
+        super().__init__(parent, lang_manager.get_text("find_duplicates"), "800x500")
+        self.lang_manager = lang_manager
+        self.db_manager = db_manager
+        self.root_path = root_path
+        self.on_tags_merged = on_tags_merged
+
+        self.finder = None
+        self.groups = []
+        # Messages posted by the worker thread, consumed on the Tk thread
+        self.messages = queue.Queue()
+
+        self.dialog.resizable(True, True)
+        self.dialog.protocol("WM_DELETE_WINDOW", self._on_close)
+        self._setup_ui()
+
+    def _setup_ui(self):
+        ttk.Label(self.dialog, text=f"{self.lang_manager.get_text('directory')} {self.root_path}",
+                  font=('Segoe UI', 10, 'bold')).pack(pady=(10, 5), padx=10, anchor=tk.W)
+
+        options_frame = ttk.Frame(self.dialog)
+        options_frame.pack(fill=tk.X, padx=10, pady=5)
+
+        self.full_hash_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(options_frame, text=self.lang_manager.get_text("verify_full_hash"),
+                        variable=self.full_hash_var).pack(side=tk.LEFT)
+
+        self.start_btn = ttk.Button(options_frame, text=self.lang_manager.get_text("start_scan"),
+                                    style="Accent.TButton", command=self._start_scan)
+        self.start_btn.pack(side=tk.RIGHT)
+
+        # Progress display
+        self.progress_var = tk.StringVar(value="")
+        ttk.Label(self.dialog, textvariable=self.progress_var).pack(padx=10, anchor=tk.W)
+        self.progress_bar = ttk.Progressbar(self.dialog, mode="determinate")
+        self.progress_bar.pack(fill=tk.X, padx=10, pady=5)
+
+        # Result tree, one parent row per duplicate group
+        tree_frame = ttk.Frame(self.dialog)
+        tree_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+
+        vsb = ttk.Scrollbar(tree_frame, orient="vertical")
+        vsb.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.tree = ttk.Treeview(tree_frame, columns=("name", "size", "tags"),
+                                 show="tree headings", yscrollcommand=vsb.set, selectmode="browse")
+        vsb.config(command=self.tree.yview)
+
+        self.tree.heading("name", text=self.lang_manager.get_text("name"))
+        self.tree.heading("size", text=self.lang_manager.get_text("size"))
+        self.tree.heading("tags", text=self.lang_manager.get_text("tags"))
+        self.tree.column("#0", width=80)
+        self.tree.column("name", width=350, anchor=tk.W)
+        self.tree.column("size", width=100, anchor=tk.E)
+        self.tree.column("tags", width=250, anchor=tk.W)
+        self.tree.pack(fill=tk.BOTH, expand=True)
+
+        btn_frame = ttk.Frame(self.dialog)
+        btn_frame.pack(pady=10, fill=tk.X, side=tk.BOTTOM)
+
+        ttk.Button(btn_frame, text=self.lang_manager.get_text("cancel"),
+                   command=self._on_close).pack(side=tk.RIGHT, padx=(5, 10))
+
+        self.merge_btn = ttk.Button(btn_frame, text=self.lang_manager.get_text("merge_group_tags"),
+                                    command=self._merge_selected_group, state=tk.DISABLED)
+        self.merge_btn.pack(side=tk.RIGHT)
+
+    def _start_scan(self):
+        """Run the duplicate finder in a background thread"""
+        self.start_btn.config(state=tk.DISABLED)
+        self.merge_btn.config(state=tk.DISABLED)
+        for item in self.tree.get_children():
+            self.tree.delete(item)
+
+        self.finder = DuplicateFinder(self.db_manager)
+        full_hash = self.full_hash_var.get()
+
+        def worker():
+            try:
+                groups = self.finder.find_duplicates_in_folder(
+                    self.root_path, full_hash,
+                    lambda stage, done, total: self.messages.put(("progress", (stage, done, total))))
+                self.messages.put(("done", groups))
+            except Exception as e:
+                self.messages.put(("error", e))
+
+        threading.Thread(target=worker, daemon=True).start()
+        self.dialog.after(100, self._poll_messages)
+
+    def _poll_messages(self):
+        """Apply the worker messages on the Tk thread"""
+        try:
+            while True:
+                kind, payload = self.messages.get_nowait()
+                if kind == "progress":
+                    stage, done, total = payload
+                    self.progress_var.set(self.lang_manager.get_text(f"duplicate_stage_{stage}").format(done, total))
+                    self.progress_bar.config(maximum=max(total, 1), value=done if total else 0)
+                elif kind == "done":
+                    self._show_groups(payload)
+                    return
+                else:
+                    self.start_btn.config(state=tk.NORMAL)
+                    messagebox.showerror(self.lang_manager.get_text("error"), str(payload), parent=self.dialog)
+                    return
+        except queue.Empty:
+            pass
+        except tk.TclError:
+            # Dialog was closed while scanning
+            return
+        self.dialog.after(100, self._poll_messages)
+
+    def _show_groups(self, groups):
+        """Display the duplicate groups"""
+        self.groups = groups
+        self.start_btn.config(state=tk.NORMAL)
+        self.progress_var.set(self.lang_manager.get_text("duplicate_groups_found").format(len(groups)))
+
+        for index, group in enumerate(groups):
+            parent = self.tree.insert("", "end", text=f"#{index + 1}", open=True,
+                                      values=("", group[0].getSizeConverted(), ""))
+            for item in group:
+                self.tree.insert(parent, "end", values=(item.path, "", ", ".join(item.tags)))
+
+        if groups:
+            self.merge_btn.config(state=tk.NORMAL)
+
+    def _merge_selected_group(self):
+        """Give every file of the selected group the union of the group's tags"""
+        selection = self.tree.selection()
+        if not selection:
+            messagebox.showinfo(self.lang_manager.get_text("no_selection"),
+                                self.lang_manager.get_text("select_duplicate_group"), parent=self.dialog)
+            return
+
+        # Selecting a file row selects its group
+        group_row = self.tree.parent(selection[0]) or selection[0]
+        group = self.groups[self.tree.index(group_row)]
+
+        try:
+            merged_tags = self.db_manager.merge_tags_for_files([item.path for item in group])
+        except Exception as e:
+            messagebox.showerror(self.lang_manager.get_text("error"), str(e), parent=self.dialog)
+            return
+
+        for item in group:
+            item.tags = list(merged_tags)
+        for child in self.tree.get_children(group_row):
+            self.tree.set(child, "tags", ", ".join(merged_tags))
+
+        self.on_tags_merged()
+
+    def _on_close(self):
+        if self.finder:
+            self.finder.cancel()
+        self.destroy()
@@ -0,0 +1,43 @@
+import tkinter as tk
+from tkinter import ttk, messagebox
+from GUI.dialogs.base_dialog import BaseDialog
+
+class NewLibraryDialog(BaseDialog):
+    """Dialog for creating a new library"""
+    def __init__(self, parent, lang_manager, create_callback):
+        super().__init__(parent, lang_manager.get_text("new_library"))
+        self.lang_manager = lang_manager
+        self.create_callback = create_callback
+        self._setup_ui()
+
+    def _setup_ui(self):
+        ttk.Label(self.dialog, text=self.lang_manager.get_text("library_name")).pack(pady=(10, 5))
+
+        self.name_var = tk.StringVar()
+        name_entry = ttk.Entry(self.dialog, textvariable=self.name_var, width=40)
+        name_entry.pack(padx=10, pady=5, fill=tk.X)
+        name_entry.focus_set()
+
+        btn_frame = ttk.Frame(self.dialog)
+        btn_frame.pack(pady=10, fill=tk.X)
+
+        ttk.Button(btn_frame, text=self.lang_manager.get_text("cancel"),
+                  command=self.destroy).pack(side=tk.RIGHT, padx=(5, 10))
+
+        ttk.Button(btn_frame, text=self.lang_manager.get_text("create"),
+                  style="Accent.TButton",
+                  command=self._on_create).pack(side=tk.RIGHT)
+
+        self.dialog.bind("<Return>", lambda e: self._on_create())
+
+    def _on_create(self):
+        name = self.name_var.get().strip()
+        if not name:
+            messagebox.showwarning(
+                self.lang_manager.get_text("invalid_name"),
+                self.lang_manager.get_text("enter_library_name")
+            )
+            return
+
+        self.destroy()
+        self.create_callback(name)
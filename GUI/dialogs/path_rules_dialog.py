@@ -0,0 +1,52 @@
+import tkinter as tk
+from tkinter import ttk, messagebox
+from GUI.dialogs.base_dialog import BaseDialog
+from utils.path_rules import PathRuleSet, format_rules, parse_rules
+
+class PathRulesDialog(BaseDialog):
+    """Dialog for editing the path rules that tag videos when the library is scanned"""
+    def __init__(self, parent, lang_manager, db_manager, saved_callback):
+        super().__init__(parent, lang_manager.get_text("path_rules"), "600x400")
+        self.lang_manager = lang_manager
+        self.db_manager = db_manager
+        self.saved_callback = saved_callback
+        self.dialog.resizable(True, True)
+        self._setup_ui()
+
+    def _setup_ui(self):
+        ttk.Label(self.dialog, text=self.lang_manager.get_text("path_rules_help"),
+                  justify=tk.LEFT).pack(pady=(10, 5), padx=10, anchor=tk.W)
+
+        text_frame = ttk.Frame(self.dialog)
+        text_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+
+        vsb = ttk.Scrollbar(text_frame, orient="vertical")
+        vsb.pack(side=tk.RIGHT, fill=tk.Y)
+        self.rules_text = tk.Text(text_frame, wrap=tk.NONE, yscrollcommand=vsb.set, undo=True)
+        vsb.config(command=self.rules_text.yview)
+        self.rules_text.pack(fill=tk.BOTH, expand=True)
+        self.rules_text.insert("1.0", format_rules(self.db_manager.get_path_rules()))
+        self.rules_text.focus_set()
+
+        btn_frame = ttk.Frame(self.dialog)
+        btn_frame.pack(pady=10, fill=tk.X)
+
+        ttk.Button(btn_frame, text=self.lang_manager.get_text("cancel"),
+                  command=self.destroy).pack(side=tk.RIGHT, padx=(5, 10))
+
+        ttk.Button(btn_frame, text=self.lang_manager.get_text("save_and_apply"),
+                  style="Accent.TButton",
+                  command=self._on_save).pack(side=tk.RIGHT)
+
+    def _on_save(self):
+        try:
+            rules = parse_rules(self.rules_text.get("1.0", tk.END))
+            # Compiled once to reject invalid rules before they are stored
+            PathRuleSet(rules)
+        except ValueError as e:
+            messagebox.showwarning(self.lang_manager.get_text("invalid_path_rules"), str(e), parent=self.dialog)
+            return
+
+        self.db_manager.save_path_rules(rules)
+        self.destroy()
+        self.saved_callback()
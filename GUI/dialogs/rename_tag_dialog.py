@@ -0,0 +1,51 @@
+import tkinter as tk
+from tkinter import ttk, messagebox
+from GUI.dialogs.base_dialog import BaseDialog
+
+class RenameTagDialog(BaseDialog):
+    """Dialog for renaming a tag, or merging several tags into one"""
+    def __init__(self, parent, lang_manager, source_tags, rename_callback):
+        title_key = "rename_tag" if len(source_tags) == 1 else "merge_tags"
+        super().__init__(parent, lang_manager.get_text(title_key), "400x150")
+        self.lang_manager = lang_manager
+        self.source_tags = source_tags
+        self.rename_callback = rename_callback
+        self._setup_ui()
+
+    def _setup_ui(self):
+        ttk.Label(self.dialog, text=", ".join(self.source_tags),
+                  font=('Segoe UI', 10, 'bold')).pack(pady=(10, 0), padx=10, anchor=tk.W)
+        ttk.Label(self.dialog, text=self.lang_manager.get_text("new_tag_name")).pack(pady=(5, 5), padx=10, anchor=tk.W)
+
+        # Merging defaults to the first (most used) tag
+        self.name_var = tk.StringVar(value=self.source_tags[0])
+        name_entry = ttk.Entry(self.dialog, textvariable=self.name_var, width=40)
+        name_entry.pack(padx=10, pady=5, fill=tk.X)
+        name_entry.select_range(0, tk.END)
+        name_entry.focus_set()
+
+        btn_frame = ttk.Frame(self.dialog)
+        btn_frame.pack(pady=10, fill=tk.X)
+
+        ttk.Button(btn_frame, text=self.lang_manager.get_text("cancel"),
+                  command=self.destroy).pack(side=tk.RIGHT, padx=(5, 10))
+
+        ttk.Button(btn_frame, text=self.lang_manager.get_text("confirm"),
+                  style="Accent.TButton",
+                  command=self._on_confirm).pack(side=tk.RIGHT)
+
+        # Bind Enter key
+        self.dialog.bind("<Return>", lambda e: self._on_confirm())
+
+    def _on_confirm(self):
+        new_name = self.name_var.get().strip()
+        if not new_name:
+            messagebox.showwarning(
+                self.lang_manager.get_text("invalid_name"),
+                self.lang_manager.get_text("enter_tag_name"),
+                parent=self.dialog
+            )
+            return
+
+        if self.rename_callback(self.source_tags, new_name):
+            self.destroy()
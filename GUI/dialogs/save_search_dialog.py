@@ -0,0 +1,49 @@
+import tkinter as tk
+from tkinter import ttk, messagebox
+from GUI.dialogs.base_dialog import BaseDialog
+
+class SaveSearchDialog(BaseDialog):
+    """Dialog for naming a tag search saved as a smart folder"""
+    def __init__(self, parent, lang_manager, existing_names, save_callback):
+        super().__init__(parent, lang_manager.get_text("save_search"))
+        self.lang_manager = lang_manager
+        self.existing_names = existing_names
+        self.save_callback = save_callback
+        self._setup_ui()
+
+    def _setup_ui(self):
+        ttk.Label(self.dialog, text=self.lang_manager.get_text("smart_folder_name")).pack(pady=(10, 5))
+
+        # Existing names can be picked to replace a saved search
+        self.name_var = tk.StringVar()
+        name_entry = ttk.Combobox(self.dialog, textvariable=self.name_var, values=self.existing_names, width=38)
+        name_entry.pack(padx=10, pady=5, fill=tk.X)
+        name_entry.focus_set()
+
+        btn_frame = ttk.Frame(self.dialog)
+        btn_frame.pack(pady=10, fill=tk.X)
+
+        ttk.Button(btn_frame, text=self.lang_manager.get_text("cancel"),
+                  command=self.destroy).pack(side=tk.RIGHT, padx=(5, 10))
+
+        ttk.Button(btn_frame, text=self.lang_manager.get_text("save"),
+                  style="Accent.TButton",
+                  command=self._on_save).pack(side=tk.RIGHT)
+
+        self.dialog.bind("<Return>", lambda e: self._on_save())
+
+    def _on_save(self):
+        name = self.name_var.get().strip()
+        if not name:
+            messagebox.showwarning(
+                self.lang_manager.get_text("invalid_name"),
+                self.lang_manager.get_text("enter_smart_folder_name")
+            )
+            return
+        if name in self.existing_names and not messagebox.askyesno(
+                self.lang_manager.get_text("confirm"),
+                self.lang_manager.get_text("smart_folder_exists").format(name)):
+            return
+
+        self.destroy()
+        self.save_callback(name)
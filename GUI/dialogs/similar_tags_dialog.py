@@ -0,0 +1,118 @@
+import queue
+import threading
+import tkinter as tk
+from tkinter import ttk, messagebox
+from GUI.dialogs.base_dialog import BaseDialog
+
+
+class SimilarTagsDialog(BaseDialog):
+    """Dialog listing pairs of tags that are probably duplicates (typos, case variants)"""
+    def __init__(self, parent, lang_manager, db_manager, merge_callback):
+        super().__init__(parent, lang_manager.get_text("similar_tags"), "700x450")
+        self.lang_manager = lang_manager
+        self.db_manager = db_manager
+        self.merge_callback = merge_callback
+        self.pairs = []
+
+        # Messages posted by the worker thread, consumed on the Tk thread
+        self.messages = queue.Queue()
+
+        self.dialog.resizable(True, True)
+        self._setup_ui()
+        self._start_search()
+
+    def _setup_ui(self):
+        self.status_var = tk.StringVar(value=self.lang_manager.get_text("searching_similar_tags"))
+        ttk.Label(self.dialog, textvariable=self.status_var).pack(padx=10, pady=(10, 5), anchor=tk.W)
+
+        tree_frame = ttk.Frame(self.dialog)
+        tree_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+
+        vsb = ttk.Scrollbar(tree_frame, orient="vertical")
+        vsb.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.tree = ttk.Treeview(tree_frame, columns=("tag", "count", "similar_tag", "similar_count", "distance"),
+                                 show="headings", yscrollcommand=vsb.set, selectmode="browse")
+        vsb.config(command=self.tree.yview)
+
+        self.tree.heading("tag", text=self.lang_manager.get_text("tag_name"))
+        self.tree.heading("count", text=self.lang_manager.get_text("usage_count"))
+        self.tree.heading("similar_tag", text=self.lang_manager.get_text("similar_tag"))
+        self.tree.heading("similar_count", text=self.lang_manager.get_text("usage_count"))
+        self.tree.heading("distance", text=self.lang_manager.get_text("edit_distance"))
+        self.tree.column("tag", width=200, anchor=tk.W)
+        self.tree.column("count", width=80, anchor=tk.E)
+        self.tree.column("similar_tag", width=200, anchor=tk.W)
+        self.tree.column("similar_count", width=80, anchor=tk.E)
+        self.tree.column("distance", width=80, anchor=tk.E)
+        self.tree.pack(fill=tk.BOTH, expand=True)
+
+        btn_frame = ttk.Frame(self.dialog)
+        btn_frame.pack(pady=10, fill=tk.X, side=tk.BOTTOM)
+
+        ttk.Button(btn_frame, text=self.lang_manager.get_text("cancel"),
+                   command=self.destroy).pack(side=tk.RIGHT, padx=(5, 10))
+
+        self.merge_btn = ttk.Button(btn_frame, text=self.lang_manager.get_text("merge_into_more_used"),
+                                    command=self._merge_selected_pair, state=tk.DISABLED)
+        self.merge_btn.pack(side=tk.RIGHT)
+
+    def _start_search(self):
+        """Compare the whole tag vocabulary in a background thread"""
+        self.merge_btn.config(state=tk.DISABLED)
+        self.status_var.set(self.lang_manager.get_text("searching_similar_tags"))
+        for item in self.tree.get_children():
+            self.tree.delete(item)
+
+        def worker():
+            try:
+                self.messages.put(("done", self.db_manager.find_similar_tags()))
+            except Exception as e:
+                self.messages.put(("error", e))
+
+        threading.Thread(target=worker, daemon=True).start()
+        self.dialog.after(100, self._poll_messages)
+
+    def _poll_messages(self):
+        """Apply the worker result on the Tk thread"""
+        try:
+            kind, payload = self.messages.get_nowait()
+        except queue.Empty:
+            try:
+                self.dialog.after(100, self._poll_messages)
+            except tk.TclError:
+                # Dialog was closed while searching
+                pass
+            return
+
+        try:
+            if kind == "done":
+                self._show_pairs(payload)
+            else:
+                self.status_var.set("")
+                messagebox.showerror(self.lang_manager.get_text("error"), str(payload), parent=self.dialog)
+        except tk.TclError:
+            pass
+
+    def _show_pairs(self, pairs):
+        """Display the similar tag pairs, closest first"""
+        self.pairs = pairs
+        self.status_var.set(self.lang_manager.get_text("similar_tags_found").format(len(pairs)))
+        for pair in pairs:
+            self.tree.insert("", "end", values=pair)
+        if pairs:
+            self.merge_btn.config(state=tk.NORMAL)
+
+    def _merge_selected_pair(self):
+        """Merge the less used tag of the selected pair into the more used one"""
+        selection = self.tree.selection()
+        if not selection:
+            messagebox.showinfo(self.lang_manager.get_text("no_selection"),
+                                self.lang_manager.get_text("select_tags_first"), parent=self.dialog)
+            return
+
+        tag, count, similar_tag, similar_count, _ = self.pairs[self.tree.index(selection[0])]
+        source, target = (similar_tag, tag) if count >= similar_count else (tag, similar_tag)
+        if self.merge_callback([source], target):
+            # Other pairs involving the merged tags are stale
+            self._start_search()
@@ -2,21 +2,24 @@ import tkinter as tk
 from tkinter import ttk
 import os
 from GUI.dialogs.base_dialog import BaseDialog
-from utils.TagManage_utils import add_tag_to_entry, replace_current_tag
+from utils.TagManage_utils import add_tag_to_entry, replace_current_tag, update_suggestion_buttons
+from utils.suggestion_pipeline import SuggestionPipeline
 
 class TagDialog(BaseDialog):
     """Dialog for tag management"""
-    def __init__(self, parent, lang_manager, db_manager, file_paths, save_callback):
+    def __init__(self, parent, lang_manager, db_manager, file_paths, save_callback, folders=False):
         # Calculate appropriate size based on number of files
         size = "500x500"  # Initial size estimate
         
         super().__init__(parent, 
-                        lang_manager.get_text("add_tags_to").format(len(file_paths)), 
+                        lang_manager.get_text("add_tags_to_folders" if folders else "add_tags_to").format(len(file_paths)),
                         size)
         
         self.lang_manager = lang_manager
         self.db_manager = db_manager
         self.file_paths = file_paths
+        # Folder tags are inherited by every video below the folders
+        self.folders = folders
         self.save_callback = save_callback
         self.suggestion_buttons = []
         self.suggestion_max_width = 10
@@ -27,17 +30,24 @@ class TagDialog(BaseDialog):
     def _setup_ui(self):
         # File info
         if len(self.file_paths) == 1:
-            file_name = os.path.basename(self.file_paths[0])
-            ttk.Label(self.dialog, text=f"{self.lang_manager.get_text('file')}{file_name}", 
+            file_name = os.path.basename(os.path.normpath(self.file_paths[0]))
+            label_key = "folder_label" if self.folders else "file"
+            ttk.Label(self.dialog, text=f"{self.lang_manager.get_text(label_key)}{file_name}", 
                      font=('Segoe UI', 10, 'bold')).pack(pady=(10, 5), padx=10, anchor=tk.W)
         else:
-            ttk.Label(self.dialog, text=self.lang_manager.get_text("selected").format(len(self.file_paths)), 
+            selected_key = "selected_folders" if self.folders else "selected"
+            ttk.Label(self.dialog, text=self.lang_manager.get_text(selected_key).format(len(self.file_paths)), 
                      font=('Segoe UI', 10, 'bold')).pack(pady=(10, 5), padx=10, anchor=tk.W)
+        if self.folders:
+            ttk.Label(self.dialog, text=self.lang_manager.get_text("folder_tags_inherited")).pack(padx=10, anchor=tk.W)
 
         # Current tags (if single file)
         self.current_tags = []
         if len(self.file_paths) == 1:
-            self.current_tags = self.db_manager.get_tags_for_file(self.file_paths[0])
+            if self.folders:
+                self.current_tags = self.db_manager.get_folder_tags(self.file_paths[0])
+            else:
+                self.current_tags = self.db_manager.get_tags_for_file(self.file_paths[0])
             if self.current_tags:
                 ttk.Label(self.dialog, text=self.lang_manager.get_text("current_tags")).pack(pady=(5, 0), padx=10, anchor=tk.W)
                 tag_text = ", ".join(self.current_tags)
@@ -107,7 +117,14 @@ class TagDialog(BaseDialog):
             btn.grid(row=row, column=col, padx=2, pady=2)
             self.suggestion_buttons.append(btn)
 
-        # Update suggestions as user types
+        # Update suggestions as user types (debounced, looked up off the Tk thread)
+        self.suggestion_pipeline = SuggestionPipeline(
+            self.dialog,
+            lambda query, limit, context: self.db_manager.search_similar_tags(query, limit, True, list(context)),
+            self._show_tag_suggestions,
+            version=lambda: self.db_manager.tags_version,
+            fill=lambda query, limit, exclude: self.db_manager.find_fuzzy_tags(query, limit, exclude, build=False)
+        )
         self.tag_var.trace_add("write", lambda n, i, m, v=self.tag_var: self._update_tag_suggestions(v))
 
         # Buttons
@@ -150,40 +167,29 @@ class TagDialog(BaseDialog):
     def _update_tag_suggestions(self, tag_var):
         """Update tag suggestions based on current input"""
         text = tag_var.get()
-        if not text:
-            for btn in self.suggestion_buttons:
-                btn.config(text="", state=tk.DISABLED)
-            return
 
         # Get the last tag being typed
         tags = [t.strip() for t in text.replace("，", ",").split(",")]
         current_tag = tags[-1].strip() if tags else ""
+        context = tuple(t for t in tags[:-1] if t)
 
-        if not current_tag:
-            for btn in self.suggestion_buttons:
-                btn.config(text="", state=tk.DISABLED)
+        # With tags already entered, an empty fragment still suggests the tags used with them
+        if not current_tag and not context:
+            self.suggestion_pipeline.cancel()
+            self._show_tag_suggestions([])
             return
 
-        # Get suggestions
-        suggestions = self.db_manager.search_similar_tags(current_tag)
-        
-        # Calculate maximum width required
-        max_width = self.suggestion_max_width
-        for suggestion in suggestions:
-            suggestion_width = len(suggestion) + 2  # Add padding
-            max_width = max(max_width, suggestion_width)
-        
-        # Update buttons width for consistency
-        for btn in self.suggestion_buttons:
-            btn.config(width=max_width)
-        
-        # Update buttons
-        for i, btn in enumerate(self.suggestion_buttons):
-            if i < len(suggestions):
-                btn.config(text=suggestions[i], state=tk.NORMAL,
-                           command=lambda t=suggestions[i], ct=current_tag: replace_current_tag(self.tag_var, t))
-            else:
-                btn.config(text="", state=tk.DISABLED)
+        # Tags already entered rank the suggestions by co-occurrence
+        self.suggestion_pipeline.request(current_tag, context)
+
+    def _show_tag_suggestions(self, suggestions):
+        """Display suggestions, only touching the buttons whose content changed"""
+        update_suggestion_buttons(self.suggestion_buttons, suggestions, self.suggestion_max_width,
+                                  lambda t: replace_current_tag(self.tag_var, t))
+
+    def destroy(self):
+        self.suggestion_pipeline.close()
+        super().destroy()
                 
     def _on_save(self):
         """Save tags and close dialog"""
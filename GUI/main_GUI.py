@@ -2,17 +2,27 @@
 Video Tag Manager Application
 Refactored for better maintainability and separation of concerns
 """
+import os
+import queue
 import tkinter as tk
-from tkinter import ttk
+from tkinter import messagebox, ttk
 
+from pymongo import MongoClient
 
 from utils.TagManage_utils import setup_styles
 # Import our database manager
-from DB.db_manager import DBManager
+from DB.federated_search import FederatedSearch
+from DB.instrumentation import INSTRUMENTATION, instrument
+from DB.library_registry import DEFAULT_LIBRARY, LibraryRegistry
 # Import language manager
 from utils.language_manager import LanguageManager
 from GUI.components.browser_tab import BrowseTab
 from GUI.components.tag_management_tab import TagManagementTab
+from GUI.dialogs.diagnostics_dialog import DiagnosticsDialog
+from GUI.dialogs.library_dialog import NewLibraryDialog
+
+# Seconds the pending tag edits of a library may take to be written when switching to another library
+LIBRARY_SWITCH_TIMEOUT = 10.0
 
 class VideoTagApp:
     """Main application class"""
@@ -26,12 +36,116 @@ class VideoTagApp:
         self.root.geometry("1200x700")
         self.root.minsize(800, 600)
 
-        # Initialize database manager
-        self.db_manager = DBManager()
+        # Named libraries, each in its own database of the server (see DB/library_registry.py)
+        self.registry = LibraryRegistry(MongoClient("mongodb://localhost:27017/"))
+        # DBManagers of the other libraries, opened by searches across libraries
+        self.library_managers = {}
+        if INSTRUMENTATION.enabled:
+            # Diagnostics mode: every database call is timed, F12 shows the report
+            self.root.bind("<F12>", lambda e: DiagnosticsDialog(self.root, self.lang_manager, INSTRUMENTATION))
+        # Tag edits are journaled and written in the background, the views are refreshed after each flush
+        self.flush_messages = queue.Queue()
+        # Writes of other workstations sharing the database refresh the affected views
+        self.remote_changes = queue.Queue()
+        self.library = None
+        self.db_manager = None
+        self._open_library(DEFAULT_LIBRARY)
 
         # Setup UI
         setup_styles()
         self.create_widgets()
+        self.root.after(500, self._poll_database_events)
+
+    def _connect_library(self, name):
+        """Open a DBManager on the database of a library"""
+        db_manager = self.registry.open(name)
+        if INSTRUMENTATION.enabled:
+            instrument(db_manager)
+        return db_manager
+
+    def _open_library(self, name):
+        """Make a library the current one, with background tag writes and remote change tracking"""
+        db_manager = self.library_managers.pop(name, None) or self._connect_library(name)
+        db_manager.enable_write_behind(self.registry.journal_path(name), listener=self.flush_messages.put)
+        db_manager.changes.subscribe(["tags", "videos", "folders"], self.remote_changes.put)
+        db_manager.changes.start_polling()
+        db_manager.changes.watch()
+        self.library = name
+        self.db_manager = db_manager
+
+    def _close_library(self):
+        """Write the pending edits of the current library and stop tracking its changes"""
+        if not self.db_manager.close_write_behind(LIBRARY_SWITCH_TIMEOUT):
+            print("Some tag edits could not be written, they will be written when the library is opened again.")
+        self.db_manager.changes.stop()
+
+    def switch_library(self, event=None):
+        """Switch to the library selected in the library list, rebuilding the tabs on its database"""
+        name = self.library_var.get()
+        if name == self.library:
+            return
+        self.browse_tab.cancel_library_scan()
+        self._close_library()
+        self._open_library(name)
+        # Results of the previous library would otherwise refresh the new views
+        for messages in (self.flush_messages, self.remote_changes):
+            while True:
+                try:
+                    messages.get_nowait()
+                except queue.Empty:
+                    break
+
+        self.notebook.destroy()
+        self._create_tabs()
+        root = self.registry.get(name).get("root")
+        if root and os.path.isdir(root):
+            self.browse_tab.open_directory(root)
+
+    def _refresh_library_names(self):
+        self.library_combo.config(values=[library["name"] for library in self.registry.get_all()])
+
+    def _create_library(self, name):
+        """Register a new library and switch to it"""
+        try:
+            self.registry.create(name)
+        except ValueError as e:
+            messagebox.showerror(self.lang_manager.get_text("error"),
+                                 f"{self.lang_manager.get_text('create_library_failed')}{str(e)}")
+            return
+        self._refresh_library_names()
+        self.library_var.set(name)
+        self.switch_library()
+
+    def _on_directory_selected(self, path):
+        """Remember the first folder browsed in a library as its root"""
+        if not self.registry.get(self.library).get("root"):
+            self.registry.set_root(self.library, path)
+
+    def _poll_database_events(self):
+        """Refresh the views once background tag writes reached the database or other clients changed it"""
+        dropped = []
+        flushed = False
+        while True:
+            try:
+                dropped.extend(self.flush_messages.get_nowait())
+                flushed = True
+            except queue.Empty:
+                break
+        changed_areas = set()
+        while True:
+            try:
+                changed_areas |= self.remote_changes.get_nowait()
+            except queue.Empty:
+                break
+        if flushed or "tags" in changed_areas:
+            self.refresh_tags()
+        if changed_areas & {"videos", "folders"}:
+            self.browse_tab.refresh_file_list()
+        if dropped:
+            messagebox.showwarning(self.lang_manager.get_text("error"),
+                                   self.lang_manager.get_text("tag_edits_dropped").format(
+                                       len(dropped), "\n".join(path for path, _ in dropped[:10])))
+        self.root.after(500, self._poll_database_events)
         
     def create_widgets(self):
         """Create the main application widgets"""
@@ -57,14 +171,38 @@ class VideoTagApp:
         ttk.Label(lang_container, text=" / ").pack(side=tk.LEFT)
         ttk.Label(lang_container, text=self.lang_manager.get_text("English")).pack(side=tk.LEFT)
         ttk.Label(lang_container, text=")").pack(side=tk.LEFT)
-        
+
+        # Library selection on the left of the same bar
+        library_container = ttk.Frame(self.language_frame)
+        library_container.pack(side=tk.LEFT)
+
+        self.library_label = ttk.Label(library_container, text=self.lang_manager.get_text("library"))
+        self.library_label.pack(side=tk.LEFT, padx=(0, 5))
+        self.library_var = tk.StringVar(value=self.library)
+        self.library_combo = ttk.Combobox(library_container, textvariable=self.library_var, width=20,
+                                          state="readonly", postcommand=self._refresh_library_names)
+        self.library_combo.pack(side=tk.LEFT)
+        self.library_combo.bind("<<ComboboxSelected>>", self.switch_library)
+        self._refresh_library_names()
+
+        self.new_library_btn = ttk.Button(library_container, text=self.lang_manager.get_text("new_library"),
+                                          command=lambda: NewLibraryDialog(self.root, self.lang_manager,
+                                                                           self._create_library))
+        self.new_library_btn.pack(side=tk.LEFT, padx=5)
+
+        self._create_tabs()
+
+    def _create_tabs(self):
+        """Create the notebook and its tabs on the database of the current library"""
         # Create the main notebook (tabbed interface)
         self.notebook = ttk.Notebook(self.root)
         self.notebook.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
         
         # Initialize tabs with dependencies injected
-        self.browse_tab = BrowseTab(self.root, self.lang_manager, self.db_manager, self.refresh_tags)
-        self.tag_management_tab = TagManagementTab(self.root, self.lang_manager, self.db_manager, self.search_by_tag)
+        self.browse_tab = BrowseTab(self.root, self.lang_manager, self.db_manager, self.refresh_tags,
+                                    self._on_directory_selected)
+        self.tag_management_tab = TagManagementTab(self.root, self.lang_manager, self.db_manager, self.search_by_tag,
+                                                   self.browse_tab.refresh_file_list)
         
         # Add tabs to notebook
         self.notebook.add(self.browse_tab.get_tab(), text=self.lang_manager.get_text("browse_tab"))
@@ -100,6 +238,8 @@ class VideoTagApp:
                 elif widget.cget("text") in ["中文", "English"]:
                     # These labels don't need to be translated as they show the actual language names
                     pass
+        self.library_label.config(text=self.lang_manager.get_text("library"))
+        self.new_library_btn.config(text=self.lang_manager.get_text("new_library"))
         
         # Update tabs with new language
         self.browse_tab.update_language(self.lang_manager)
@@ -109,15 +249,29 @@ class VideoTagApp:
         """Refresh tags in the tag management tab"""
         self.tag_management_tab.refresh_top_tags()
         
-    def search_by_tag(self, tags):
-        """Search videos by tag(s)"""
+    def search_by_tag(self, tags, ranges=None, all_libraries=False):
+        """Search videos by tag(s), optionally within range filters and in every library"""
         # Switch to browse tab first
         self.notebook.select(self.browse_tab.get_tab())
         
         # Tell browse tab to perform the search
-        result = self.browse_tab.search_videos_by_tag(tags)
+        federated = FederatedSearch(self._all_library_managers()) if all_libraries else None
+        result = self.browse_tab.search_videos_by_tag(tags, ranges, federated)
         return result
 
+    def _all_library_managers(self):
+        """DBManager of every library, the current library keeps its own"""
+        managers = {}
+        for library in self.registry.get_all():
+            name = library["name"]
+            if name == self.library:
+                managers[name] = self.db_manager
+            else:
+                if name not in self.library_managers:
+                    self.library_managers[name] = self._connect_library(name)
+                managers[name] = self.library_managers[name]
+        return managers
+
 
 # Main entry point (would be in your main.py file)
 if __name__ == "__main__":
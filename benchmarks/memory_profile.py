@@ -0,0 +1,140 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from benchmarks.run_benchmarks import BENCHMARK_DB, SCALES, create_client
+from benchmarks.synthetic_library import SyntheticLibrary
+from DB.db_manager import DBManager
+from utils.language_manager import LanguageManager
+from utils.memory_profiler import MemoryProfiler, format_reports
+from utils.TagManage_utils import build_file_row, get_list_sorted
+
+
+def render_rows(items, lang_manager: LanguageManager, tree=None) -> List[tuple]:
+    """Build the file tree rows of a result, inserting them into a Treeview when one is given"""
+    rows = [build_file_row(item, lang_manager) for item in items]
+    if tree is not None:
+        tree.delete(*tree.get_children())
+        for item, values in zip(items, rows):
+            tree.insert("", "end", values=values, tags=(str(item.isDir), item.path))
+    return rows
+
+
+def create_tree():
+    """Create a withdrawn Treeview to render into, None without a display"""
+    try:
+        import tkinter as tk
+        from tkinter import ttk
+        root = tk.Tk()
+    except Exception as e:
+        print(f"No display, rendering builds the rows only: {e}", file=sys.stderr)
+        return None
+    root.withdraw()
+    return ttk.Treeview(root, columns=["type", "name", "size", "date", "duration", "resolution", "tags"])
+
+
+def profile_scale(name: str, params: Dict[str, Any], client, work_dir: str, tk_render: bool) -> List[Dict[str, Any]]:
+    """Generate and populate one synthetic library, then measure the memory of listing, search, sort and render"""
+    library = SyntheticLibrary(os.path.join(work_dir, name), **params)
+    client.drop_database(BENCHMARK_DB)
+    profiler = MemoryProfiler()
+    try:
+        library.create()
+        print(f"[{name}] {len(library.folders)} folders, {len(library.files)} videos", file=sys.stderr)
+        db_manager = DBManager(db_name=BENCHMARK_DB, client=client)
+        library.populate(db_manager)
+        lang_manager = LanguageManager()
+        tree = create_tree() if tk_render else None
+
+        ranked = [doc["name"] for doc in db_manager.tags_collection.find({}, {"name": 1}).sort("count", -1)]
+        top_tag, second_tag = ranked[0], ranked[1]
+
+        # Warm up, so that one-time caches are not counted as the cost of the first measured listing
+        db_manager.get_calculated_list(library.root)
+        gc.collect()
+
+        # Each result is kept until the end of the scale, like the GUI keeps its file list
+        results = {}
+        for label, operation in [
+            ("list_root", lambda: db_manager.get_calculated_list(library.root)),
+            ("list_leaf", lambda: db_manager.get_calculated_list(library.leaf_folder())),
+            ("search_tag_top", lambda: db_manager.find_videos_by_tag(top_tag)),
+            ("search_tags", lambda: db_manager.find_videos_by_tags([top_tag, second_tag])),
+        ]:
+            with profiler.measure(f"{name}/{label}") as report:
+                results[label] = operation()
+                report["rows"] = len(results[label])
+
+        largest = max(results.values(), key=len)
+        for key in ["name", "size", "time", "duration", "resolution"]:
+            with profiler.measure(f"{name}/sort_{key}", len(largest)):
+                largest = get_list_sorted(largest, key, True)
+
+        with profiler.measure(f"{name}/render", len(largest)) as report:
+            rows = render_rows(largest, lang_manager, tree)
+        if tree is not None:
+            report["label"] += "_treeview"
+            tree.winfo_toplevel().destroy()
+        del rows, results
+        return profiler.reports
+    finally:
+        profiler.stop()
+        client.drop_database(BENCHMARK_DB)
+        library.cleanup()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Measure the memory used by large result sets on synthetic libraries")
+    parser.add_argument("--scales", default="small,medium",
+                        help=f"Comma separated scales among {', '.join(SCALES)} (default: small,medium)")
+    parser.add_argument("--backend", choices=["mongomock", "mongodb"], default="mongomock")
+    parser.add_argument("--db-url", default="mongodb://localhost:27017/", help="Server of the mongodb backend")
+    parser.add_argument("--work-dir", help="Folder for the generated libraries (default: a temporary folder)")
+    parser.add_argument("--tk", action="store_true",
+                        help="Also insert the rendered rows into a hidden Treeview (needs a display)")
+    parser.add_argument("--json", action="store_true", help="Print the JSON report instead of a text summary")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    scales = [scale.strip() for scale in args.scales.split(",") if scale.strip()]
+    unknown = [scale for scale in scales if scale not in SCALES]
+    if unknown:
+        parser.error(f"unknown scale: {', '.join(unknown)}")
+
+    client = create_client(args.backend, args.db_url)
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="video_tag_memory_")
+    try:
+        reports = []
+        for scale in scales:
+            reports.extend(profile_scale(scale, SCALES[scale], client, work_dir, args.tk))
+    finally:
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "backend": args.backend,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "scales": {scale: SCALES[scale] for scale in scales},
+        },
+        "results": reports,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2) if args.json else format_reports(reports))
+    return 0
+
+
+if __name__ == "__main__":
+    # python -m benchmarks.memory_profile [--scales small,medium] [--backend mongodb] [--tk]
+    sys.exit(main())
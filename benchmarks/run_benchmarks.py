@@ -0,0 +1,199 @@
+import argparse
+import itertools
+import json
+import math
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List
+
+from benchmarks.synthetic_library import SyntheticLibrary
+from DB.db_manager import DBManager
+
+# Database used by the benchmarks, dropped before and after every scale
+BENCHMARK_DB = "video_tag_benchmark"
+
+# Library shapes, (fanout^(depth+1) - 1) / (fanout - 1) folders of files_per_folder videos each
+SCALES = {
+    "small": {"depth": 2, "fanout": 4, "files_per_folder": 20, "tag_vocabulary": 200},
+    "medium": {"depth": 3, "fanout": 5, "files_per_folder": 30, "tag_vocabulary": 1000},
+    "large": {"depth": 3, "fanout": 8, "files_per_folder": 50, "tag_vocabulary": 5000},
+}
+
+# A slower median is only a regression above this relative increase and this absolute one
+DEFAULT_THRESHOLD = 0.25
+NOISE_FLOOR_MS = 0.5
+
+
+def measure(operation: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    """Run an operation repeat times and summarize its wall-clock durations in milliseconds"""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        operation()
+        durations.append((time.perf_counter() - start) * 1000)
+    return summarize(durations)
+
+
+def summarize(durations: List[float]) -> Dict[str, float]:
+    durations = sorted(durations)
+    return {
+        "runs": len(durations),
+        "min_ms": round(durations[0], 3),
+        "median_ms": round(durations[len(durations) // 2], 3),
+        "p95_ms": round(durations[max(0, math.ceil(len(durations) * 0.95) - 1)], 3),
+        "max_ms": round(durations[-1], 3),
+    }
+
+
+def run_scale(name: str, params: Dict[str, Any], client, repeat: int, work_dir: str) -> Dict[str, Dict[str, float]]:
+    """Generate and populate one synthetic library, then time the DBManager hot paths on it"""
+    library = SyntheticLibrary(os.path.join(work_dir, name), **params)
+    client.drop_database(BENCHMARK_DB)
+    try:
+        library.create()
+        print(f"[{name}] {len(library.folders)} folders, {len(library.files)} videos", file=sys.stderr)
+
+        db_manager = DBManager(db_name=BENCHMARK_DB, client=client)
+        results = {}
+        start = time.perf_counter()
+        library.populate(db_manager)
+        results["bulk_add_tags"] = summarize([(time.perf_counter() - start) * 1000])
+
+        # Most and least used tags present in the library
+        ranked = [doc["name"] for doc in db_manager.tags_collection.find({}, {"name": 1}).sort("count", -1)]
+        top_tag, second_tag, rare_tag = ranked[0], ranked[1], ranked[-1]
+
+        # Listings are timed warm, the first one fills the directory cache of the operating system
+        db_manager.get_calculated_list(library.root)
+        db_manager.get_calculated_list(library.leaf_folder())
+        results["get_calculated_list_root"] = measure(lambda: db_manager.get_calculated_list(library.root), repeat)
+        results["get_calculated_list_leaf"] = measure(
+            lambda: db_manager.get_calculated_list(library.leaf_folder()), repeat)
+
+        # A different file every run, so each run is a real write
+        files = itertools.cycle(library.files)
+        results["add_or_update_tags"] = measure(
+            lambda: db_manager.add_or_update_tags(next(files), [top_tag, "benchmark"]), repeat)
+
+        prefixes = itertools.cycle(["tag0", "tag00", "tag000", "tag0001", "tag1"])
+        results["search_similar_tags"] = measure(lambda: db_manager.search_similar_tags(next(prefixes)), repeat)
+
+        # Searches are timed without the result cache (the names of earlier reports), then served from it
+        searches = {
+            "find_videos_by_tag_top": [top_tag],
+            "find_videos_by_tag_rare": [rare_tag],
+            "find_videos_by_tags": [top_tag, second_tag],
+        }
+        for operation, tags in searches.items():
+            def search_uncached(tags=tags):
+                db_manager.query_cache.invalidate()
+                db_manager.find_videos_by_tags(tags)
+            results[operation] = measure(search_uncached, repeat)
+            results[f"{operation}_cached"] = measure(lambda tags=tags: db_manager.find_videos_by_tags(tags), repeat)
+
+        results["get_top_tags"] = measure(lambda: db_manager.get_top_tags(50), repeat)
+
+        def get_top_tags_uncached():
+            db_manager.top_tags_cache.invalidate()
+            db_manager.get_top_tags(50)
+        results["get_top_tags_uncached"] = measure(get_top_tags_uncached, repeat)
+        return results
+    finally:
+        client.drop_database(BENCHMARK_DB)
+        library.cleanup()
+
+
+def find_regressions(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Compare the medians of two benchmark reports, return a description of every regression"""
+    regressions = []
+    for scale, operations in results["results"].items():
+        for operation, stats in operations.items():
+            previous = baseline.get("results", {}).get(scale, {}).get(operation)
+            if not previous:
+                continue
+            current_ms, previous_ms = stats["median_ms"], previous["median_ms"]
+            if current_ms > previous_ms * (1 + threshold) and current_ms - previous_ms > NOISE_FLOOR_MS:
+                regressions.append(f"{scale}/{operation}: {previous_ms:.3f} ms -> {current_ms:.3f} ms "
+                                   f"(+{(current_ms / previous_ms - 1) * 100:.0f}%)")
+    return regressions
+
+
+def create_client(backend: str, db_url: str):
+    """Create the client of the selected backend (an in-process mongomock stand-in or a real server)"""
+    if backend == "mongodb":
+        from pymongo import MongoClient
+        return MongoClient(db_url)
+
+    try:
+        from utils.mongomock_compat import create_mongomock_client
+    except ImportError:
+        print("Error: the mongomock backend requires mongomock. Install it using 'pip install mongomock', "
+              "or run against a server with --backend mongodb.")
+        sys.exit(2)
+    return create_mongomock_client()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Time DBManager operations on synthetic video libraries")
+    parser.add_argument("--scales", default="small,medium",
+                        help=f"Comma separated scales among {', '.join(SCALES)} (default: small,medium)")
+    parser.add_argument("--backend", choices=["mongomock", "mongodb"], default="mongomock")
+    parser.add_argument("--db-url", default="mongodb://localhost:27017/", help="Server of the mongodb backend")
+    parser.add_argument("--repeat", type=int, default=20, help="Timed runs per operation")
+    parser.add_argument("--work-dir", help="Folder for the generated libraries (default: a temporary folder)")
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    parser.add_argument("--baseline", help="JSON report of a previous run to compare with")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Relative median increase reported as a regression (default: 0.25)")
+    args = parser.parse_args(argv)
+
+    scales = [scale.strip() for scale in args.scales.split(",") if scale.strip()]
+    unknown = [scale for scale in scales if scale not in SCALES]
+    if unknown:
+        parser.error(f"unknown scale: {', '.join(unknown)}")
+
+    client = create_client(args.backend, args.db_url)
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="video_tag_benchmark_")
+    try:
+        report = {
+            "meta": {
+                "backend": args.backend,
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "repeat": args.repeat,
+                "scales": {scale: SCALES[scale] for scale in scales},
+            },
+            "results": {scale: run_scale(scale, SCALES[scale], client, args.repeat, work_dir) for scale in scales},
+        }
+    finally:
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("meta", {}).get("backend") != args.backend:
+            print("Warning: the baseline was measured with another backend", file=sys.stderr)
+        regressions = find_regressions(report, baseline, args.threshold)
+        for regression in regressions:
+            print(f"Regression: {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    # python -m benchmarks.run_benchmarks [--scales small,medium] [--backend mongodb] [--baseline old.json]
+    sys.exit(main())
@@ -0,0 +1,95 @@
+import os
+import random
+import shutil
+from itertools import accumulate
+from typing import Dict, List
+
+from DB.db_manager import DBManager
+
+# Extensions given to the generated files, all recognized as videos
+SYNTHETIC_EXTENSIONS = [".mp4", ".mkv", ".avi", ".mov"]
+
+
+def zipf_weights(count: int, exponent: float) -> List[float]:
+    """Cumulative weights of ranks 1..count under a Zipf distribution (rank r has weight 1 / r^exponent)"""
+    return list(accumulate(1 / rank ** exponent for rank in range(1, count + 1)))
+
+
+class SyntheticLibrary:
+    """A generated folder tree of fake videos with a Zipf distribution of tags
+
+    Files are sparse: they report a realistic size without using disk space,
+    and their content is empty, so header parsing fails fast like it does on
+    unsupported files. Generation is seeded and therefore reproducible.
+    """
+    def __init__(self, root: str, depth: int = 2, fanout: int = 4, files_per_folder: int = 20,
+                 tag_vocabulary: int = 200, max_tags_per_video: int = 4, zipf_exponent: float = 1.1,
+                 tagged_ratio: float = 0.8, seed: int = 42):
+        """
+        Args:
+            root: Folder in which the tree is created (removed by cleanup)
+            depth: Number of folder levels below root
+            fanout: Number of subfolders of every folder above the last level
+            files_per_folder: Number of videos in every folder, root included
+            tag_vocabulary: Number of distinct tags
+            max_tags_per_video: Upper bound of the number of tags of a video
+            zipf_exponent: Skew of the tag popularity (larger means a few tags dominate)
+            tagged_ratio: Share of the videos that get tags
+            seed: Seed of the random generator
+        """
+        self.root = os.path.normpath(root).replace("\\", "/")
+        self.depth = depth
+        self.fanout = fanout
+        self.files_per_folder = files_per_folder
+        self.tags = [f"tag{rank:05d}" for rank in range(1, tag_vocabulary + 1)]
+        self.max_tags_per_video = max_tags_per_video
+        self.zipf_exponent = zipf_exponent
+        self.tagged_ratio = tagged_ratio
+        self.random = random.Random(seed)
+        self.folders = []
+        self.files = []
+
+    def create(self) -> List[str]:
+        """Create the folders and sparse files, and return the file paths"""
+        self.folders = [self.root]
+        level = [self.root]
+        for _ in range(self.depth):
+            level = [f"{folder}/dir{index:03d}" for folder in level for index in range(self.fanout)]
+            self.folders.extend(level)
+
+        self.files = []
+        for folder in self.folders:
+            os.makedirs(folder, exist_ok=True)
+            for index in range(self.files_per_folder):
+                extension = self.random.choice(SYNTHETIC_EXTENSIONS)
+                path = f"{folder}/video{index:04d}{extension}"
+                with open(path, "wb") as f:
+                    # Sparse file between 50 MB and 4 GB
+                    f.truncate(self.random.randint(50, 4096) * 1024 * 1024)
+                self.files.append(path)
+        return self.files
+
+    def tag_assignments(self) -> Dict[str, List[str]]:
+        """Draw the tags of every tagged video, tag ranks following the Zipf distribution"""
+        weights = zipf_weights(len(self.tags), self.zipf_exponent)
+        assignments = {}
+        for path in self.files:
+            if self.random.random() >= self.tagged_ratio:
+                continue
+            count = self.random.randint(1, self.max_tags_per_video)
+            tags = self.random.choices(self.tags, cum_weights=weights, k=count)
+            assignments[path] = list(dict.fromkeys(tags))
+        return assignments
+
+    def populate(self, db_manager: DBManager) -> Dict[str, List[str]]:
+        """Write the drawn tags through the bulk tagging path and return them"""
+        assignments = self.tag_assignments()
+        db_manager.bulk_add_tags(assignments)
+        return assignments
+
+    def leaf_folder(self) -> str:
+        """Return a folder of the last level"""
+        return self.folders[-1]
+
+    def cleanup(self) -> None:
+        shutil.rmtree(self.root, ignore_errors=True)
@@ -0,0 +1,386 @@
+import argparse
+import glob
+import json
+import os
+import sys
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import pymongo
+except ImportError:
+    print("Error: pymongo library is required. Install it using 'pip install pymongo'.", file=sys.stderr)
+    sys.exit(3)
+
+# Only the database layer is imported, never Tk, so the CLI runs on headless machines
+from DB.backup import LibraryBackup, open_backup
+from DB.db_manager import DB_BATCH_SIZE, RANGE_FIELDS, VIDEO_EXTENSIONS, DBManager
+from DB.federated_search import SORT_KEYS, FederatedSearch
+from DB.library_registry import LibraryRegistry
+from DB.library_scanner import LibraryScanner
+from utils.path_rules import PathRuleSet
+
+# Exit codes
+EXIT_OK = 0
+# Some inputs were skipped (missing or non-video files), the others were processed
+EXIT_PARTIAL = 1
+# Invalid arguments (also used by argparse)
+EXIT_USAGE = 2
+# The database cannot be reached
+EXIT_DATABASE = 3
+
+# Delay before giving up on the server
+SERVER_TIMEOUT_MS = 5000
+
+# Fields of the video documents written by "query --format json"
+QUERY_FIELDS = ["path", "name", "size", "lastModifyTime", "tags", "meta"]
+# Metadata fields of the videos written by a sorted or multi-library "query --format json"
+QUERY_META_FIELDS = ["duration", "width", "height", "codec"]
+
+
+def iter_lines(source: str, null_separated: bool) -> Iterator[str]:
+    """Yield the paths listed in a file ("-" for stdin), one per line or separated by NUL characters"""
+    stream = sys.stdin if source == "-" else open(source, encoding="utf-8")
+    try:
+        if not null_separated:
+            for line in stream:
+                line = line.rstrip("\r\n")
+                if line:
+                    yield line
+            return
+        pending = ""
+        for chunk in iter(lambda: stream.read(65536), ""):
+            pending += chunk
+            *paths, pending = pending.split("\0")
+            yield from (path for path in paths if path)
+        if pending:
+            yield pending
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def iter_input_paths(args) -> Iterator[str]:
+    """Yield the input paths: the glob matches, then the listed files (stdin when nothing is given)"""
+    for pattern in args.glob:
+        # Patterns such as "**/*" also match folders and other files, only the videos are kept
+        for path in glob.iglob(pattern, recursive=True):
+            if os.path.splitext(path)[1].lower() in VIDEO_EXTENSIONS and os.path.isfile(path):
+                yield path
+    sources = args.files or ([] if args.glob else ["-"])
+    for source in sources:
+        yield from iter_lines(source, args.null)
+
+
+def iter_batches(items: Iterable[str], size: int = DB_BATCH_SIZE) -> Iterator[List[str]]:
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def split_existing(db_manager: DBManager, paths: List[str]) -> Tuple[List[str], List[str]]:
+    """Split paths into existing video files and the others (missing files, folders, other extensions)"""
+    videos, skipped = [], []
+    for path in paths:
+        if os.path.isfile(path) and db_manager.is_video_file(path):
+            videos.append(path)
+        else:
+            skipped.append(path)
+    return videos, skipped
+
+
+def parse_ranges(values: List[str]) -> Dict[str, Tuple[Optional[float], Optional[float]]]:
+    """Parse FIELD=MIN:MAX range filters, either bound may be empty"""
+    ranges = {}
+    for value in values:
+        field, _, bounds = value.partition("=")
+        minimum, separator, maximum = bounds.partition(":")
+        if field not in RANGE_FIELDS or not separator:
+            raise ValueError(f"invalid range '{value}', expected FIELD=MIN:MAX with FIELD among "
+                             f"{', '.join(RANGE_FIELDS)}")
+        ranges[field] = (float(minimum) if minimum else None, float(maximum) if maximum else None)
+    return ranges
+
+
+def command_tag(db_manager: DBManager, args) -> int:
+    """Add tags to the input files, DB_BATCH_SIZE files per bulk write"""
+    total = changed = skipped = 0
+    for batch in iter_batches(iter_input_paths(args)):
+        videos, missing = split_existing(db_manager, batch)
+        for path in missing:
+            print(f"Skipped: {path}", file=sys.stderr)
+        total += len(batch)
+        skipped += len(missing)
+        changed += db_manager.bulk_add_tags({path: args.tags for path in videos})
+    print(f"tagged: {changed}, unchanged: {total - skipped - changed}, skipped: {skipped}", file=sys.stderr)
+    return EXIT_PARTIAL if skipped else EXIT_OK
+
+
+def command_untag(db_manager: DBManager, args) -> int:
+    """Remove tags (or every tag with --all) from the input files"""
+    if not args.tags and not args.all:
+        print("Error: give the tags to remove or --all", file=sys.stderr)
+        return EXIT_USAGE
+    total = changed = 0
+    for batch in iter_batches(iter_input_paths(args)):
+        total += len(batch)
+        changed += db_manager.bulk_remove_tags(batch, None if args.all else args.tags)
+    print(f"untagged: {changed}, unchanged: {total - changed}", file=sys.stderr)
+    return EXIT_OK
+
+
+def command_query(db_manager: DBManager, args) -> int:
+    """Stream the videos having all the given tags, one per line"""
+    try:
+        ranges = parse_ranges(args.range)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return EXIT_USAGE
+    end = "\0" if args.print0 else "\n"
+    if args.sort or len(args.libraries) > 1:
+        return query_libraries(args, ranges, end)
+    for doc in islice(db_manager.iter_videos_by_tags(args.tags, ranges), args.limit):
+        if args.format == "json":
+            record = {key: doc[key] for key in QUERY_FIELDS if key in doc}
+            sys.stdout.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        else:
+            sys.stdout.write(doc["path"] + end)
+    return EXIT_OK
+
+
+def query_libraries(args, ranges: Dict[str, Tuple[Optional[float], Optional[float]]], end: str) -> int:
+    """Search the libraries concurrently and write the results merged by the sort key"""
+    search = FederatedSearch(args.libraries)
+    for item in search.find_videos_by_tags(args.tags, ranges, args.sort or "name", args.desc, args.limit):
+        if args.format == "json":
+            record = {"path": item.path, "name": item.name, "size": item.size,
+                      "lastModifyTime": item.lastModifyTime, "tags": item.tags, "library": item.library,
+                      "meta": {key: getattr(item, key) for key in QUERY_META_FIELDS
+                               if getattr(item, key) is not None}}
+            sys.stdout.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        else:
+            sys.stdout.write(item.path + end)
+    return EXIT_OK
+
+
+def command_reconcile(db_manager: DBManager, args) -> int:
+    """Rescan library folders: index new and changed files, apply the path rules, drop missing untagged files"""
+    rules = None
+    if not args.no_rules:
+        try:
+            rules = PathRuleSet(db_manager.get_path_rules())
+        except ValueError as e:
+            print(f"Error: invalid path rules: {e}", file=sys.stderr)
+            return EXIT_USAGE
+
+    status = EXIT_OK
+    for root_path in args.roots:
+        if not os.path.isdir(root_path):
+            print(f"Skipped: {root_path} is not a folder", file=sys.stderr)
+            status = EXIT_PARTIAL
+            continue
+        scanner = LibraryScanner(db_manager, rules)
+        count = scanner.scan(root_path, lambda seen: print(f"{root_path}: {seen} files", file=sys.stderr))
+        print(f"{root_path}\tindexed: {count}\trule-tagged: {scanner.rule_tagged_count}")
+    return status
+
+
+def command_cleanup(db_manager: DBManager, args) -> int:
+    """Delete the records of videos and tagged folders missing from disk, printing their paths"""
+    count = 0
+    for path in db_manager.remove_stale_videos(args.root, args.dry_run):
+        sys.stdout.write(path + "\n")
+        count += 1
+    print(f"{'stale' if args.dry_run else 'removed'}: {count}", file=sys.stderr)
+    return EXIT_OK
+
+
+def command_stats(db_manager: DBManager, args) -> int:
+    """Print library counts and the most used tags"""
+    stats = {
+        "videos": db_manager.videos_collection.count_documents({}),
+        "tagged_videos": db_manager.videos_collection.count_documents({"tags.0": {"$exists": True}}),
+        "tagged_folders": db_manager.folders_collection.count_documents({}),
+        "tags": db_manager.tags_collection.count_documents({"count": {"$gt": 0}}),
+        "top_tags": [{"name": doc["name"], "count": doc["count"]} for doc in db_manager.get_top_tags(args.top)],
+    }
+    if args.format == "json":
+        print(json.dumps(stats, ensure_ascii=False, indent=2))
+        return EXIT_OK
+    for key in ["videos", "tagged_videos", "tagged_folders", "tags"]:
+        print(f"{key}\t{stats[key]}")
+    for doc in stats["top_tags"]:
+        print(f"tag\t{doc['name']}\t{doc['count']}")
+    return EXIT_OK
+
+
+def command_export(db_manager: DBManager, args) -> int:
+    """Write the database as NDJSON, gzip-compressed with --gzip or a .gz file name"""
+    compress = args.gzip or args.file.endswith(".gz")
+    with open_backup(args.file, "w", compress) as stream:
+        counts = LibraryBackup(db_manager).export(stream, report_progress)
+    print(", ".join(f"{record_type}: {count}" for record_type, count in counts.items()), file=sys.stderr)
+    return EXIT_OK
+
+
+def command_import(db_manager: DBManager, args) -> int:
+    """Read an NDJSON backup (plain or gzip-compressed) into the database"""
+    try:
+        with open_backup(args.file, "r") as stream:
+            counts = LibraryBackup(db_manager).import_(stream, args.replace, report_progress)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return EXIT_USAGE
+    print(", ".join(f"{record_type}: {count}" for record_type, count in counts.items()), file=sys.stderr)
+    return EXIT_OK
+
+
+def command_libraries(registry: LibraryRegistry, args) -> int:
+    """List, create or remove the libraries"""
+    try:
+        if args.action == "create":
+            doc = registry.create(args.name, args.root)
+            print(f"{doc['name']}\t{doc['dbName']}")
+        elif args.action == "remove":
+            registry.remove(args.name, args.drop)
+        else:
+            for doc in registry.get_all():
+                print(f"{doc['name']}\t{doc['dbName']}\t{doc.get('root') or ''}")
+    except (KeyError, ValueError) as e:
+        print(f"Error: {e.args[0]}", file=sys.stderr)
+        return EXIT_USAGE
+    return EXIT_OK
+
+
+def report_progress(record_type: str, count: int) -> None:
+    print(f"{record_type}: {count}", file=sys.stderr)
+
+
+def add_input_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--from", dest="files", action="append", default=[], metavar="FILE",
+                        help="File listing one path per line, '-' for stdin (default: stdin)")
+    parser.add_argument("--glob", action="append", default=[], metavar="PATTERN",
+                        help="Files matching the pattern, '**' matches any number of folders")
+    parser.add_argument("-0", "--null", action="store_true",
+                        help="Listed paths are separated by NUL characters (find -print0)")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Tag, query and maintain the video tag database without the GUI",
+        epilog="Exit codes: 0 success, 1 some inputs skipped, 2 invalid arguments, 3 database unreachable")
+    parser.add_argument("--db-url", default=os.environ.get("VIDEO_TAG_DB_URL", "mongodb://localhost:27017/"),
+                        help="MongoDB connection string (default: $VIDEO_TAG_DB_URL or localhost)")
+    parser.add_argument("--db-name", default="video_tag_db", help="Database used when no --library is given")
+    parser.add_argument("--library", dest="library_names", action="append", default=[], metavar="NAME",
+                        help="Library to use, repeat it to query several libraries at once")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    tag = commands.add_parser("tag", help="Add tags to files")
+    tag.add_argument("tags", nargs="+")
+    add_input_arguments(tag)
+    tag.set_defaults(handler=command_tag)
+
+    untag = commands.add_parser("untag", help="Remove tags from files")
+    untag.add_argument("tags", nargs="*")
+    untag.add_argument("--all", action="store_true", help="Remove every tag")
+    add_input_arguments(untag)
+    untag.set_defaults(handler=command_untag)
+
+    query = commands.add_parser("query", help="List the videos having all the tags (folder tags included)")
+    query.add_argument("tags", nargs="+")
+    query.add_argument("--range", action="append", default=[], metavar="FIELD=MIN:MAX",
+                       help=f"Range filter on {', '.join(RANGE_FIELDS)} (bytes, seconds, pixels)")
+    query.add_argument("--format", choices=["path", "json"], default="path",
+                       help="One path per line, or one JSON document per line")
+    query.add_argument("--print0", action="store_true", help="Separate the paths by NUL characters")
+    query.add_argument("--sort", choices=list(SORT_KEYS),
+                       help="Sort the videos (implied by name with several libraries)")
+    query.add_argument("--desc", action="store_true", help="Sort from the largest value")
+    query.add_argument("--limit", type=int, help="Maximum number of videos")
+    query.set_defaults(handler=command_query)
+
+    reconcile = commands.add_parser("reconcile", help="Rescan library folders and apply the path rules")
+    reconcile.add_argument("roots", nargs="+")
+    reconcile.add_argument("--no-rules", action="store_true", help="Do not apply the path rules")
+    reconcile.set_defaults(handler=command_reconcile)
+
+    cleanup = commands.add_parser("cleanup", help="Delete the records of files and folders missing from disk")
+    cleanup.add_argument("--root", help="Only check below this folder")
+    cleanup.add_argument("--dry-run", action="store_true", help="Only list the stale paths")
+    cleanup.set_defaults(handler=command_cleanup)
+
+    stats = commands.add_parser("stats", help="Print library counts and the most used tags")
+    stats.add_argument("--top", type=int, default=20)
+    stats.add_argument("--format", choices=["text", "json"], default="text")
+    stats.set_defaults(handler=command_stats)
+
+    export = commands.add_parser("export", help="Write the database to an NDJSON backup")
+    export.add_argument("file", help="Backup file, '-' for stdout")
+    export.add_argument("--gzip", action="store_true", help="Compress (implied by a .gz file name)")
+    export.set_defaults(handler=command_export)
+
+    import_ = commands.add_parser("import", help="Read an NDJSON backup (plain or gzip) into the database")
+    import_.add_argument("file", help="Backup file, '-' for stdin")
+    import_.add_argument("--replace", action="store_true",
+                         help="Delete the current videos, tags and folder tags first instead of merging")
+    import_.set_defaults(handler=command_import)
+
+    libraries = commands.add_parser("libraries", help="List, create or remove the libraries")
+    libraries.add_argument("action", nargs="?", choices=["list", "create", "remove"], default="list")
+    libraries.add_argument("name", nargs="?")
+    libraries.add_argument("--root", help="Folder of the created library")
+    libraries.add_argument("--drop", action="store_true", help="Delete the database of the removed library")
+    libraries.set_defaults(handler=command_libraries)
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        client = pymongo.MongoClient(args.db_url, serverSelectionTimeoutMS=SERVER_TIMEOUT_MS)
+        client.admin.command("ping")
+    except pymongo.errors.PyMongoError as e:
+        print(f"Error: could not connect to MongoDB at {args.db_url}: {e}", file=sys.stderr)
+        return EXIT_DATABASE
+
+    try:
+        if args.command == "libraries":
+            if args.action != "list" and not args.name:
+                print(f"Error: libraries {args.action} needs a library name", file=sys.stderr)
+                return EXIT_USAGE
+            return args.handler(LibraryRegistry(client), args)
+        if args.library_names:
+            registry = LibraryRegistry(client)
+            try:
+                args.libraries = {name: registry.open(name) for name in dict.fromkeys(args.library_names)}
+            except KeyError as e:
+                print(f"Error: {e.args[0]}", file=sys.stderr)
+                return EXIT_USAGE
+        else:
+            args.libraries = {args.db_name: DBManager(db_name=args.db_name, client=client)}
+        if len(args.libraries) > 1 and args.command != "query":
+            print(f"Error: {args.command} works on one library at a time", file=sys.stderr)
+            return EXIT_USAGE
+        return args.handler(next(iter(args.libraries.values())), args)
+    except BrokenPipeError:
+        # The reader of the output stopped early (head, grep -m...), nothing more can be written
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return EXIT_OK
+    except OSError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return EXIT_USAGE
+    except pymongo.errors.PyMongoError as e:
+        print(f"Error: database error: {e}", file=sys.stderr)
+        return EXIT_DATABASE
+
+
+if __name__ == "__main__":
+    # python cli.py tag holiday beach --glob "D:/Videos/2024/**/*.mp4"
+    # find /videos -name "*.mkv" -print0 | python cli.py tag archive -0
+    # python cli.py query holiday --range duration=600: | xargs -d '\n' ls -l
+    # python cli.py --library archive --library work query holiday --sort size --desc --limit 20
+    sys.exit(main())
@@ -1,5 +1,6 @@
 import os
 import sys
+import multiprocessing
 import tkinter as tk
 
 # Check for required libraries
@@ -20,9 +21,17 @@ from GUI.main_GUI import VideoTagApp
 from utils.language_manager import LanguageManager
 from DB.setup_db import setup_mongodb
 from DB.setup_db import on_close
+from DB.instrumentation import INSTRUMENTATION, format_report
+from utils.memory_profiler import format_reports
+
+# Seconds the pending tag edits may take to be written when the application closes
+WRITE_BEHIND_CLOSE_TIMEOUT = 10.0
 
 def main():
     """Main entry point for the application"""
+    # Opt-in diagnostics mode, see DB/instrumentation.py
+    INSTRUMENTATION.configure_from_environment()
+
     connected, started_by_app = setup_mongodb()
     # Check MongoDB connection
     if not connected:
@@ -61,12 +70,33 @@ def main():
     root.geometry(f"{window_width}x{window_height}+{x}+{y}")
 
     # Initialize application
-    VideoTagApp(root)
-    root.protocol("WM_DELETE_WINDOW", lambda: on_close(root, started_by_app))
+    app = VideoTagApp(root)
+    root.protocol("WM_DELETE_WINDOW", lambda: close(root, started_by_app, app))
 
     # Start main loop
     root.mainloop()
 
 
+def close(root, started_by_app, app):
+    """Close the application, printing and saving the diagnostics report in diagnostics mode"""
+    # Before the database container may be stopped; unwritten edits stay in the journal for the next start
+    if not app.db_manager.close_write_behind(WRITE_BEHIND_CLOSE_TIMEOUT):
+        print("Some tag edits could not be written, they will be written at the next start.")
+    app.db_manager.changes.stop()
+    if INSTRUMENTATION.enabled:
+        print(format_report(INSTRUMENTATION.report()))
+        if INSTRUMENTATION.memory_profiler is not None:
+            print(format_reports(INSTRUMENTATION.memory_profiler.reports))
+        report_path = os.environ.get("VIDEO_TAG_DIAGNOSTICS")
+        if report_path:
+            try:
+                INSTRUMENTATION.dump(report_path)
+            except OSError as e:
+                print(f"Error writing diagnostics report: {e}")
+    on_close(root, started_by_app)
+
+
 if __name__ == "__main__":
+    # Needed for the duplicate finder's process pool in a frozen (pyinstaller) build
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
@@ -0,0 +1,49 @@
+import os
+import sys
+
+import pytest
+
+# The tests import the application modules the way main.py and cli.py do, from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from DB.db_manager import DBManager
+from utils.mongomock_compat import create_mongomock_client
+
+# Database the tests write to, in a fresh in-process client for every test
+TEST_DB = "video_tag_test"
+
+
+@pytest.fixture
+def client():
+    return create_mongomock_client()
+
+
+@pytest.fixture
+def db_manager(client):
+    return DBManager(db_name=TEST_DB, client=client)
+
+
+@pytest.fixture
+def other_db_manager(client, db_manager):
+    """A second instance on the same database, like the application running on another workstation"""
+    return DBManager(db_name=TEST_DB, client=client)
+
+
+@pytest.fixture
+def make_videos(tmp_path):
+    """Create video files below tmp_path and return their standardized paths
+
+    Files are given distinct sizes and modification times so the statistics
+    and range filters have something to tell them apart.
+    """
+    def make(relative_paths, size=100):
+        paths = []
+        for index, relative_path in enumerate(relative_paths):
+            path = os.path.join(str(tmp_path), relative_path).replace("\\", "/")
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(b"\0" * (size * (index % 7 + 1)))
+            os.utime(path, (1000000 + index, 1000000 + index))
+            paths.append(path)
+        return paths
+    return make
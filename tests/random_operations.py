@@ -0,0 +1,71 @@
+import os
+import random
+from typing import Callable, List
+
+from DB.db_manager import DBManager
+from DB.library_scanner import LibraryScanner
+
+# Folders of the generated library, relative to its root
+FOLDERS = ["A", "B", "C", "C/D"]
+TAGS = ["a", "b", "c", "d"]
+OPERATIONS = ["bulk_add", "add", "replace", "bulk_remove", "remove", "folder_add", "folder_remove",
+              "scan_new", "scan_grown", "merge", "rename"]
+
+
+class RandomLibrary:
+    """A small library driven by random write operations, to compare incremental state with a recomputation
+
+    Every write path that maintains derived data (tag counts and statistics,
+    co-occurrence, saved search members, cached results) is exercised,
+    including videos indexed without tags below tagged folders.
+    """
+    def __init__(self, db_manager: DBManager, root: str, make_videos: Callable[[List[str]], List[str]], seed: int):
+        self.db_manager = db_manager
+        self.root = root.replace("\\", "/")
+        self.make_videos = make_videos
+        self.rng = random.Random(seed)
+        self.files = make_videos([f"{folder}/v{index}.mp4" for folder in FOLDERS for index in range(6)])
+        self.folders = [f"{self.root}/{folder}" for folder in FOLDERS]
+        self.tags = list(TAGS)
+        self.step = 0
+
+    def run(self, operations: List[str] = OPERATIONS) -> str:
+        """Apply one random operation and return its name"""
+        rng = self.rng
+        db_manager = self.db_manager
+        operation = rng.choice(operations)
+        self.step += 1
+        if operation == "bulk_add":
+            db_manager.bulk_add_tags({path: rng.sample(self.tags, rng.randint(1, 2))
+                                      for path in rng.sample(self.files, rng.randint(1, 5))})
+        elif operation in ("add", "replace"):
+            db_manager.add_or_update_tags(rng.choice(self.files), rng.sample(self.tags, rng.randint(0, 3)),
+                                          append=operation == "add")
+        elif operation == "bulk_remove":
+            db_manager.bulk_remove_tags(rng.sample(self.files, rng.randint(1, 5)),
+                                        rng.choice([None, rng.sample(self.tags, 1)]))
+        elif operation == "remove":
+            db_manager.remove_tags_from_file(rng.choice(self.files))
+        elif operation == "folder_add":
+            db_manager.add_or_update_folder_tags(rng.choice(self.folders), rng.sample(self.tags, rng.randint(1, 2)),
+                                                 append=rng.random() < 0.5)
+        elif operation == "folder_remove":
+            db_manager.remove_folder_tags(rng.choice(self.folders))
+        elif operation == "scan_new":
+            self.files.extend(self.make_videos([f"{rng.choice(FOLDERS)}/n{self.step}.mp4"]))
+            LibraryScanner(db_manager).scan(self.root)
+        elif operation == "scan_grown":
+            path = rng.choice(self.files)
+            with open(path, "ab") as f:
+                f.write(b"\0" * rng.randint(1, 500))
+            os.utime(path, (2000000 + self.step, 2000000 + self.step))
+            LibraryScanner(db_manager).scan(self.root)
+        elif operation == "merge":
+            source, target = rng.sample(self.tags, 2)
+            db_manager.merge_tags([source], target)
+        else:
+            index = rng.randrange(len(self.tags))
+            new_tag = f"{self.tags[index]}{self.step}"
+            db_manager.rename_tag(self.tags[index], new_tag)
+            self.tags[index] = new_tag
+        return operation
@@ -0,0 +1,38 @@
+import time
+
+from DB.instrumentation import Instrumentation, instrument
+
+
+def test_collections_of_helpers_are_timed(db_manager, make_videos):
+    path, = make_videos(["A/v0.mp4"])
+    instrumentation = Instrumentation()
+    instrumentation.enable()
+    instrument(db_manager, instrumentation)
+
+    db_manager.saved_searches.save("s_a", ["a"])
+    db_manager.add_or_update_tags(path, ["a"])
+    assert db_manager.saved_searches.member_paths("s_a") == [path]
+
+    timed = set(instrumentation.stats)
+    # Change tracker, saved searches and their members, besides the collections of DBManager itself
+    assert {"mongo.meta.find_one_and_update", "mongo.saved_searches.update_one",
+            "mongo.saved_search_members.find", "mongo.videos.update_one"} <= timed
+
+
+def test_generator_methods_are_timed_while_consumed(db_manager, make_videos, monkeypatch):
+    paths = make_videos([f"A/v{index}.mp4" for index in range(3)])
+    db_manager.bulk_add_tags({path: ["a"] for path in paths})
+    instrumentation = Instrumentation()
+    instrumentation.enable()
+    instrument(db_manager, instrumentation)
+
+    # Every step of the iteration does slow work
+    decode_doc = db_manager._decode_doc
+    monkeypatch.setattr(db_manager, "_decode_doc", lambda doc: time.sleep(0.02) or decode_doc(doc))
+    videos = db_manager.iter_videos_by_tags(["a"])
+    assert "db.iter_videos_by_tags" not in instrumentation.stats
+    assert len(list(videos)) == 3
+
+    stats = instrumentation.stats["db.iter_videos_by_tags"]
+    assert stats.count == 1
+    assert stats.total_ms >= 60
@@ -0,0 +1,29 @@
+import os
+
+import DB.db_manager
+from DB.library_scanner import LibraryScanner
+
+
+def test_listing_uses_metadata_read_by_the_scan(db_manager, make_videos, tmp_path, monkeypatch):
+    path, = make_videos(["A/v0.mp4"])
+    parsed = []
+
+    def extract_metadata(file_path):
+        parsed.append(file_path)
+        return {"duration": 12.0, "width": 1920, "height": 1080, "codec": "avc1"}
+    monkeypatch.setattr(DB.db_manager, "extract_metadata", extract_metadata)
+
+    # Browsing neither reads the headers nor writes documents
+    item, = db_manager.get_calculated_list(os.path.dirname(path))
+    assert item.duration is None
+    assert parsed == [] and db_manager.videos_collection.count_documents({}) == 0
+
+    scanner = LibraryScanner(db_manager)
+    scanner.scan(str(tmp_path))
+    assert scanner.metadata_count == 1
+    item, = db_manager.get_calculated_list(os.path.dirname(path))
+    assert (item.duration, item.height) == (12.0, 1080)
+
+    # A rescan of the unchanged file uses the cached values
+    LibraryScanner(db_manager).scan(str(tmp_path))
+    assert parsed == [path]
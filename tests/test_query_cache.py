@@ -0,0 +1,46 @@
+import pytest
+
+from random_operations import RandomLibrary
+
+SEARCHES = [
+    (["a"], None),
+    (["b", "a"], None),
+    (["c"], {"size": (300, None)}),
+    (["d"], None),
+]
+
+
+def results(db_manager, tags, ranges):
+    return sorted((item.path, item.size, item.lastModifyTime, sorted(item.tags), sorted(item.inheritedTags))
+                  for item in db_manager.find_videos_by_tags(tags, ranges))
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_cached_results_match_fresh_queries(db_manager, make_videos, tmp_path, seed):
+    library = RandomLibrary(db_manager, str(tmp_path), make_videos, seed)
+    for step in range(60):
+        operation = library.run()
+        searches = SEARCHES + [([tag], None) for tag in library.tags]
+        cached = [results(db_manager, tags, ranges) for tags, ranges in searches]
+        db_manager.query_cache.invalidate()
+        fresh = [results(db_manager, tags, ranges) for tags, ranges in searches]
+        assert cached == fresh, f"step {step} ({operation})"
+
+
+def test_repeated_search_is_served_from_cache(db_manager, make_videos):
+    paths = make_videos(["A/v0.mp4", "A/v1.mp4", "B/v2.mp4"])
+    db_manager.bulk_add_tags({paths[0]: ["a"], paths[1]: ["a", "b"]})
+    assert len(db_manager.find_videos_by_tags(["a"])) == 2
+
+    find = db_manager.videos_collection.find
+    db_manager.videos_collection.find = None
+    try:
+        assert len(db_manager.find_videos_by_tags(["a"])) == 2
+    finally:
+        db_manager.videos_collection.find = find
+
+    # A write to a video outside the results keeps the entry, a write to one of its videos drops it
+    db_manager.add_or_update_tags(paths[2], ["c"])
+    assert len(db_manager.query_cache.entries) == 1
+    db_manager.remove_tags_from_file(paths[1])
+    assert [item.path for item in db_manager.find_videos_by_tags(["a"])] == [paths[0]]
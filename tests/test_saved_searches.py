@@ -0,0 +1,54 @@
+import os
+
+import pytest
+
+from random_operations import RandomLibrary
+
+SEARCHES = [
+    ("s_a", ["a"], None),
+    ("s_ab", ["a", "b"], None),
+    ("s_b_big", ["b"], {"size": (300, None)}),
+    ("s_cd", ["c", "d"], None),
+]
+
+
+def incremental_and_materialized(db_manager):
+    """Return {search: (members kept by the write paths, members of a full materialization)}"""
+    result = {}
+    saved_searches = db_manager.saved_searches
+    for search in saved_searches._load():
+        members = set(saved_searches.member_paths(search["name"]))
+        count = saved_searches.collection.find_one({"name": search["name"]})["count"]
+        assert count == len(members), search["name"]
+        saved_searches._materialize(search)
+        result[search["name"]] = (members, set(saved_searches.member_paths(search["name"])))
+    return result
+
+
+def assert_consistent(db_manager, step):
+    for name, (members, materialized) in incremental_and_materialized(db_manager).items():
+        assert members == materialized, f"{name} after {step}"
+
+
+def test_new_video_in_tagged_folder_joins_search(db_manager, make_videos):
+    tagged, new = make_videos(["C/v0.mp4", "C/v8.mp4"])
+    db_manager.add_or_update_folder_tags(os.path.dirname(new), ["a", "b"])
+    db_manager.saved_searches.save("s_ab", ["a", "b"])
+    db_manager.add_or_update_tags(tagged, ["x"])
+
+    # The folder already gives the video the tags of the search before its document exists
+    db_manager.bulk_add_tags({new: ["x"]})
+
+    assert set(db_manager.saved_searches.member_paths("s_ab")) == {tagged, new}
+    assert_consistent(db_manager, "bulk_add_tags")
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_members_match_materialization(db_manager, make_videos, tmp_path, seed):
+    library = RandomLibrary(db_manager, str(tmp_path), make_videos, seed)
+    for name, tags, ranges in SEARCHES:
+        db_manager.saved_searches.save(name, tags, ranges)
+
+    for step in range(60):
+        operation = library.run()
+        assert_consistent(db_manager, f"step {step} ({operation})")
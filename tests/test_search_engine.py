@@ -0,0 +1,24 @@
+from DB.search_engine import MAX_PREFIX_TAGS, SearchEngine
+
+
+def test_exact_tag_outside_the_most_used_prefix_tags(db_manager, make_videos):
+    paths = make_videos([f"A/v{index}.mp4" for index in range(MAX_PREFIX_TAGS + 1)])
+    # More prefix tags than are considered, every one used more than the exact tag
+    db_manager.bulk_add_tags({path: [f"ab{index}"] for index, path in enumerate(paths[1:])})
+    db_manager.bulk_add_tags({path: ["ab_common"] for path in paths[1:]})
+    db_manager.add_or_update_tags(paths[0], ["AB"])
+
+    exact_tags, prefix_tags = SearchEngine(db_manager)._find_matching_tags("ab")
+    assert exact_tags == ["AB"]
+    assert len(prefix_tags) == MAX_PREFIX_TAGS and prefix_tags[0] == "ab_common"
+    videos, _ = SearchEngine(db_manager).search("ab")
+    assert videos[0].path == paths[0]
+
+
+def test_full_width_name_matches_ascii_query(db_manager, make_videos):
+    full_width, other = make_videos(["A/ＭＯＶＩＥ clip.mp4", "A/other.mp4"])
+    db_manager.bulk_add_tags({full_width: ["x"], other: ["y"]})
+
+    # Served by the aggregation, candidates and name score use the same normalized name
+    videos, total = SearchEngine(db_manager).search("Movie")
+    assert total == 1 and [item.path for item in videos] == [full_width]
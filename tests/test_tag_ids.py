@@ -0,0 +1,76 @@
+from collections import Counter
+
+import pytest
+
+from DB.tag_id_migration import TagIdMigration
+from random_operations import RandomLibrary
+
+
+def decoded_tags(db_manager):
+    """Tags of every video and folder as names, from whatever representation is stored"""
+    return {collection.name: {doc["path"]: sorted(db_manager._decode_tags(doc.get("tags", [])))
+                              for doc in collection.find({}, {"path": 1, "tags": 1, "_id": 0})}
+            for collection in (db_manager.videos_collection, db_manager.folders_collection)}
+
+
+def assert_encoded_consistently(db_manager, step):
+    ids = {doc["name"]: doc["tagId"] for doc in db_manager.tags_collection.find({}, {"_id": 0})}
+    assert len(set(ids.values())) == len(ids), step
+    counts = Counter()
+    pairs = Counter()
+    for collection in (db_manager.videos_collection, db_manager.folders_collection):
+        for doc in collection.find({}, {"tags": 1, "_id": 0}):
+            assert all(isinstance(value, int) for value in doc.get("tags", [])), step
+            names = db_manager._decode_tags(doc.get("tags", []))
+            assert len(names) == len(doc.get("tags", [])), f"undecodable tag after {step}"
+            counts.update(names)
+            if collection is db_manager.videos_collection:
+                pairs.update((a, b) for a in names for b in names if a != b)
+    assert counts == {name: doc["count"] for doc in db_manager.tags_collection.find({}, {"_id": 0})
+                      for name in [doc["name"]]}, step
+    assert pairs == {(doc["a"], doc["b"]): doc["count"]
+                     for doc in db_manager.tag_pairs_collection.find({}, {"_id": 0})}, step
+    for name, tag_id in ids.items():
+        # Searches translate names through the same dictionary the write paths fill
+        assert db_manager._encode_tags([name]) == [tag_id], step
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_operations_on_integer_tag_ids(db_manager, make_videos, tmp_path, seed):
+    library = RandomLibrary(db_manager, str(tmp_path), make_videos, seed)
+    for _ in range(20):
+        library.run()
+
+    before = decoded_tags(db_manager)
+    TagIdMigration(db_manager).migrate()
+    assert decoded_tags(db_manager) == before
+    assert_encoded_consistently(db_manager, "migration")
+
+    for step in range(40):
+        operation = library.run()
+        assert_encoded_consistently(db_manager, f"step {step} ({operation})")
+
+    before = decoded_tags(db_manager)
+    TagIdMigration(db_manager).revert()
+    assert decoded_tags(db_manager) == before
+    assert not any(isinstance(value, int) for doc in db_manager.videos_collection.find({}, {"tags": 1})
+                   for value in doc.get("tags", []))
+
+
+def test_running_client_follows_the_migration(db_manager, other_db_manager, make_videos):
+    first, second = make_videos(["A/v0.mp4", "A/v1.mp4"])
+    db_manager.add_or_update_tags(first, ["a"])
+    other = other_db_manager
+
+    TagIdMigration(db_manager).migrate()
+    other.changes.poll(force=True)
+    assert other.use_tag_ids
+    other.add_or_update_tags(second, ["a", "b"])
+    assert_encoded_consistently(other, "write of the other client")
+    assert sorted(item.path for item in other.find_videos_by_tags(["a"])) == [first, second]
+
+    TagIdMigration(db_manager).revert()
+    other.changes.poll(force=True)
+    assert not other.use_tag_ids
+    other.add_or_update_tags(first, ["c"])
+    assert sorted(other.videos_collection.find_one({"path": first})["tags"]) == ["a", "c"]
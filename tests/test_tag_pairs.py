@@ -0,0 +1,26 @@
+import pytest
+
+from random_operations import RandomLibrary
+
+
+def stored_pairs(db_manager):
+    return {(doc["a"], doc["b"]): doc["count"] for doc in db_manager.tag_pairs_collection.find({}, {"_id": 0})}
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_pairs_match_rebuild(db_manager, make_videos, tmp_path, seed):
+    library = RandomLibrary(db_manager, str(tmp_path), make_videos, seed)
+    for step in range(60):
+        operation = library.run()
+        incremental = stored_pairs(db_manager)
+        db_manager.rebuild_tag_pairs()
+        assert incremental == stored_pairs(db_manager), f"step {step} ({operation})"
+
+
+def test_related_tags_count_videos_used_together(db_manager, make_videos):
+    paths = make_videos(["A/v0.mp4", "A/v1.mp4", "A/v2.mp4"])
+    db_manager.bulk_add_tags({paths[0]: ["beach", "sun"], paths[1]: ["beach", "sun", "sea"], paths[2]: ["sea"]})
+    assert db_manager.get_related_tags(["beach"]) == [("sun", 2), ("sea", 1)]
+
+    db_manager.remove_tags_from_file(paths[1])
+    assert db_manager.get_related_tags(["beach"]) == [("sun", 1)]
@@ -0,0 +1,68 @@
+import pytest
+
+from DB.db_manager import TAG_SORT_FIELDS
+from random_operations import RandomLibrary
+
+
+def stored_stats(db_manager):
+    return {doc["name"]: {field: doc.get(field) for field in TAG_SORT_FIELDS}
+            for doc in db_manager.tags_collection.find({}, {"_id": 0})}
+
+
+def assert_same_stats(incremental, recomputed, step):
+    assert incremental.keys() == recomputed.keys(), step
+    for name, stats in recomputed.items():
+        # Tags only carried by folders have no size and duration fields, a recomputation stores zeros
+        for field in ("count", "totalSize", "totalDuration"):
+            assert (incremental[name][field] or 0) == pytest.approx(stats[field]), f"{name}.{field} after {step}"
+        # They also keep the time of their last video, a recomputation has none
+        if stats["latestModifyTime"] is not None:
+            assert incremental[name]["latestModifyTime"] == stats["latestModifyTime"], \
+                f"{name}.latestModifyTime after {step}"
+
+
+def by_rank(tags):
+    return sorted(tags, key=lambda tag: (-tag["count"], tag["name"]))
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_tag_stats_match_recomputation(db_manager, make_videos, tmp_path, seed):
+    library = RandomLibrary(db_manager, str(tmp_path), make_videos, seed)
+    for step in range(60):
+        operation = library.run()
+        incremental = stored_stats(db_manager)
+        # Rebuilt from nothing, so fields the write paths forgot to maintain show up
+        db_manager.tags_collection.delete_many({})
+        db_manager.recompute_tag_stats()
+        assert_same_stats(incremental, stored_stats(db_manager), f"step {step} ({operation})")
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_cached_top_tags_match_database(db_manager, make_videos, tmp_path, seed):
+    library = RandomLibrary(db_manager, str(tmp_path), make_videos, seed)
+    db_manager.get_top_tags_with_stats()
+    for step in range(60):
+        operation = library.run()
+        cached = db_manager.get_top_tags_with_stats()
+        cached_counts = db_manager.get_top_tags()
+        db_manager.top_tags_cache.invalidate()
+        loaded = db_manager.get_top_tags_with_stats()
+        assert by_rank(cached) == by_rank(loaded), f"step {step} ({operation})"
+        assert by_rank(cached_counts) == by_rank({"name": tag["name"], "count": tag["count"]} for tag in loaded)
+
+
+def test_count_sorted_stats_served_from_cache(db_manager, make_videos):
+    paths = make_videos(["A/v0.mp4", "A/v1.mp4"])
+    db_manager.add_or_update_tags(paths[0], ["a"])
+    db_manager.get_top_tags_with_stats()
+
+    db_manager.add_or_update_tags(paths[1], ["a", "b"])
+    find = db_manager.tags_collection.find
+    db_manager.tags_collection.find = None
+    try:
+        top = {tag["name"]: tag for tag in db_manager.get_top_tags_with_stats()}
+    finally:
+        db_manager.tags_collection.find = find
+    assert top["a"]["count"] == 2
+    assert top["a"]["totalSize"] == sum(db_manager.videos_collection.find_one({"path": path})["size"]
+                                        for path in paths)
@@ -0,0 +1,37 @@
+import struct
+
+import pytest
+
+from utils.video_metadata import extract_metadata
+
+
+def box(box_type, payload=b""):
+    return struct.pack(">I4s", 8 + len(payload), box_type) + payload
+
+
+def write_mp4(tmp_path, *boxes):
+    path = tmp_path / "video.mp4"
+    path.write_bytes(box(b"ftyp", b"isom\0\0\0\0") + box(b"moov", b"".join(boxes)))
+    return str(path)
+
+
+def test_mp4_duration_is_read(tmp_path):
+    mvhd = bytes(12) + struct.pack(">II", 1000, 90000)
+    assert extract_metadata(write_mp4(tmp_path, box(b"mvhd", mvhd)))["duration"] == 90.0
+
+
+@pytest.mark.parametrize("boxes", [
+    [box(b"mvhd")],
+    [box(b"mvhd", b"\0" * 10)],
+    [box(b"mvhd", b"\1" + b"\0" * 20)],
+    [box(b"trak", box(b"tkhd", b"\0" * 30) + box(b"mdia", box(b"hdlr", b"\0" * 4)))],
+])
+def test_damaged_mp4_boxes_are_ignored(tmp_path, boxes):
+    metadata = extract_metadata(write_mp4(tmp_path, *boxes))
+    assert metadata == {"duration": None, "width": None, "height": None, "codec": None}
+
+
+def test_damaged_file_does_not_fail_tagging(db_manager, tmp_path):
+    path = write_mp4(tmp_path, box(b"mvhd")).replace("\\", "/")
+    db_manager.add_or_update_tags(path, ["a"])
+    assert db_manager.get_tags_for_file(path) == ["a"]
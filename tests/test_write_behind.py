@@ -0,0 +1,164 @@
+import random
+from collections import Counter
+
+import pytest
+from pymongo.errors import AutoReconnect
+
+import DB.write_behind as write_behind
+from DB.write_behind import WriteBehindQueue
+
+
+def stored_tags(db_manager, path):
+    doc = db_manager.videos_collection.find_one({"path": path})
+    return sorted(db_manager._decode_tags(doc.get("tags", []))) if doc else []
+
+
+def raising(error, write=None, failures=None):
+    """A DBManager write raising error, only for the first failures calls (then calling write) if given"""
+    calls = []
+
+    def fail(*args, **kwargs):
+        calls.append(args)
+        if failures is not None and len(calls) > failures:
+            return write(*args, **kwargs)
+        raise error
+    return fail
+
+
+def test_edits_of_a_file_are_coalesced(db_manager, make_videos, tmp_path):
+    path, = make_videos(["A/v0.mp4"])
+    db_manager.add_or_update_tags(path, ["x"])
+    queue = WriteBehindQueue(db_manager, str(tmp_path / "journal.ndjson"), flush_delay=60)
+    queue.add_tags(path, ["a"])
+    queue.add_tags(path, ["b", "a"])
+    assert queue.effective_tags(path, ["x"]) == ["x", "a", "b"]
+    queue.add_tags(path, ["c"], append=False)
+    queue.add_tags(path, ["d"])
+
+    assert queue.pending_count() == 1
+    assert queue.effective_tags(path, ["x"]) == ["c", "d"]
+    assert queue.close(5)
+    assert stored_tags(db_manager, path) == ["c", "d"]
+    assert (tmp_path / "journal.ndjson").read_text() == ""
+
+
+def test_offline_writes_are_retried(db_manager, make_videos, tmp_path, monkeypatch):
+    monkeypatch.setattr(write_behind, "RETRY_DELAY", 0.01)
+    path, = make_videos(["A/v0.mp4"])
+    monkeypatch.setattr(db_manager, "bulk_add_tags",
+                        raising(AutoReconnect("connection refused"), db_manager.bulk_add_tags, failures=2))
+    dropped = []
+    db_manager.enable_write_behind(str(tmp_path / "journal.ndjson"), listener=dropped.extend)
+
+    db_manager.queue_tags(path, ["a"])
+    assert db_manager.flush_writes(5)
+    assert stored_tags(db_manager, path) == ["a"]
+    assert not db_manager.write_behind.offline
+    assert dropped == []
+    db_manager.close_write_behind(5)
+
+
+def test_other_errors_are_dropped_not_retried(db_manager, make_videos, tmp_path, monkeypatch):
+    kept, failing = make_videos(["A/v0.mp4", "A/v1.mp4"])
+    db_manager.add_or_update_tags(failing, ["x"])
+    monkeypatch.setattr(db_manager, "add_or_update_tags", raising(ValueError("invalid tag")))
+    dropped = []
+    journal_path = tmp_path / "journal.ndjson"
+    db_manager.enable_write_behind(str(journal_path), listener=dropped.extend)
+
+    db_manager.queue_tags(failing, ["a"], append=False)
+    assert db_manager.flush_writes(5)
+    assert dropped == [(failing, "invalid tag")]
+    assert stored_tags(db_manager, failing) == ["x"]
+    assert journal_path.read_text() == ""
+
+    # The queue keeps writing the next edits
+    monkeypatch.undo()
+    db_manager.queue_tags(kept, ["b"])
+    assert db_manager.flush_writes(5)
+    assert stored_tags(db_manager, kept) == ["b"]
+    db_manager.close_write_behind(5)
+
+
+def test_one_failing_edit_keeps_the_rest_of_the_flush(db_manager, make_videos, tmp_path, monkeypatch):
+    added, bad_addition, replaced, bad_replacement, removed = make_videos([f"A/v{index}.mp4" for index in range(5)])
+    for path in (bad_replacement, removed):
+        db_manager.add_or_update_tags(path, ["x"])
+    bulk_add_tags, add_or_update_tags = db_manager.bulk_add_tags, db_manager.add_or_update_tags
+
+    def bulk_add_failing(tags_by_path):
+        if bad_addition in tags_by_path:
+            raise ValueError("invalid addition")
+        return bulk_add_tags(tags_by_path)
+
+    def add_or_update_failing(path, tags, append=True):
+        if path == bad_replacement:
+            raise IndexError("invalid replacement")
+        return add_or_update_tags(path, tags, append)
+    monkeypatch.setattr(db_manager, "bulk_add_tags", bulk_add_failing)
+    monkeypatch.setattr(db_manager, "add_or_update_tags", add_or_update_failing)
+
+    # Every edit in the same flush
+    dropped = []
+    queue = WriteBehindQueue(db_manager, str(tmp_path / "journal.ndjson"), dropped.extend, flush_delay=60)
+    queue.add_tags(added, ["a"])
+    queue.add_tags(bad_addition, ["a"])
+    queue.add_tags(bad_replacement, ["b"], append=False)
+    queue.add_tags(replaced, ["c"], append=False)
+    queue.remove_tags(removed)
+    assert queue.close(5)
+
+    assert sorted(dropped) == sorted([(bad_addition, "invalid addition"), (bad_replacement, "invalid replacement")])
+    assert [stored_tags(db_manager, path) for path in (added, bad_addition, replaced, bad_replacement, removed)] == [
+        ["a"], [], ["c"], ["x"], []]
+    assert (tmp_path / "journal.ndjson").read_text() == ""
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_written_tags_match_the_edits(db_manager, make_videos, tmp_path, seed, monkeypatch):
+    """Random edits with flushes, and restarts replaying the journal left while the database was unreachable"""
+    monkeypatch.setattr(write_behind, "RETRY_DELAY", 0.01)
+    rng = random.Random(seed)
+    files = make_videos([f"A/v{index}.mp4" for index in range(8)])
+    journal_path = str(tmp_path / "journal.ndjson")
+    dropped = []
+    db_manager.enable_write_behind(journal_path, listener=dropped.extend)
+    # Tags each file has once every edit is written
+    expected = {path: [] for path in files}
+
+    for step in range(40):
+        operation = rng.choice(["add", "add", "replace", "remove", "flush", "restart"])
+        path = rng.choice(files)
+        if operation == "add":
+            tags = rng.sample("abcd", rng.randint(1, 2))
+            db_manager.queue_tags(path, tags)
+            expected[path] += [tag for tag in tags if tag not in expected[path]]
+        elif operation == "replace":
+            tags = rng.sample("abcd", rng.randint(0, 2))
+            db_manager.queue_tags(path, tags, append=False)
+            expected[path] = list(tags)
+        elif operation == "remove":
+            db_manager.queue_remove_tags(path)
+            expected[path] = []
+        elif operation == "flush":
+            assert db_manager.flush_writes(5)
+        else:
+            # The database is unreachable at exit, the pending edits stay in the journal
+            with monkeypatch.context() as offline:
+                for name in ("bulk_add_tags", "add_or_update_tags", "remove_tags_from_file"):
+                    offline.setattr(db_manager, name, raising(AutoReconnect("connection refused")))
+                queue = db_manager.write_behind
+                pending = queue.pending_count()
+                assert db_manager.close_write_behind(0.05) == (pending == 0)
+                queue.thread.join(5)
+            db_manager.enable_write_behind(journal_path, listener=dropped.extend)
+
+        for path in files:
+            assert sorted(db_manager.get_tags_for_file(path)) == sorted(expected[path]), f"step {step} ({operation})"
+
+    assert db_manager.close_write_behind(5)
+    assert dropped == []
+    for path in files:
+        assert stored_tags(db_manager, path) == sorted(expected[path])
+    counts = Counter(tag for tags in expected.values() for tag in tags)
+    assert {doc["name"]: doc["count"] for doc in db_manager.tags_collection.find()} == counts
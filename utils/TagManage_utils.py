@@ -1,3 +1,4 @@
+import time
 from tkinter import ttk
 
 
@@ -11,6 +12,16 @@ def get_time(element):
     return element.lastModifyTime
 
 
+def get_duration(element):
+    """Get duration from FileInfoItem for sorting (unknown durations sort first)"""
+    return element.duration or 0
+
+
+def get_resolution(element):
+    """Get pixel count from FileInfoItem for sorting (unknown resolutions sort first)"""
+    return (element.width or 0) * (element.height or 0)
+
+
 def get_name(element):
     """Get name from FileInfoItem for sorting (case insensitive)"""
     return element.name.upper()
@@ -21,7 +32,7 @@ def get_list_sorted(res_list, index, asc):
 
     Args:
         res_list: List of FileInfoItem objects
-        index: Attribute to sort by ('size', 'time', or 'name')
+        index: Attribute to sort by ('size', 'time', 'name', 'duration' or 'resolution')
         asc: If True, sort in ascending order, else descending
 
     Returns:
@@ -33,8 +44,58 @@ def get_list_sorted(res_list, index, asc):
         res_list.sort(key=get_time, reverse=asc)
     elif index == "name":
         res_list.sort(key=get_name, reverse=not asc)
+    elif index == "duration":
+        res_list.sort(key=get_duration, reverse=not asc)
+    elif index == "resolution":
+        res_list.sort(key=get_resolution, reverse=not asc)
     return res_list
 
+def build_file_row(item, lang_manager):
+    """Build the values of the file tree row of a FileInfoItem (type, name, size, date, duration, resolution, tags)"""
+    tags_parts = [", ".join(item.tags)] if item.tags else []
+    if item.inheritedTags:
+        tags_parts.append(lang_manager.get_text("inherited_tags").format(", ".join(item.inheritedTags)))
+    if item.isDir and item.taggedCount:
+        tags_parts.append(lang_manager.get_text("folder_tag_summary").format(
+            item.taggedCount, ", ".join(item.topTags)))
+    if item.library:
+        tags_parts.append(lang_manager.get_text("library_label").format(item.library))
+
+    return (
+        lang_manager.get_text("folder") if item.isDir else lang_manager.get_text("video"),
+        item.name,
+        item.getSizeConverted(),
+        item.getDateFormatted(),
+        "" if item.isDir else item.getDurationFormatted(),
+        "" if item.isDir else item.getResolutionFormatted(),
+        " | ".join(tags_parts)
+    )
+
+def format_size(size):
+    """Format a number of bytes with the largest fitting unit"""
+    units = ['B', 'KB', 'MB', 'GB', 'TB']
+    size = float(size or 0)
+    unit_index = 0
+    while size >= 1024 and unit_index < len(units) - 1:
+        size /= 1024
+        unit_index += 1
+    return f"{size:.2f} {units[unit_index]}"
+
+
+def format_duration(seconds):
+    """Format a number of seconds as h:mm:ss"""
+    minutes, seconds = divmod(int(seconds or 0), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}"
+
+
+def format_time(timestamp):
+    """Format a modification time like the file list does"""
+    if not timestamp:
+        return ""
+    return time.strftime("%Y/%m/%d %H:%M", time.localtime(timestamp))
+
+
 def setup_styles():
     """Setup custom styles for a modern UI feel"""
     style = ttk.Style()
@@ -94,4 +155,26 @@ def replace_current_tag(tag_var, new_tag):
     if tags:
         tags[-1] = new_tag
 
-    tag_var.set(", ".join(tags))
\ No newline at end of file
+    tag_var.set(", ".join(tags))
+
+
+def update_suggestion_buttons(buttons, suggestions, min_width, on_click):
+    """Show suggestions on the buttons, reconfiguring only the buttons whose content changed
+
+    Args:
+        buttons: Suggestion buttons, in display order
+        suggestions: Tag names to show (extra buttons are cleared and disabled)
+        min_width: Minimum button width in characters
+        on_click: Called with the tag name when a suggestion button is clicked
+    """
+    # All buttons share the width needed by the longest suggestion
+    width = max([min_width] + [len(suggestion) + 2 for suggestion in suggestions])
+
+    for i, btn in enumerate(buttons):
+        text = suggestions[i] if i < len(suggestions) else ""
+        if btn.cget("text") == text and str(btn.cget("width")) == str(width):
+            continue
+        if text:
+            btn.config(text=text, width=width, state="normal", command=lambda t=text: on_click(t))
+        else:
+            btn.config(text="", width=width, state="disabled")
@@ -0,0 +1,56 @@
+import hashlib
+import os
+
+# Size of each block read for a sampled fingerprint
+SAMPLE_BLOCK_SIZE = 64 * 1024
+# Number of evenly spaced blocks read for a sampled fingerprint
+SAMPLE_BLOCK_COUNT = 8
+# Chunk size used when streaming a whole file through the hash
+FULL_HASH_CHUNK_SIZE = 4 * 1024 * 1024
+
+
+def is_sample_complete(size: int) -> bool:
+    """Return True if the sampled fingerprint of a file this size covers every byte"""
+    return size <= SAMPLE_BLOCK_SIZE * SAMPLE_BLOCK_COUNT
+
+
+def compute_sampled_hash(file_path: str) -> str:
+    """Hash the file size plus a fixed number of evenly spaced blocks
+
+    The first and last blocks are always included, so files that only differ
+    in their header or trailer (e.g. a re-muxed index) are told apart.
+    At most SAMPLE_BLOCK_SIZE * SAMPLE_BLOCK_COUNT bytes are read per file.
+
+    Args:
+        file_path: Path to the file
+
+    Returns:
+        Hex digest of the sampled content
+    """
+    size = os.path.getsize(file_path)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(size).encode())
+
+    with open(file_path, "rb") as f:
+        if is_sample_complete(size):
+            # Small file, the sample is the whole content
+            digest.update(f.read())
+        else:
+            step = (size - SAMPLE_BLOCK_SIZE) // (SAMPLE_BLOCK_COUNT - 1)
+            for i in range(SAMPLE_BLOCK_COUNT):
+                f.seek(i * step)
+                digest.update(f.read(SAMPLE_BLOCK_SIZE))
+
+    return digest.hexdigest()
+
+
+def compute_full_hash(file_path: str) -> str:
+    """Hash the whole file content by streaming it in fixed-size chunks"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_path, "rb") as f:
+        while True:
+            chunk = f.read(FULL_HASH_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
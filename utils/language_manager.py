@@ -18,12 +18,29 @@ class LanguageManager:
                 "search_in_currentDir": "在当前目录中搜索文件（夹）名",
                 "search_btn": "搜索",
                 "clear_search": "清除搜索",
+                "scope_current_dir": "当前目录",
+                "scope_library": "整个媒体库",
+                "indexing_library": "正在索引媒体库: {} 个视频",
+                "library_indexed": "媒体库已索引: {} 个视频",
+                "library_indexed_with_rules": "媒体库已索引: {0} 个视频, 路径规则标记了 {1} 个视频",
+                "library_index_cancelled": "媒体库索引已取消: 已索引 {} 个视频",
+                "path_rules": "路径规则",
+                "path_rules_help": "每行一条规则: 路径模式 -> 标签1, 标签2\n* 匹配文件夹或文件名中的任意文本, ** 匹配任意层文件夹, 以 / 结尾只匹配文件夹\n{name} 捕获路径的一部分并可用于标签, 例如: Concerts/{year}/ -> concert, {year}",
+                "save_and_apply": "保存并应用",
+                "invalid_path_rules": "无效的路径规则",
+                "no_videos_with_name": "未找到名称包含 '{}' 的视频。",
+                "name_search_results": "名称搜索结果: {}",
+                "scope_names_and_tags": "名称和标签",
+                "no_videos_with_name_or_tag": "未找到名称或标签匹配 '{}' 的视频。",
+                "combined_search_results": "名称和标签搜索结果: {}",
                 
                 # File tree
                 "type": "类型",
                 "name": "名称",
                 "size": "大小",
                 "time": "修改时间",
+                "duration": "时长",
+                "resolution": "分辨率",
                 "tags": "标签",
                 "folder": "文件夹",
                 "video": "视频",
@@ -31,15 +48,76 @@ class LanguageManager:
                 # Tag operations
                 "add_tags": "为选中文件添加标签",
                 "remove_tags": "移除标签",
+                "tag_folder": "添加文件夹标签",
+                "remove_folder_tags": "移除文件夹标签",
+                "inherited_tags": "继承: {0}",
                 
                 # Top tags section
                 "top_tags": "最多使用标签",
                 "tag_name": "标签名称",
                 "usage_count": "使用次数",
+                "related_tags": "相关标签",
+                "co_occurrence": "共同出现次数",
+                "folder_tag_summary": "{0} 个已标记视频: {1}",
+                "library_label": "媒体库: {0}",
+                "library": "媒体库:",
+                "new_library": "新建媒体库",
+                "library_name": "媒体库名称:",
+                "enter_library_name": "请输入媒体库名称。",
+                "create_library_failed": "创建媒体库失败: ",
+                "search_all_libraries": "搜索所有媒体库",
+                "total_size": "总大小",
+                "total_duration": "总时长",
+                "latest_modified": "最近修改",
+                "find_similar_tags": "查找相似标签",
+                "similar_tags": "相似标签",
+                "similar_tag": "相似标签",
+                "edit_distance": "差异字符数",
+                "searching_similar_tags": "正在比较所有标签...",
+                "similar_tags_found": "找到 {0} 对相似标签",
+                "merge_into_more_used": "合并到使用较多的标签",
+                "rename_merge_tags": "重命名/合并",
+                "rename_tag": "重命名标签",
+                "merge_tags": "合并标签",
+                "new_tag_name": "新标签名称（已存在的标签将被合并）：",
+                "enter_tag_name": "请输入标签名称。",
+                "select_tags_first": "请先选择标签。",
+                "confirm_merge_tags": "将所有视频上的标签 {0} 替换为 \"{1}\"？",
+                "tags_merged": "已更新 {0} 个视频。",
                 "refresh": "刷新",
+                "reset": "重置",
+                "diagnostics": "诊断",
+                "operation": "操作",
+                "diagnostics_count": "次数",
+                "diagnostics_p50_ms": "p50 (毫秒)",
+                "diagnostics_p95_ms": "p95 (毫秒)",
+                "diagnostics_p99_ms": "p99 (毫秒)",
+                "diagnostics_max_ms": "最大 (毫秒)",
+                "diagnostics_total_ms": "总计 (毫秒)",
+                "diagnostics_round_trips_mean": "平均往返",
+                "diagnostics_top_calls": "数据库调用: {}",
+                "tag_edits_dropped": "{} 个文件的标签修改未能保存（文件已不存在）:\n{}",
                 
                 # Search by tag section
                 "search_by_tag": "按标签搜索:",
+                "size_gb": "大小 (GB):",
+                "modified_within_days": "最近修改 (天):",
+                "duration_minutes": "时长 (分钟):",
+                "min_resolution": "最低分辨率:",
+                "any": "不限",
+                "invalid_filter_value": "筛选条件必须是数字。",
+                "save_search": "保存为智能文件夹",
+                "smart_folder_name": "智能文件夹名称:",
+                "enter_smart_folder_name": "请输入智能文件夹名称。",
+                "smart_folder_exists": "智能文件夹 \"{}\" 已存在，是否替换？",
+                "smart_folder_saved": "智能文件夹 \"{}\" 已保存，包含 {} 个视频。",
+                "save_search_failed": "保存智能文件夹失败: ",
+                "smart_folders": "智能文件夹:",
+                "smart_folder_results": "智能文件夹: {}",
+                "smart_folder_empty": "智能文件夹 \"{}\" 中没有视频。",
+                "delete_smart_folder": "删除",
+                "confirm_delete_smart_folder": "删除智能文件夹 \"{}\"？视频和标签不会改变。",
+                "save": "保存",
                 
                 # Dialog texts
                 "folder_name": "文件夹名称:",
@@ -56,6 +134,11 @@ class LanguageManager:
                 "add_tags_to": "添加标签到 {} 个文件",
                 "file": "文件: ",
                 "selected": "已选择: {} 个文件",
+                "add_tags_to_folders": "添加标签到 {} 个文件夹",
+                "folder_label": "文件夹: ",
+                "selected_folders": "已选择: {} 个文件夹",
+                "folder_tags_inherited": "文件夹中的所有视频都会继承这些标签",
+                "confirm_remove_folder_tags": "确定要移除 {} 个文件夹的标签吗? (视频自身的标签会保留)",
                 "current_tags": "当前标签:",
                 "keep_existing_tags": "保留现有标签 (添加新标签而不替换现有标签)",
                 "enter_tags": "输入标签 (用逗号分隔):",
@@ -76,6 +159,18 @@ class LanguageManager:
                 "confirm_remove_tags": "确定要移除 {} 个文件的所有标签吗?",
                 "remove_tags_failed": "移除标签失败: ",
                 
+                # Duplicate detection
+                "find_duplicates": "查找重复视频",
+                "select_directory_first": "请先选择一个目录。",
+                "verify_full_hash": "使用完整哈希确认 (较慢)",
+                "start_scan": "开始扫描",
+                "merge_group_tags": "合并该组标签",
+                "select_duplicate_group": "请选择一个重复组。",
+                "duplicate_stage_size": "正在列出文件: {} 个",
+                "duplicate_stage_sampled": "正在计算采样哈希: {} / {}",
+                "duplicate_stage_full": "正在计算完整哈希: {} / {}",
+                "duplicate_groups_found": "找到 {} 组重复视频",
+                
                 # Language
                 "language": "语言:",
                 "chinese": "中文",
@@ -94,12 +189,29 @@ class LanguageManager:
                 "search_in_currentDir": "Search file (folder) names in current directory",
                 "search_btn": "Search",
                 "clear_search": "Clear Search",
+                "scope_current_dir": "Current folder",
+                "scope_library": "Whole library",
+                "indexing_library": "Indexing library: {} videos",
+                "library_indexed": "Library indexed: {} videos",
+                "library_indexed_with_rules": "Library indexed: {0} videos, {1} tagged by path rules",
+                "library_index_cancelled": "Library indexing cancelled: {} videos indexed",
+                "path_rules": "Path Rules",
+                "path_rules_help": "One rule per line: path pattern -> tag1, tag2\n* matches any text in a folder or file name, ** any number of folders, a trailing / only matches folders\n{name} captures part of the path for use in the tags, e.g. Concerts/{year}/ -> concert, {year}",
+                "save_and_apply": "Save and Apply",
+                "invalid_path_rules": "Invalid Path Rules",
+                "no_videos_with_name": "No videos found with '{}' in their name.",
+                "name_search_results": "Name Search Results: {}",
+                "scope_names_and_tags": "Names and tags",
+                "no_videos_with_name_or_tag": "No videos found matching '{}' by name or tag.",
+                "combined_search_results": "Name and Tag Search Results: {}",
                 
                 # File tree
                 "type": "Type",
                 "name": "Name",
                 "size": "Size",
                 "time": "Modified Time",
+                "duration": "Duration",
+                "resolution": "Resolution",
                 "tags": "Tags",
                 "folder": "Folder",
                 "video": "Video",
@@ -107,15 +219,76 @@ class LanguageManager:
                 # Tag operations
                 "add_tags": "Add Tags to Selected",
                 "remove_tags": "Remove Tags",
+                "tag_folder": "Tag Folder",
+                "remove_folder_tags": "Remove Folder Tags",
+                "inherited_tags": "inherited: {0}",
                 
                 # Top tags section
                 "top_tags": "Most Used Tags",
                 "tag_name": "Tag Name",
                 "usage_count": "Usage Count",
+                "related_tags": "Related Tags",
+                "co_occurrence": "Used Together",
+                "folder_tag_summary": "{0} tagged videos: {1}",
+                "library_label": "library: {0}",
+                "library": "Library:",
+                "new_library": "New Library",
+                "library_name": "Library name:",
+                "enter_library_name": "Please enter a library name.",
+                "create_library_failed": "Failed to create the library: ",
+                "search_all_libraries": "Search all libraries",
+                "total_size": "Total Size",
+                "total_duration": "Total Duration",
+                "latest_modified": "Latest Modified",
+                "find_similar_tags": "Find Similar Tags",
+                "similar_tags": "Similar Tags",
+                "similar_tag": "Similar Tag",
+                "edit_distance": "Differences",
+                "searching_similar_tags": "Comparing all tags...",
+                "similar_tags_found": "{0} pairs of similar tags found",
+                "merge_into_more_used": "Merge Into More Used Tag",
+                "rename_merge_tags": "Rename / Merge",
+                "rename_tag": "Rename Tag",
+                "merge_tags": "Merge Tags",
+                "new_tag_name": "New tag name (an existing tag is merged into):",
+                "enter_tag_name": "Please enter a tag name.",
+                "select_tags_first": "Please select tags first.",
+                "confirm_merge_tags": "Replace the tags {0} with \"{1}\" on every video?",
+                "tags_merged": "{0} videos updated.",
                 "refresh": "Refresh",
+                "reset": "Reset",
+                "diagnostics": "Diagnostics",
+                "operation": "Operation",
+                "diagnostics_count": "Count",
+                "diagnostics_p50_ms": "p50 (ms)",
+                "diagnostics_p95_ms": "p95 (ms)",
+                "diagnostics_p99_ms": "p99 (ms)",
+                "diagnostics_max_ms": "Max (ms)",
+                "diagnostics_total_ms": "Total (ms)",
+                "diagnostics_round_trips_mean": "Round trips",
+                "diagnostics_top_calls": "Database calls: {}",
+                "tag_edits_dropped": "The tag edits of {} files could not be saved (the files no longer exist):\n{}",
                 
                 # Search by tag section
                 "search_by_tag": "Search by Tag:",
+                "size_gb": "Size (GB):",
+                "modified_within_days": "Modified in last (days):",
+                "duration_minutes": "Duration (minutes):",
+                "min_resolution": "Minimum resolution:",
+                "any": "Any",
+                "invalid_filter_value": "Filter values must be numbers.",
+                "save_search": "Save as Smart Folder",
+                "smart_folder_name": "Smart folder name:",
+                "enter_smart_folder_name": "Please enter a smart folder name.",
+                "smart_folder_exists": "The smart folder \"{}\" already exists. Replace it?",
+                "smart_folder_saved": "Smart folder \"{}\" saved with {} videos.",
+                "save_search_failed": "Failed to save the smart folder: ",
+                "smart_folders": "Smart folders:",
+                "smart_folder_results": "Smart folder: {}",
+                "smart_folder_empty": "The smart folder \"{}\" has no videos.",
+                "delete_smart_folder": "Delete",
+                "confirm_delete_smart_folder": "Delete the smart folder \"{}\"? Videos and tags are not changed.",
+                "save": "Save",
                 
                 # Dialog texts
                 "folder_name": "Folder Name:",
@@ -132,6 +305,11 @@ class LanguageManager:
                 "add_tags_to": "Add Tags to {} Files",
                 "file": "File: ",
                 "selected": "Selected: {} files",
+                "add_tags_to_folders": "Add Tags to {} Folders",
+                "folder_label": "Folder: ",
+                "selected_folders": "Selected: {} folders",
+                "folder_tags_inherited": "All videos in the folder inherit these tags",
+                "confirm_remove_folder_tags": "Are you sure you want to remove the tags of {} folders? (The videos keep their own tags)",
                 "current_tags": "Current Tags:",
                 "keep_existing_tags": "Keep existing tags (add new tags without replacing existing ones)",
                 "enter_tags": "Enter tags (separated by commas):",
@@ -152,6 +330,18 @@ class LanguageManager:
                 "confirm_remove_tags": "Are you sure you want to remove all tags from {} files?",
                 "remove_tags_failed": "Failed to remove tags: ",
                 
+                # Duplicate detection
+                "find_duplicates": "Find Duplicates",
+                "select_directory_first": "Please select a directory first.",
+                "verify_full_hash": "Confirm with full hash (slower)",
+                "start_scan": "Start Scan",
+                "merge_group_tags": "Merge Group Tags",
+                "select_duplicate_group": "Please select a duplicate group.",
+                "duplicate_stage_size": "Listing files: {}",
+                "duplicate_stage_sampled": "Hashing samples: {} / {}",
+                "duplicate_stage_full": "Hashing full files: {} / {}",
+                "duplicate_groups_found": "Found {} duplicate groups",
+                
                 # Language
                 "language": "Language:",
                 "chinese": "中文",
@@ -0,0 +1,110 @@
+import sys
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Dict, List
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, the resident set size is then not reported
+    resource = None
+
+# Frames kept per traced allocation, enough to tell the caller of a library call
+TRACEBACK_FRAMES = 5
+# Allocation sites listed per measured operation
+TOP_SITES = 10
+
+
+def max_rss_bytes() -> int:
+    """Peak resident set size of the process, 0 where unknown
+
+    Includes memory tracemalloc cannot see, such as the Tcl/Tk widgets.
+    """
+    if resource is None:
+        return 0
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return usage if sys.platform == "darwin" else usage * 1024
+
+
+class MemoryProfiler:
+    """Measure the Python memory allocated by operations, with tracemalloc
+
+    Each measured operation is bracketed by two snapshots. The report gives
+    the memory still allocated afterwards (what the result costs while it is
+    kept), the peak during the operation (transient cost), the cost per row
+    when the number of rows is known, and the allocation sites that grew most.
+    Tracing slows allocations down, so this is a diagnostics mode only.
+    """
+    def __init__(self, top_sites: int = TOP_SITES, frames: int = TRACEBACK_FRAMES):
+        self.top_sites = top_sites
+        self.frames = frames
+        self.reports = []
+        self.started_tracing = False
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self.started_tracing = True
+
+    def stop(self):
+        if self.started_tracing:
+            tracemalloc.stop()
+            self.started_tracing = False
+
+    @contextmanager
+    def measure(self, label: str, rows: int = 0):
+        """Measure the block; set report["rows"] inside the block when the row count is only known then
+
+        Yields:
+            The report of the operation, filled when the block exits
+        """
+        self.start()
+        report = {"label": label, "rows": rows}
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        base_size = tracemalloc.get_traced_memory()[0]
+        try:
+            yield report
+        finally:
+            current_size, peak_size = tracemalloc.get_traced_memory()
+            after = tracemalloc.take_snapshot()
+            report["retained_bytes"] = current_size - base_size
+            report["peak_bytes"] = peak_size - base_size
+            report["per_row_bytes"] = round(report["retained_bytes"] / report["rows"], 1) if report["rows"] else None
+            report["max_rss_bytes"] = max_rss_bytes()
+            report["top_sites"] = self._top_sites(before, after)
+            self.reports.append(report)
+
+    def _top_sites(self, before, after) -> List[Dict[str, Any]]:
+        # Allocations made by the tracing itself are not part of the operation
+        filters = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+        differences = after.filter_traces(filters).compare_to(before.filter_traces(filters), "lineno")
+        return [{"site": f"{difference.traceback[0].filename}:{difference.traceback[0].lineno}",
+                 "size_bytes": difference.size_diff,
+                 "count": difference.count_diff}
+                for difference in differences[:self.top_sites] if difference.size_diff > 0]
+
+
+def format_size_diff(size: float) -> str:
+    """Format a byte count (possibly negative) with the largest fitting unit"""
+    units = ['B', 'KB', 'MB', 'GB']
+    value = float(size)
+    unit_index = 0
+    while abs(value) >= 1024 and unit_index < len(units) - 1:
+        value /= 1024
+        unit_index += 1
+    return f"{value:.1f} {units[unit_index]}"
+
+
+def format_reports(reports: List[Dict[str, Any]], sites: int = 5) -> str:
+    """Format memory reports as text, each followed by its largest allocation sites"""
+    lines = []
+    for report in reports:
+        rows = f"{report['rows']} rows, " if report["rows"] else ""
+        per_row = f", {report['per_row_bytes']:.0f} B/row" if report["per_row_bytes"] is not None else ""
+        lines.append(f"{report['label']}: {rows}retained {format_size_diff(report['retained_bytes'])}"
+                     f", peak {format_size_diff(report['peak_bytes'])}{per_row}")
+        for site in report["top_sites"][:sites]:
+            lines.append(f"    {format_size_diff(site['size_bytes']):>10}  {site['count']:>8}  {site['site']}")
+    return "\n".join(lines)
@@ -0,0 +1,29 @@
+import inspect
+
+# In-process MongoDB stand-in used by the benchmarks and the tests, never by the application
+import mongomock
+from mongomock.collection import BulkOperationBuilder
+
+
+def _drop_sort(method):
+    def without_sort(self, *args, sort=None, **kwargs):
+        return method(self, *args, **kwargs)
+    return without_sort
+
+
+def patch_bulk_sort() -> None:
+    """Accept the sort option that pymongo >= 4.9 passes to bulk updates and replacements
+
+    mongomock 4.3 predates it, so every UpdateOne or ReplaceOne of a bulk
+    write fails without this. Patching twice is harmless.
+    """
+    for name in ("add_update", "add_replace"):
+        method = getattr(BulkOperationBuilder, name)
+        if "sort" not in inspect.signature(method).parameters:
+            setattr(BulkOperationBuilder, name, _drop_sort(method))
+
+
+def create_mongomock_client() -> mongomock.MongoClient:
+    """Create an in-process client compatible with the installed pymongo"""
+    patch_bulk_sort()
+    return mongomock.MongoClient()
@@ -0,0 +1,23 @@
+import unicodedata
+from typing import List
+
+
+def normalize_name(name: str) -> str:
+    """Normalize a file name or query for matching
+
+    NFKC folds full-width and compatibility characters (common in CJK file
+    names) to their canonical form, casefold makes matching case-insensitive.
+    """
+    return unicodedata.normalize("NFKC", name).casefold()
+
+
+def name_grams(name: str) -> List[str]:
+    """Return the distinct character bigrams of a file name
+
+    Bigrams rather than trigrams or word tokens, so that two-character CJK
+    queries (which have no word separators) can still be answered by the index.
+    """
+    text = normalize_name(name)
+    if len(text) < 2:
+        return [text] if text else []
+    return sorted({text[i:i + 2] for i in range(len(text) - 1)})
@@ -0,0 +1,124 @@
+import re
+from typing import Any, Dict, List
+
+# Placeholder capturing part of a path segment, usable in the tags of the rule
+_PLACEHOLDER = re.compile(r"\{([A-Za-z_][A-Za-z0-9_]*)\}")
+_TOKEN = re.compile(r"\*\*/|/\*\*|\*\*|\*|\?|\{[A-Za-z_][A-Za-z0-9_]*\}")
+
+
+def _translate(pattern: str, group_prefix: str) -> str:
+    """Translate a rule pattern into a regex body
+
+    "**" matches any number of folders, "*" any text inside one path segment,
+    "?" one character and "{name}" captures text inside one path segment.
+    """
+    parts = []
+    position = 0
+    for token in _TOKEN.finditer(pattern):
+        parts.append(re.escape(pattern[position:token.start()]))
+        text = token.group()
+        if text == "**/":
+            parts.append("(?:.*/)?")
+        elif text == "/**":
+            parts.append("(?:/.*)?")
+        elif text == "**":
+            parts.append(".*")
+        elif text == "*":
+            parts.append("[^/]*")
+        elif text == "?":
+            parts.append("[^/]")
+        else:
+            parts.append(f"(?P<{group_prefix}{text[1:-1]}>[^/]+)")
+        position = token.end()
+    parts.append(re.escape(pattern[position:]))
+    return "".join(parts)
+
+
+class PathRuleSet:
+    """Path and filename patterns mapped to tags, compiled into a single matcher
+
+    A rule matches whole path segments anywhere in the path: "Concerts/{year}/"
+    matches ".../Concerts/2023/..." and gives the tags of the rule with
+    "{year}" replaced by "2023"; "*.mkv" matches the file name. A trailing
+    "/" only matches folders. Matching is case-insensitive.
+
+    Every rule becomes an optional lookahead of one regex anchored at the
+    start of the path, so one match() call reports all the matching rules at
+    once instead of one regex pass per rule.
+    """
+    def __init__(self, rules: List[Dict[str, Any]]):
+        """
+        Args:
+            rules: List of {"pattern": str, "tags": [str]} dictionaries
+
+        Raises:
+            ValueError: If a pattern is empty or a tag uses a placeholder its pattern does not define
+        """
+        self.rules = []
+        lookaheads = []
+        for index, rule in enumerate(rules):
+            pattern = rule["pattern"].strip().lstrip("/")
+            tags = [tag.strip() for tag in rule["tags"] if tag.strip()]
+            if not pattern or not tags:
+                raise ValueError(f"Invalid path rule: {rule['pattern']!r}")
+            names = _PLACEHOLDER.findall(pattern)
+            for tag in tags:
+                unknown = set(_PLACEHOLDER.findall(tag)) - set(names)
+                if unknown:
+                    raise ValueError(f"Unknown placeholder {{{unknown.pop()}}} in tag {tag!r}")
+            if len(set(names)) < len(names):
+                raise ValueError(f"Repeated placeholder in path rule: {rule['pattern']!r}")
+
+            group_prefix = f"r{index}_"
+            body = _translate(pattern, group_prefix)
+            # Segment boundaries on both sides, a trailing "/" already is one
+            end = "" if pattern.endswith("/") else "(?:/|$)"
+            lookaheads.append(f"(?=(?P<r{index}>(?:.*/)?{body}{end}))?")
+            self.rules.append((f"r{index}", group_prefix, names, tags))
+
+        self.matcher = re.compile("".join(lookaheads), re.IGNORECASE) if self.rules else None
+
+    def __bool__(self):
+        return bool(self.rules)
+
+    def match(self, path: str) -> List[str]:
+        """Return the tags given to a path by every matching rule, in rule order
+
+        Args:
+            path: Standardized path (forward slashes)
+        """
+        if self.matcher is None:
+            return []
+        groups = self.matcher.match(path.lstrip("/")).groupdict()
+        tags = []
+        for rule_group, group_prefix, names, rule_tags in self.rules:
+            if groups[rule_group] is None:
+                continue
+            values = {name: groups[group_prefix + name] for name in names}
+            for tag in rule_tags:
+                tags.append(_PLACEHOLDER.sub(lambda placeholder: values[placeholder.group(1)], tag))
+        return list(dict.fromkeys(tags))
+
+
+def parse_rules(text: str) -> List[Dict[str, Any]]:
+    """Parse rules written one per line as "pattern -> tag1, tag2" (blank lines and # comments ignored)
+
+    Raises:
+        ValueError: If a line has no "->" separator
+    """
+    rules = []
+    for line_number, line in enumerate(text.splitlines(), 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if "->" not in line:
+            raise ValueError(f"Line {line_number}: expected \"pattern -> tags\"")
+        pattern, tags = line.split("->", 1)
+        rules.append({"pattern": pattern.strip(),
+                      "tags": [tag.strip() for tag in tags.replace("，", ",").split(",") if tag.strip()]})
+    return rules
+
+
+def format_rules(rules: List[Dict[str, Any]]) -> str:
+    """Format rules one per line, the inverse of parse_rules"""
+    return "\n".join(f"{rule['pattern']} -> {', '.join(rule['tags'])}" for rule in rules)
@@ -0,0 +1,178 @@
+import queue
+import tkinter as tk
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Hashable, List, Optional, Tuple
+
+# Delay after the last keystroke before a lookup is started
+DEBOUNCE_MS = 150
+# Interval used to collect results from the worker thread
+POLL_MS = 20
+# Number of recent queries whose results are memoized
+MEMO_SIZE = 128
+
+
+class SuggestionPipeline:
+    """Debounced, off-thread, memoized tag suggestion lookups for an entry widget
+
+    - Keystrokes only (re)start a timer, the lookup runs DEBOUNCE_MS after the last one
+    - Lookups run on a single worker thread, never on the Tk thread
+    - Responses for input that has changed since are dropped (but still memoized)
+    - Recent results are kept in an LRU; when a shorter prefix returned fewer
+      results than the limit, its result is the complete candidate set and a
+      longer query is answered by filtering it, without any lookup (only
+      without context, context-ranked results cannot be re-ranked locally);
+      the remaining slots of such a derived answer come from `fill`, and
+      without it (or when it cannot answer) the lookup goes to the database
+
+    Args:
+        widget: Any Tk widget, used for scheduling on the Tk thread
+        fetch: Function (query, limit, context) -> list of (name, count), as
+               DBManager.search_similar_tags(query, limit, True, context)
+        on_result: Called on the Tk thread with the list of suggested names
+        limit: Number of suggestions displayed
+        version: Optional function returning a token that changes when the tags
+                 change, the memo is cleared when it does
+        fill: Optional in-memory function (query, limit, exclude) -> list of
+              (name, count) or None, completing derived answers with the
+              matches that are not substrings of the query (typo matches)
+    """
+    def __init__(self, widget, fetch: Callable[[str, int, Tuple[str, ...]], List[Tuple[str, int]]],
+                 on_result: Callable[[List[str]], None], limit: int = 10,
+                 version: Optional[Callable[[], Hashable]] = None,
+                 fill: Optional[Callable[[str, int, List[str]], Optional[List[Tuple[str, int]]]]] = None):
+        self.widget = widget
+        self.fetch = fetch
+        self.on_result = on_result
+        self.limit = limit
+        self.version = version
+        self.fill = fill
+        self.memo_version = version() if version else None
+
+        self.memo = OrderedDict()
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.results = queue.Queue()
+        self.generation = 0
+        self.pending_after = None
+        self.outstanding = 0
+        self.closed = False
+
+    def request(self, query: str, context: Tuple[str, ...] = ()):
+        """Ask for suggestions for the query (call on every keystroke)
+
+        Args:
+            query: Tag fragment being typed
+            context: Tags already entered, used to rank the suggestions
+        """
+        self.cancel()
+        context = tuple(context)
+
+        memoized = self._lookup_memo(query, context)
+        if memoized is not None:
+            self.on_result(memoized)
+            return
+
+        generation = self.generation
+        self.pending_after = self.widget.after(DEBOUNCE_MS, lambda: self._dispatch(query, context, generation))
+
+    def cancel(self):
+        """Forget the current input: pending lookups are not started and their responses dropped"""
+        self.generation += 1
+        if self.pending_after:
+            self.widget.after_cancel(self.pending_after)
+            self.pending_after = None
+
+    def close(self):
+        """Stop delivering results (call when the widget is destroyed)"""
+        self.closed = True
+        if self.pending_after:
+            try:
+                self.widget.after_cancel(self.pending_after)
+            except tk.TclError:
+                pass
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def _dispatch(self, query: str, context: Tuple[str, ...], generation: int):
+        self.pending_after = None
+        if generation != self.generation or self.closed:
+            return
+
+        def worker():
+            try:
+                result = self.fetch(query, self.limit, context)
+            except Exception as e:
+                print(f"Error fetching tag suggestions: {e}")
+                result = None
+            self.results.put((query, context, generation, result))
+
+        self.outstanding += 1
+        self.executor.submit(worker)
+        if self.outstanding == 1:
+            self.widget.after(POLL_MS, self._poll)
+
+    def _poll(self):
+        """Collect worker results on the Tk thread, until no lookup is outstanding"""
+        if self.closed:
+            return
+        try:
+            while True:
+                query, context, generation, result = self.results.get_nowait()
+                self.outstanding -= 1
+                if result is None:
+                    continue
+                self._store_memo(query, context, result)
+                # Drop responses for input that has changed since
+                if generation == self.generation:
+                    self.on_result([name for name, _ in result])
+        except queue.Empty:
+            pass
+        except tk.TclError:
+            self.closed = True
+            return
+
+        if self.outstanding > 0:
+            self.widget.after(POLL_MS, self._poll)
+
+    def _check_version(self):
+        if self.version:
+            version = self.version()
+            if version != self.memo_version:
+                self.memo_version = version
+                self.memo.clear()
+
+    def _store_memo(self, query: str, context: Tuple[str, ...], result: List[Tuple[str, int]]):
+        key = (context, query.casefold())
+        self.memo[key] = result
+        self.memo.move_to_end(key)
+        while len(self.memo) > MEMO_SIZE:
+            self.memo.popitem(last=False)
+
+    def _lookup_memo(self, query: str, context: Tuple[str, ...]) -> Optional[List[str]]:
+        """Answer from the memo, directly or by filtering a complete shorter-prefix result"""
+        self._check_version()
+        key = query.casefold()
+        if (context, key) in self.memo:
+            self.memo.move_to_end((context, key))
+            return [name for name, _ in self.memo[(context, key)]]
+        if context:
+            return None
+
+        for length in range(len(key) - 1, 0, -1):
+            cached = self.memo.get(((), key[:length]))
+            # Only a result shorter than the limit is known to hold every match
+            if cached is None or len(cached) >= self.limit:
+                continue
+            matches = [(name, count) for name, count in cached if key in name.casefold()]
+            # Prefix matches first, each group by count, like the database query
+            matches.sort(key=lambda item: (not item[0].casefold().startswith(key), -item[1]))
+            if len(matches) < self.limit:
+                if self.fill is None:
+                    return None
+                extra = self.fill(query, self.limit - len(matches), [name for name, _ in matches])
+                if extra is None:
+                    return None
+                matches.extend(extra)
+            self._store_memo(query, context, matches)
+            return [name for name, _ in matches]
+
+        return None
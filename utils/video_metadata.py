@@ -0,0 +1,384 @@
+import struct
+from typing import Any, BinaryIO, Dict, Optional
+
+# Upper bound for any single header structure read into memory
+MAX_HEADER_READ = 1024 * 1024
+
+# MP4/MOV container boxes that are descended into while looking for track headers
+MP4_CONTAINER_BOXES = {b"moov", b"trak", b"mdia", b"minf", b"stbl"}
+
+# Matroska/WebM element ids
+EBML_HEADER = 0x1A45DFA3
+MKV_SEGMENT = 0x18538067
+MKV_SEEK_HEAD = 0x114D9B74
+MKV_SEEK = 0x4DBB
+MKV_SEEK_ID = 0x53AB
+MKV_SEEK_POSITION = 0x53AC
+MKV_INFO = 0x1549A966
+MKV_TIMECODE_SCALE = 0x2AD7B1
+MKV_DURATION = 0x4489
+MKV_TRACKS = 0x1654AE6B
+MKV_TRACK_ENTRY = 0xAE
+MKV_TRACK_TYPE = 0x83
+MKV_CODEC_ID = 0x86
+MKV_VIDEO = 0xE0
+MKV_PIXEL_WIDTH = 0xB0
+MKV_PIXEL_HEIGHT = 0xBA
+MKV_CLUSTER = 0x1F43B675
+
+
+def _empty_metadata() -> Dict[str, Any]:
+    return {"duration": None, "width": None, "height": None, "codec": None}
+
+
+def extract_metadata(file_path: str) -> Optional[Dict[str, Any]]:
+    """Read duration, resolution and codec from the container headers of a video
+
+    Only the header structures are read (bounded reads and seeks over the
+    payload), the video stream itself is never decoded. The container type is
+    detected from the file signature, not from the extension.
+
+    Args:
+        file_path: Path to the video file
+
+    Returns:
+        Dictionary with duration (seconds), width, height and codec (any of them
+        may be None), or None if the container is not supported or unreadable
+    """
+    try:
+        with open(file_path, "rb") as f:
+            signature = f.read(12)
+            f.seek(0)
+            if signature[:4] == b"RIFF" and signature[8:12] == b"AVI ":
+                return _parse_avi(f)
+            if len(signature) >= 4 and struct.unpack(">I", signature[:4])[0] == EBML_HEADER:
+                return _parse_matroska(f)
+            if signature[4:8] in (b"ftyp", b"moov", b"mdat", b"free", b"wide", b"skip"):
+                return _parse_mp4(f)
+    except (OSError, struct.error, ValueError, IndexError) as e:
+        print(f"Error reading video header: {e}, path: {file_path}")
+    return None
+
+
+# ---------------------------------------------------------------- MP4 / MOV
+
+def _iter_mp4_boxes(f: BinaryIO, start: int, end: int):
+    """Yield (type, payload_start, payload_end) for the boxes between start and end"""
+    position = start
+    while position + 8 <= end:
+        f.seek(position)
+        header = f.read(8)
+        if len(header) < 8:
+            return
+        size, box_type = struct.unpack(">I4s", header)
+        header_size = 8
+        if size == 1:
+            size = struct.unpack(">Q", f.read(8))[0]
+            header_size = 16
+        elif size == 0:
+            # Box extends to the end of the enclosing space
+            size = end - position
+        if size < header_size:
+            return
+        yield box_type, position + header_size, min(position + size, end)
+        position += size
+
+
+def _parse_mp4(f: BinaryIO) -> Optional[Dict[str, Any]]:
+    f.seek(0, 2)
+    file_size = f.tell()
+    metadata = _empty_metadata()
+
+    for box_type, start, end in _iter_mp4_boxes(f, 0, file_size):
+        if box_type == b"moov":
+            _parse_mp4_container(f, start, end, metadata, {})
+            return metadata
+    return None
+
+
+def _parse_mp4_container(f: BinaryIO, start: int, end: int, metadata: Dict[str, Any], track: Dict[str, Any]):
+    """Walk a container box, reading only the small leaf boxes that carry metadata"""
+    for box_type, box_start, box_end in _iter_mp4_boxes(f, start, end):
+        if box_type == b"trak":
+            track = {}
+            _parse_mp4_container(f, box_start, box_end, metadata, track)
+            if track.get("handler") == b"vide" and metadata["width"] is None:
+                metadata["width"] = track.get("width")
+                metadata["height"] = track.get("height")
+                metadata["codec"] = track.get("codec")
+        elif box_type in MP4_CONTAINER_BOXES:
+            _parse_mp4_container(f, box_start, box_end, metadata, track)
+        elif box_type in (b"mvhd", b"tkhd", b"hdlr", b"stsd"):
+            f.seek(box_start)
+            payload = f.read(min(box_end - box_start, 256))
+            _parse_mp4_leaf(box_type, payload, metadata, track)
+
+
+def _parse_mp4_leaf(box_type: bytes, payload: bytes, metadata: Dict[str, Any], track: Dict[str, Any]):
+    # Empty or truncated boxes (damaged files) are ignored
+    if not payload:
+        return
+    version = payload[0]
+    if box_type == b"mvhd":
+        if version == 1:
+            if len(payload) < 32:
+                return
+            timescale, duration = struct.unpack(">IQ", payload[20:32])
+        else:
+            if len(payload) < 20:
+                return
+            timescale, duration = struct.unpack(">II", payload[12:20])
+        if timescale:
+            metadata["duration"] = duration / timescale
+    elif box_type == b"tkhd":
+        offset = 88 if version == 1 else 76
+        if len(payload) < offset + 8:
+            return
+        width, height = struct.unpack(">II", payload[offset:offset + 8])
+        # Values are 16.16 fixed point
+        if width and height:
+            track["width"], track["height"] = width >> 16, height >> 16
+    elif box_type == b"hdlr" and len(payload) >= 12:
+        # QuickTime also has a data handler in minf, the media handler in mdia comes first
+        track.setdefault("handler", payload[8:12])
+    elif box_type == b"stsd" and len(payload) >= 16:
+        track["codec"] = payload[12:16].decode("latin-1").strip()
+        # Fall back to the sample entry size if tkhd had none
+        if "width" not in track and len(payload) >= 44:
+            width, height = struct.unpack(">HH", payload[40:44])
+            if width and height:
+                track["width"], track["height"] = width, height
+
+
+# ---------------------------------------------------------- Matroska / WebM
+
+def _read_vint(f: BinaryIO, keep_marker: bool) -> Optional[int]:
+    """Read an EBML variable length integer (element ids keep their length marker)"""
+    first = f.read(1)
+    if not first:
+        return None
+    first = first[0]
+    length = 1
+    mask = 0x80
+    while length <= 8 and not first & mask:
+        mask >>= 1
+        length += 1
+    if length > 8:
+        raise ValueError("Invalid EBML variable length integer")
+
+    value = first if keep_marker else first & (mask - 1)
+    all_ones = value == mask - 1
+    for byte in f.read(length - 1):
+        value = (value << 8) | byte
+        all_ones = all_ones and byte == 0xFF
+    if not keep_marker and all_ones:
+        # Unknown size
+        return -1
+    return value
+
+
+def _iter_ebml_elements(f: BinaryIO, start: int, end: int):
+    """Yield (id, data_start, data_end) for the elements between start and end"""
+    position = start
+    while position < end:
+        f.seek(position)
+        element_id = _read_vint(f, True)
+        size = _read_vint(f, False)
+        if element_id is None or size is None:
+            return
+        data_start = f.tell()
+        data_end = end if size < 0 else min(data_start + size, end)
+        yield element_id, data_start, data_end
+        position = data_end
+
+
+def _read_ebml_data(f: BinaryIO, start: int, end: int) -> bytes:
+    f.seek(start)
+    return f.read(min(end - start, MAX_HEADER_READ))
+
+
+def _ebml_uint(data: bytes) -> int:
+    return int.from_bytes(data, "big") if data else 0
+
+
+def _ebml_float(data: bytes) -> Optional[float]:
+    if len(data) == 4:
+        return struct.unpack(">f", data)[0]
+    if len(data) == 8:
+        return struct.unpack(">d", data)[0]
+    return None
+
+
+def _parse_matroska(f: BinaryIO) -> Optional[Dict[str, Any]]:
+    f.seek(0, 2)
+    file_size = f.tell()
+
+    for element_id, start, end in _iter_ebml_elements(f, 0, file_size):
+        if element_id == MKV_SEGMENT:
+            return _parse_matroska_segment(f, start, end)
+    return None
+
+
+def _parse_matroska_segment(f: BinaryIO, segment_start: int, segment_end: int) -> Dict[str, Any]:
+    metadata = _empty_metadata()
+    seek_positions = {}
+    found = set()
+
+    for element_id, start, end in _iter_ebml_elements(f, segment_start, segment_end):
+        if element_id == MKV_SEEK_HEAD:
+            seek_positions = _parse_matroska_seek_head(f, start, end)
+        elif element_id == MKV_INFO:
+            _parse_matroska_info(f, start, end, metadata)
+            found.add(MKV_INFO)
+        elif element_id == MKV_TRACKS:
+            _parse_matroska_tracks(f, start, end, metadata)
+            found.add(MKV_TRACKS)
+        elif element_id == MKV_CLUSTER:
+            # Media data starts here, never scan through it
+            break
+        if len(found) == 2:
+            return metadata
+
+    # Info or Tracks are stored after the clusters, jump there through the SeekHead
+    for element_id in (MKV_INFO, MKV_TRACKS):
+        if element_id in found or element_id not in seek_positions:
+            continue
+        for found_id, start, end in _iter_ebml_elements(f, segment_start + seek_positions[element_id], segment_end):
+            if found_id == MKV_INFO:
+                _parse_matroska_info(f, start, end, metadata)
+            elif found_id == MKV_TRACKS:
+                _parse_matroska_tracks(f, start, end, metadata)
+            break
+
+    return metadata
+
+
+def _parse_matroska_seek_head(f: BinaryIO, start: int, end: int) -> Dict[int, int]:
+    positions = {}
+    for element_id, seek_start, seek_end in _iter_ebml_elements(f, start, end):
+        if element_id != MKV_SEEK:
+            continue
+        seek_id, seek_position = None, None
+        for child_id, child_start, child_end in _iter_ebml_elements(f, seek_start, seek_end):
+            if child_id == MKV_SEEK_ID:
+                seek_id = _ebml_uint(_read_ebml_data(f, child_start, child_end))
+            elif child_id == MKV_SEEK_POSITION:
+                seek_position = _ebml_uint(_read_ebml_data(f, child_start, child_end))
+        if seek_id is not None and seek_position is not None:
+            positions[seek_id] = seek_position
+    return positions
+
+
+def _parse_matroska_info(f: BinaryIO, start: int, end: int, metadata: Dict[str, Any]):
+    timecode_scale = 1000000  # Default: milliseconds
+    duration = None
+    for element_id, data_start, data_end in _iter_ebml_elements(f, start, end):
+        if element_id == MKV_TIMECODE_SCALE:
+            timecode_scale = _ebml_uint(_read_ebml_data(f, data_start, data_end))
+        elif element_id == MKV_DURATION:
+            duration = _ebml_float(_read_ebml_data(f, data_start, data_end))
+    if duration is not None:
+        metadata["duration"] = duration * timecode_scale / 1e9
+
+
+def _parse_matroska_tracks(f: BinaryIO, start: int, end: int, metadata: Dict[str, Any]):
+    for element_id, entry_start, entry_end in _iter_ebml_elements(f, start, end):
+        if element_id != MKV_TRACK_ENTRY:
+            continue
+        track = {}
+        for child_id, child_start, child_end in _iter_ebml_elements(f, entry_start, entry_end):
+            if child_id == MKV_TRACK_TYPE:
+                track["type"] = _ebml_uint(_read_ebml_data(f, child_start, child_end))
+            elif child_id == MKV_CODEC_ID:
+                track["codec"] = _read_ebml_data(f, child_start, child_end).decode("ascii", "ignore").strip("\x00")
+            elif child_id == MKV_VIDEO:
+                for video_id, video_start, video_end in _iter_ebml_elements(f, child_start, child_end):
+                    if video_id == MKV_PIXEL_WIDTH:
+                        track["width"] = _ebml_uint(_read_ebml_data(f, video_start, video_end))
+                    elif video_id == MKV_PIXEL_HEIGHT:
+                        track["height"] = _ebml_uint(_read_ebml_data(f, video_start, video_end))
+        # Track type 1 is video
+        if track.get("type") == 1:
+            metadata["width"] = track.get("width")
+            metadata["height"] = track.get("height")
+            metadata["codec"] = track.get("codec")
+            return
+
+
+# ---------------------------------------------------------------------- AVI
+
+def _iter_riff_chunks(f: BinaryIO, start: int, end: int):
+    """Yield (id, list_type, data_start, data_end) for the RIFF chunks between start and end"""
+    position = start
+    while position + 8 <= end:
+        f.seek(position)
+        header = f.read(8)
+        if len(header) < 8:
+            return
+        chunk_id, size = struct.unpack("<4sI", header)
+        data_start = position + 8
+        list_type = None
+        if chunk_id in (b"RIFF", b"LIST"):
+            list_type = f.read(4)
+            data_start += 4
+        yield chunk_id, list_type, data_start, min(position + 8 + size, end)
+        # Chunks are padded to an even size
+        position += 8 + size + (size & 1)
+
+
+def _parse_avi(f: BinaryIO) -> Optional[Dict[str, Any]]:
+    f.seek(0, 2)
+    file_size = f.tell()
+    metadata = _empty_metadata()
+
+    for chunk_id, list_type, start, end in _iter_riff_chunks(f, 0, file_size):
+        if chunk_id != b"RIFF":
+            return None
+        for child_id, child_type, child_start, child_end in _iter_riff_chunks(f, start, end):
+            if child_id == b"LIST" and child_type == b"hdrl":
+                _parse_avi_header_list(f, child_start, child_end, metadata)
+                return metadata
+            if child_id == b"LIST" and child_type == b"movi":
+                break
+        return None
+    return None
+
+
+def _parse_avi_header_list(f: BinaryIO, start: int, end: int, metadata: Dict[str, Any]):
+    total_frames = 0
+    micro_sec_per_frame = 0
+
+    for chunk_id, list_type, data_start, data_end in _iter_riff_chunks(f, start, end):
+        if chunk_id == b"avih":
+            f.seek(data_start)
+            data = f.read(40)
+            micro_sec_per_frame, = struct.unpack("<I", data[0:4])
+            total_frames, = struct.unpack("<I", data[16:20])
+            metadata["width"], metadata["height"] = struct.unpack("<II", data[32:40])
+        elif chunk_id == b"LIST" and list_type == b"strl" and metadata["codec"] is None:
+            _parse_avi_stream_list(f, data_start, data_end, metadata)
+        elif chunk_id == b"LIST" and list_type == b"odml":
+            # OpenDML files store the real frame count of files over 1 GB here
+            for odml_id, _, odml_start, _ in _iter_riff_chunks(f, data_start, data_end):
+                if odml_id == b"dmlh":
+                    f.seek(odml_start)
+                    total_frames, = struct.unpack("<I", f.read(4))
+
+    if metadata["duration"] is None and total_frames and micro_sec_per_frame:
+        metadata["duration"] = total_frames * micro_sec_per_frame / 1e6
+
+
+def _parse_avi_stream_list(f: BinaryIO, start: int, end: int, metadata: Dict[str, Any]):
+    for chunk_id, _, data_start, data_end in _iter_riff_chunks(f, start, end):
+        if chunk_id != b"strh":
+            continue
+        f.seek(data_start)
+        data = f.read(36)
+        if data[0:4] != b"vids":
+            return
+        metadata["codec"] = data[4:8].decode("latin-1").strip("\x00 ") or None
+        scale, rate = struct.unpack("<II", data[20:28])
+        length, = struct.unpack("<I", data[32:36])
+        if scale and rate and length:
+            metadata["duration"] = length * scale / rate
+        return